@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import sqlite3
 
 from datetime import datetime
 from pathlib import Path
@@ -9,6 +8,12 @@ from typing import Any, Callable
 
 from utils.log_util import get_logger
 from utils.hourly_sales_util import write_hourly_data
+from utils.sqlite_util import get_connection
+from utils.db_util import (
+    payload_fingerprint,
+    is_payload_unchanged,
+    record_payload_fingerprint,
+)
 
 log = get_logger(__name__)
 
@@ -75,12 +80,12 @@ def _process_and_save_data(
     records: list[dict[str, Any]],
     db_path: Path,
     write_data_func: Callable[..., int],
-) -> None:
+) -> bool:
     """Saves a list of records to the database using the provided write
-    function."""
+    function. Returns True when the write succeeded."""
     if not records:
         log.warning("No valid records to save.", extra={"tag": "db"})
-        return
+        return False
 
     log.debug(
         f"Attempting to save {len(records)} records to DB.",
@@ -97,8 +102,10 @@ def _process_and_save_data(
             f"DB saved to {db_path}, inserted {inserted} new rows.",
             extra={"tag": "db"},
         )
+        return True
     except Exception as e:
         log.error(f"DB write failed: {e}", extra={"tag": "db"}, exc_info=True)
+        return False
 
 
 def _handle_final_logs(driver: Any) -> None:
@@ -131,7 +138,7 @@ def _handle_final_logs(driver: Any) -> None:
 def save_to_db(records: list[dict[str, Any]], db_path: Path) -> int:
     """Save records to the SQLite database."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
     cur = conn.cursor()
 
     cur.execute(
@@ -195,6 +202,7 @@ def _run_collection_cycle(
     navigation_script: str,  # 추가된 매개변수
     field_order: list[str],
     page_load_timeout: int,
+    store_code: str,
 ) -> None:
     log.info(
         f"--- Starting collection cycle for {date_to_collect} ---",
@@ -271,6 +279,17 @@ def _run_collection_cycle(
                 _handle_final_logs(driver)
                 return
 
+            # 직전 수집과 payload가 같으면 증분 계산과 DB 저장을 모두 건너뛴다.
+            digest = payload_fingerprint(records)
+            if is_payload_unchanged(db_path, store_code, date_to_collect, digest):
+                log.info(
+                    "Payload for %s unchanged since last collection. Skipping DB writes.",
+                    date_to_collect,
+                    extra={"tag": "db"},
+                )
+                _handle_final_logs(driver)
+                return
+
             # 1. 증분 데이터 저장 (Hourly) - 기존 DB 파일에 저장
             collected_at = datetime.now().strftime("%Y-%m-%d %H:%M")
             try:
@@ -295,11 +314,14 @@ def _run_collection_cycle(
                 f"Proceeding to save cumulative data to {db_path}",
                 extra={"tag": "db"},
             )
-            _process_and_save_data(
+            if _process_and_save_data(
                 records,  # 이미 파싱된 데이터를 전달
                 db_path,
                 write_data_func,
-            )
+            ):
+                record_payload_fingerprint(
+                    db_path, store_code, date_to_collect, digest
+                )
         else:
             log.warning(
                 "Collection for %s successful, but no data was returned.",
@@ -20,7 +20,7 @@ def analyze_predictions():
                 SUM(CASE WHEN stock = 0 THEN 1 ELSE 0 END) AS stockout_count, 
                 COUNT(*) AS total_days 
             FROM mid_sales 
-            WHERE DATE(collected_at) >= ? 
+            WHERE sale_date >= ? 
             GROUP BY mid_code, product_code
         """
         stockout_df = pd.read_sql(sales_query, conn_sales, params=(start_date,))
@@ -1,6 +1,8 @@
 import sqlite3
 import os
 
+from utils.compression import EXTENSIONS, default_codec, open_writer
+
 db_files = [
     'C:\\Users\\kanur\\OneDrive\\문서\\GitHub\\aaa\\code_outputs\\db\\category_predictions_dongyang.db',
     'C:\\Users\\kanur\\OneDrive\\문서\\GitHub\\aaa\\code_outputs\\db\\category_predictions_hoban.db',
@@ -8,14 +10,17 @@ db_files = [
     'C:\\Users\\kanur\\OneDrive\\문서\\GitHub\\aaa\\code_outputs\\db\\hoban.db'
 ]
 
+codec = default_codec()
+
 for db_file in db_files:
-    dump_file = db_file.replace('.db', '_dump.sql')
+    dump_file = db_file.replace('.db', '_dump.sql') + EXTENSIONS[codec]
     try:
         conn = sqlite3.connect(db_file)
-        with open(dump_file, 'w', encoding='utf-8') as f:
+        # Streamed straight into the compressor; the dump never sits uncompressed on disk.
+        with open_writer(dump_file, codec) as f:
             for line in conn.iterdump():
-                f.write('%s;\n' % line) # Add semicolon for MySQL compatibility
+                f.write(('%s;\n' % line).encode('utf-8')) # Add semicolon for MySQL compatibility
         conn.close()
-        print(f"Successfully dumped {db_file} to {dump_file}")
+        print(f"Successfully dumped {db_file} to {dump_file} ({os.path.getsize(dump_file)} bytes, {codec})")
     except Exception as e:
         print(f"Error dumping {db_file}: {e}")
@@ -3,91 +3,359 @@
 
 import json
 import logging
+import multiprocessing
 import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime, timedelta
-import sqlite3
+from datetime import datetime
+from typing import Callable, Optional
+
 import pandas as pd
 
 from dotenv import load_dotenv
 
-from utils.log_util import get_logger
-from utils.gcs_util import download_from_gcs, upload_to_gcs
-from utils.api_collector import get_session, fetch_sales_data
+from utils.log_util import get_logger, redirect_log_file
+from utils.api_collector import fetch_sales_data_concurrently
+from utils.session_cache import get_cached_session
+from utils.calendar_util import init_calendar
+from utils.sqlite_util import checkpoint_and_close, close_connections, prepare_for_replace
+from utils.replication import DEFAULT_SNAPSHOT_EVERY, replicate, sync_local_copy
+from utils.storage import open_storage
+from utils.ingest_queue import DEFAULT_COMMIT_INTERVAL, DEFAULT_MAX_PENDING, close_writer, get_writer
+from utils.db_util import (
+    init_db,
+    ingest_sales_frame,
+    plan_collection_dates,
+    payload_fingerprint,
+    is_payload_unchanged,
+    upsert_payload_fingerprint,
+)
 from prediction.xgboost import run_all_category_predictions
 
 # --- Constants ---
 SCRIPT_DIR: Path = Path(__file__).resolve().parent
 CODE_OUTPUT_DIR: Path = Path(__file__).resolve().parent / "code_outputs"
-GCS_BUCKET_NAME = "windy-smoke-467203-k9-automation-db"
+COLLECTION_DAYS = 8
+DEFAULT_MUTABLE_DAYS = 3
+DEFAULT_FETCH_WORKERS = 4
+LOG_DIR: Path = SCRIPT_DIR / "logs"
+
 
+def save_data_to_db(df: pd.DataFrame, db_path: Path, date_str: str) -> bool:
+    """Merges one day's API rows into the SQLite database. Returns True on success.
 
-def save_data_to_db(df: pd.DataFrame, db_path: Path, date_str: str):
-    """Saves the DataFrame to the SQLite database."""
+    Re-running with the same rows is a no-op; see ``ingest_sales_frame``.
+    """
     logger = get_logger("bgf_automation")
     try:
-        with sqlite3.connect(db_path) as conn:
-            df['collected_at'] = pd.to_datetime(date_str).strftime('%Y-%m-%d %H:%M:%S')
-            required_cols = ['mid_code', 'mid_name', 'product_code', 'product_name', 'sales', 'order_cnt', 'purchase', 'disposal', 'stock']
-            for col in required_cols:
-                if col not in df.columns:
-                    df[col] = 0
-            df.to_sql('mid_sales', conn, if_exists='append', index=False)
-            logger.debug(f"Data for {date_str} saved to {db_path}")
+        with init_db(db_path) as conn:
+            counts = ingest_sales_frame(conn, df, date_str)
+        logger.debug(
+            f"Data for {date_str} saved to {db_path}: "
+            + ", ".join(f"{key}={value}" for key, value in counts.items())
+        )
+        return True
     except Exception as e:
         logger.error(f"DB 저장 중 오류 발생: {e}", exc_info=True)
+        return False
 
-def run_automation_for_store(store_name: str, store_config: dict):
-    logger = get_logger("bgf_automation", level=logging.DEBUG, store_id=store_name)
-    logger.info(f"--- DEBUG: Starting automation for store: {store_name} ---")
+def _ingest_day(conn, df: pd.DataFrame, date_str: str, store_code: str, digest: str) -> dict:
+    """Ingest-queue job: merges one day and records its payload fingerprint atomically."""
+    counts = ingest_sales_frame(conn, df, date_str)
+    upsert_payload_fingerprint(conn, store_code, date_str, digest)
+    return counts
 
-    db_path = CODE_OUTPUT_DIR / "db" / store_config["db_file"]
-    gcs_db_path = f"db/{db_path.name}"
-    logger.debug(f"DB path: {db_path}, GCS path: {gcs_db_path}")
 
+@contextmanager
+def _timed_stage(timings: dict, stage: str):
+    """Records the wall time of ``stage`` in ``timings`` (seconds)."""
+    start = time.perf_counter()
     try:
-        logger.debug("Downloading DB from GCS...")
-        download_from_gcs(GCS_BUCKET_NAME, gcs_db_path, db_path)
-        logger.debug("DB download complete.")
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
 
-        credentials = {
-            "id": os.environ.get(store_config["credentials_env"]["id"]),
-            "password": os.environ.get(store_config["credentials_env"]["password"])
-        }
-        logger.debug("Credentials prepared. Getting session...")
-        session = get_session(credentials)
-        if not session:
+
+class StoreRun:
+    """One store's run, split at the points where stages can overlap with other stores.
+
+    * :meth:`prepare` - DB download and login (network-bound)
+    * :meth:`process` - collection and prediction (prediction is CPU-bound)
+    * :meth:`finish` - WAL checkpoint and upload (network-bound)
+
+    :func:`run_automation_for_store` runs the three back to back; the pipelined
+    runner overlaps one store's ``prepare``/``finish`` with another's prediction.
+    """
+
+    def __init__(self, store_name: str, store_config: dict):
+        self.store_name = store_name
+        self.store_config = store_config
+        self.logger = get_logger("bgf_automation", level=logging.DEBUG, store_id=store_name)
+        self.timings: dict = {}
+        self.summary = {"store": store_name, "status": "failed", "stages": self.timings}
+        self.db_path = CODE_OUTPUT_DIR / "db" / store_config["db_file"]
+        self.db_key = f"db/{self.db_path.name}"
+        # "replication" uploads per-run changesets instead of the whole file.
+        self.replicated = store_config.get("sync_mode", "file") == "replication"
+        self.replica_prefix = f"replicas/{self.db_path.stem}"
+        self.storage = None
+        self.session = None
+        self._start = time.perf_counter()
+
+    def prepare(self) -> bool:
+        """Downloads the DB and gets a session. Returns False if the run cannot go on."""
+        logger = self.logger
+        logger.info(f"--- DEBUG: Starting automation for store: {self.store_name} ---")
+        self._start = time.perf_counter()
+        logger.debug(f"DB path: {self.db_path}, storage key: {self.db_key}")
+        try:
+            with _timed_stage(self.timings, "download"):
+                self.storage = open_storage(self.store_config.get("storage"), base_dir=SCRIPT_DIR)
+                logger.debug(f"Downloading DB from {type(self.storage).__name__}...")
+                prepare_for_replace(self.db_path)
+                # A failed transfer raises; only a missing object (first run) starts from an empty DB.
+                if self.replicated:
+                    # Bootstrap from the plain DB object until the first snapshot exists.
+                    if sync_local_copy(self.db_path, self.storage, self.replica_prefix) is None:
+                        found = self.storage.download(self.db_key, self.db_path)
+                    else:
+                        found = True
+                else:
+                    found = self.storage.download(self.db_key, self.db_path)
+                if found:
+                    logger.debug("DB download complete.")
+                else:
+                    logger.info(f"No DB for {self.store_name} in storage yet. Starting from a new DB.")
+
+            with _timed_stage(self.timings, "login"):
+                credentials = {
+                    "id": os.environ.get(self.store_config["credentials_env"]["id"]),
+                    "password": os.environ.get(self.store_config["credentials_env"]["password"])
+                }
+                logger.debug("Credentials prepared. Getting session...")
+                self.session = get_cached_session(
+                    credentials, self.db_path, self.store_name, self.store_config["store_code"]
+                )
+        except Exception as e:
+            logger.error(f"CRITICAL ERROR in run_automation_for_store for {self.store_name}: {e}", exc_info=True)
+            return False
+        if not self.session:
             logger.error("Failed to get session. Aborting for this store.")
-            return
+            return False
         logger.debug("Session created successfully.")
+        return True
 
-        today = datetime.now().date()
-        logger.debug(f"Data collection loop started for 8 days until {today}.")
-        for i in range(7, -1, -1):
-            target_date = today - timedelta(days=i)
-            date_str = target_date.strftime("%Y%m%d")
-            logger.debug(f"Fetching data for date: {date_str}")
-            sales_df = fetch_sales_data(session, store_config["store_code"], date_str)
-            if sales_df is not None and not sales_df.empty:
-                logger.debug(f"Data received for {date_str}. Saving to DB...")
-                save_data_to_db(sales_df, db_path, date_str)
-                logger.debug(f"DB save complete for {date_str}.")
-            else:
-                logger.debug(f"No data for {date_str}. Skipping DB save.")
-        
-        logger.debug("Data collection loop finished. Starting prediction step...")
-        run_all_category_predictions(db_path)
-        logger.debug("Prediction step finished.")
+    def process(self, before_predict: Optional[Callable[[], None]] = None) -> None:
+        """Collects and ingests the planned days, then predicts if anything changed.
+
+        ``before_predict`` is called when the prediction stage starts.
+        """
+        logger = self.logger
+        store_config = self.store_config
+        db_path = self.db_path
+        try:
+            with _timed_stage(self.timings, "collect"):
+                today = datetime.now().date()
+                date_strs = plan_collection_dates(
+                    db_path,
+                    today,
+                    lookback_days=int(store_config.get("lookback_days", COLLECTION_DAYS)),
+                    mutable_days=int(store_config.get("mutable_window_days", DEFAULT_MUTABLE_DAYS)),
+                )
+                fetch_workers = int(store_config.get("fetch_workers", DEFAULT_FETCH_WORKERS))
+                logger.debug(
+                    f"Data collection started for {len(date_strs)} planned days until {today} with {fetch_workers} workers."
+                )
+                store_code = store_config["store_code"]
+                # Fetch threads hand each day to the DB's single writer thread, so
+                # saving never blocks fetching and only one connection writes.
+                conn = init_db(db_path)
+                try:
+                    # Migration 8 fills the calendar only up to its own run date; keep it ahead of today.
+                    init_calendar(conn)
+                finally:
+                    conn.close()
+                writer = get_writer(
+                    db_path,
+                    max_pending=int(store_config.get("ingest_queue_size", DEFAULT_MAX_PENDING)),
+                    commit_interval=float(store_config.get("ingest_commit_interval", DEFAULT_COMMIT_INTERVAL)),
+                )
+                pending = {}
+                try:
+                    for date_str, sales_df in fetch_sales_data_concurrently(
+                        self.session, store_code, date_strs, max_workers=fetch_workers
+                    ):
+                        if sales_df is None or sales_df.empty:
+                            logger.debug(f"No data for {date_str}. Skipping DB save.")
+                            continue
+                        digest = payload_fingerprint(sales_df.to_dict("records"))
+                        if is_payload_unchanged(db_path, store_code, date_str, digest):
+                            logger.debug(f"Payload for {date_str} unchanged since last run. Skipping DB save.")
+                            continue
+                        logger.debug(f"Data received for {date_str}. Queueing DB save...")
+                        pending[date_str] = writer.submit(_ingest_day, sales_df, date_str, store_code, digest)
+                finally:
+                    writer_stats = close_writer(db_path)
+                changed_dates = []
+                for date_str, future in pending.items():
+                    error = future.exception()
+                    if error is not None:
+                        logger.error(f"DB 저장 중 오류 발생 ({date_str}): {error}")
+                        continue
+                    changed_dates.append(date_str)
+                    logger.debug(
+                        f"DB save complete for {date_str}: "
+                        + ", ".join(f"{key}={value}" for key, value in future.result().items())
+                    )
+                logger.info(f"HTTP request stats: {json.dumps(self.session.stats.snapshot())}")
+                logger.info(f"Ingest writer stats: {json.dumps(writer_stats)}")
+            self.summary["changed_dates"] = sorted(changed_dates)
+
+            with _timed_stage(self.timings, "predict"):
+                if before_predict is not None:
+                    before_predict()
+                if not changed_dates:
+                    logger.info("No collected date changed since the last run. Skipping prediction step.")
+                else:
+                    logger.debug(f"Changed dates: {sorted(changed_dates)}. Starting prediction step...")
+                    run_all_category_predictions(db_path)
+                    logger.debug("Prediction step finished.")
+            self.summary["status"] = "ok"
+
+        except Exception as e:
+            logger.error(f"CRITICAL ERROR in run_automation_for_store for {self.store_name}: {e}", exc_info=True)
+
+    def finish(self) -> dict:
+        """Checkpoints the DB and uploads it if the run completed. Returns the summary."""
+        logger = self.logger
+        summary = self.summary
+        db_path = self.db_path
+        try:
+            if db_path.exists():
+                checkpoint_and_close(db_path)
+                if summary["status"] != "ok" or self.storage is None:
+                    # A failed run may have left a partial DB; keep the bucket copy authoritative.
+                    logger.warning("Run did not complete. Skipping DB upload.")
+                else:
+                    with _timed_stage(self.timings, "upload"):
+                        logger.debug(f"Uploading DB to {type(self.storage).__name__}...")
+                        if self.replicated:
+                            summary["replication"] = replicate(
+                                db_path,
+                                self.storage,
+                                self.replica_prefix,
+                                snapshot_every=int(self.store_config.get("snapshot_every", DEFAULT_SNAPSHOT_EVERY)),
+                            )
+                            close_connections(db_path)
+                            logger.debug("DB upload complete.")
+                        elif self.storage.upload(db_path, self.db_key):
+                            logger.debug("DB upload complete.")
+                        else:
+                            # Collected data stays in the local DB; the bucket keeps its copy.
+                            summary["status"] = "not_uploaded"
+                            logger.error(f"DB upload for {self.store_name} failed. The bucket copy was not updated.")
+        except Exception as e:
+            summary["status"] = "failed"
+            logger.error(f"CRITICAL ERROR in run_automation_for_store for {self.store_name}: {e}", exc_info=True)
+        if self.storage is not None:
+            summary["storage"] = self.storage.stats()
+            logger.info(f"Storage transfer stats: {json.dumps(summary['storage'])}")
+        summary["total"] = round(time.perf_counter() - self._start, 3)
+        logger.info(f"--- DEBUG: Finished automation for store: {self.store_name} ---")
+        return summary
+
+
+def run_automation_for_store(store_name: str, store_config: dict) -> dict:
+    """Runs download, login, collection, prediction and upload for one store.
+
+    Returns a summary with the status and per-stage timings of the run.
+    """
+    run = StoreRun(store_name, store_config)
+    if run.prepare():
+        run.process()
+    return run.finish()
+
+
+def _run_store_worker(store_name: str, store_config: dict) -> dict:
+    """Process-pool entry point: isolates the store's log file, then runs it."""
+    redirect_log_file(LOG_DIR / f"automation_{store_name}.log")
+    return run_automation_for_store(store_name, store_config)
+
+
+def _run_stores_pipelined(stores: dict, logger) -> list[dict]:
+    """Runs the stores one after another, overlapping their network and CPU stages.
+
+    While store N predicts, store N+1 downloads its DB and logs in; store N's
+    upload then runs in the background while store N+1 collects. Only one store
+    collects or predicts at a time.
+    """
+    runs = [StoreRun(store_name, store_config) for store_name, store_config in stores.items()]
+    logger.info(f"Running {len(runs)} stores pipelined.")
+    finishing: list[Future] = []
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="store-io") as io:
+        prepared = io.submit(runs[0].prepare)
+        for index, run in enumerate(runs):
+            ready = prepared.result()
+            following = runs[index + 1] if index + 1 < len(runs) else None
+            prefetch: list[Future] = []
+
+            def start_next() -> None:
+                if following is not None and not prefetch:
+                    logger.debug(f"Prefetching store: {following.store_name}")
+                    prefetch.append(io.submit(following.prepare))
+
+            logger.debug(f"Processing store: {run.store_name}")
+            if ready:
+                run.process(before_predict=start_next)
+            start_next()  # the run failed before its prediction stage
+            finishing.append(io.submit(run.finish))
+            if prefetch:
+                prepared = prefetch[0]
+        return [future.result() for future in finishing]
+
+
+def _run_stores(stores: dict, store_workers: int, logger, run_mode: str = "default") -> list[dict]:
+    """Runs every store, concurrently in worker processes when ``store_workers`` > 1.
+
+    ``run_mode="pipelined"`` overlaps the stores' stages in this process instead.
+    """
+    if run_mode == "pipelined" and stores:
+        return _run_stores_pipelined(stores, logger)
+    if store_workers <= 1 or len(stores) <= 1:
+        summaries = []
+        for store_name, store_config in stores.items():
+            logger.debug(f"Processing store: {store_name}")
+            summaries.append(run_automation_for_store(store_name, store_config))
+        return summaries
+
+    workers = min(store_workers, len(stores))
+    logger.info(f"Running {len(stores)} stores in {workers} worker processes.")
+    summaries = []
+    # spawn: 워커가 부모의 로거 핸들러와 DB 연결을 물려받지 않도록 새 인터프리터로 시작한다.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(_run_store_worker, store_name, store_config): store_name
+            for store_name, store_config in stores.items()
+        }
+        for future in as_completed(futures):
+            store_name = futures[future]
+            try:
+                summaries.append(future.result())
+            except Exception as e:
+                logger.error(f"Worker for store {store_name} crashed: {e}", exc_info=True)
+                summaries.append({"store": store_name, "status": "crashed", "stages": {}})
+    return summaries
 
-    except Exception as e:
-        logger.error(f"CRITICAL ERROR in run_automation_for_store for {store_name}: {e}", exc_info=True)
-    finally:
-        if db_path.exists():
-            logger.debug(f"Uploading DB to GCS...")
-            upload_to_gcs(GCS_BUCKET_NAME, db_path, gcs_db_path)
-            logger.debug("DB upload complete.")
 
-    logger.info(f"--- DEBUG: Finished automation for store: {store_name} ---")
+def _log_run_summary(logger, summaries: list[dict]) -> None:
+    for summary in sorted(summaries, key=lambda s: s["store"]):
+        stages = ", ".join(f"{name}={sec:.2f}s" for name, sec in summary.get("stages", {}).items())
+        logger.info(
+            f"[summary] {summary['store']}: {summary['status']} "
+            f"total={summary.get('total', 0.0):.2f}s ({stages})"
+        )
 
 def main():
     logger = get_logger("bgf_automation", level=logging.DEBUG)
@@ -102,9 +370,15 @@ def main():
         logger.error(f"Failed to load config.json: {e}", exc_info=True)
         return
 
-    for store_name, store_config in config.get("stores", {}).items():
-        logger.debug(f"Processing store: {store_name}")
-        run_automation_for_store(store_name, store_config)
+    # A store may override the top-level storage section with its own.
+    stores = {
+        store_name: {"storage": config.get("storage"), **store_config}
+        for store_name, store_config in config.get("stores", {}).items()
+    }
+    summaries = _run_stores(
+        stores, int(config.get("store_workers", 1)), logger, run_mode=config.get("run_mode", "default")
+    )
+    _log_run_summary(logger, summaries)
     
     logger.info("--- DEBUG: Main function finished ---")
 
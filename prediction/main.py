@@ -2,17 +2,17 @@ from __future__ import annotations
 
 import argparse
 import logging
-import sqlite3
 from pathlib import Path
 
 import pandas as pd
 
 from .xgboost import (
-    get_training_data_for_category,
-    get_weather_data,
+    attach_weather,
+    get_training_data_for_all_categories,
     run_all_category_predictions,
 )
 from . import monitor
+from utils.sqlite_util import get_connection
 
 try:  # pragma: no cover - optuna/xgboost가 없을 경우를 대비
     from .optuna_tuner import tune_model
@@ -30,7 +30,7 @@ def tune_all_models(
         log.error("tune_model 함수를 불러올 수 없습니다. Optuna가 설치되어 있는지 확인하세요.")
         return
 
-    with sqlite3.connect(db_path) as conn:
+    with get_connection(db_path) as conn:
         mid_codes = pd.read_sql("SELECT DISTINCT mid_code FROM mid_sales", conn)[
             "mid_code"
         ].tolist()
@@ -38,6 +38,8 @@ def tune_all_models(
     output_dir.mkdir(parents=True, exist_ok=True)
 
     prediction_db_path = db_path.parent / f"category_predictions_{db_path.stem}.db"
+    # 모든 중분류의 학습 데이터를 한 번에 만들어 둡니다.
+    training_by_category = get_training_data_for_all_categories(db_path)
 
     for mid_code in mid_codes:
         try:
@@ -61,12 +63,11 @@ def tune_all_models(
                 )
                 continue
 
-            training_df = get_training_data_for_category(db_path, mid_code)
+            training_df = training_by_category.get(mid_code, pd.DataFrame())
             if training_df.empty:
                 log.warning("[%s] 학습 데이터가 없어 튜닝을 건너뜁니다.", mid_code)
                 continue
-            weather_df = get_weather_data(training_df["date"].tolist())
-            df = pd.merge(training_df, weather_df, on="date").drop(columns=["date"])
+            df = attach_weather(training_df).drop(columns=["date"])
             tune_model(mid_code, df, output_dir, prediction_db_path, error_threshold)
             log.info("[%s] 모델 튜닝 성공", mid_code)
         except Exception:  # pragma: no cover - 실제 실행 시에만 호출
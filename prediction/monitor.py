@@ -1,29 +1,19 @@
 from typing import Union
-import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
 from pathlib import Path
 
+from utils.migrations import PREDICTIONS, SALES
+from utils.sales_schema import refresh_mid_daily_agg
+from utils.sqlite_util import get_connection
+
 log = logging.getLogger(__name__)
 
 def init_performance_db(db_path: Path):
     """모델 예측 성능 기록을 위한 DB 테이블을 초기화합니다."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(db_path) as conn:
-        conn.execute("""
-        CREATE TABLE IF NOT EXISTS prediction_performance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            evaluation_date TEXT,   -- 성능 평가를 수행한 날짜 (오늘)
-            target_date TEXT,       -- 평가 대상 날짜 (어제)
-            mid_code TEXT,          -- 중분류 코드
-            predicted_sales REAL,   -- 어제 예측했던 판매량
-            actual_sales REAL,      -- 어제의 실제 판매량
-            error_rate_percent REAL,-- 오차율 (%)
-            UNIQUE(target_date, mid_code)
-        )
-        """)
-        conn.commit()
+    get_connection(db_path, PREDICTIONS)
 
 def update_performance_log(sales_db_path: Path, prediction_db_path: Path):
     """어제의 예측 성능을 계산하고 DB에 기록합니다."""
@@ -37,18 +27,20 @@ def update_performance_log(sales_db_path: Path, prediction_db_path: Path):
     evaluation_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        with sqlite3.connect(sales_db_path) as sales_conn:
-            # 어제의 실제 판매량 가져오기
+        with get_connection(sales_db_path, SALES) as sales_conn:
+            refresh_mid_daily_agg(sales_conn)
+            # 어제의 실제 판매량 가져오기 (중분류·일자별 집계 테이블)
             actual_sales_df = pd.read_sql(
-                f"SELECT mid_code, SUM(sales) as actual_sales FROM mid_sales WHERE SUBSTR(collected_at, 1, 10) = '{yesterday_str}' GROUP BY mid_code",
-                sales_conn
+                "SELECT mid_code, total_sales as actual_sales FROM mid_daily_agg WHERE sale_date = ?",
+                sales_conn,
+                params=(yesterday_str,),
             )
         
         if actual_sales_df.empty:
             log.warning(f"[{store_name}] 어제({yesterday_str})의 실제 판매 데이터가 없어 성능 평가를 건너뜁니다.")
             return
 
-        with sqlite3.connect(prediction_db_path) as pred_conn:
+        with get_connection(prediction_db_path) as pred_conn:
             # 어제 예측했던 판매량 가져오기
             predicted_sales_df = pd.read_sql(
                 f"SELECT mid_code, predicted_sales FROM category_predictions WHERE target_date = '{yesterday_str}'",
@@ -84,7 +76,7 @@ def update_performance_log(sales_db_path: Path, prediction_db_path: Path):
                 'error_rate_percent': error_rate
             })
         
-        with sqlite3.connect(prediction_db_path) as conn:
+        with get_connection(prediction_db_path) as conn:
             cursor = conn.cursor()
             insert_sql = """
             INSERT OR REPLACE INTO prediction_performance 
@@ -121,11 +113,11 @@ def load_recent_performance(
     query = """
         SELECT target_date, mid_code, predicted_sales, actual_sales, error_rate_percent
         FROM prediction_performance
-        WHERE mid_code = ? AND date(target_date) >= ?
+        WHERE mid_code = ? AND target_date >= ?
         ORDER BY target_date
     """
 
-    with sqlite3.connect(prediction_db_path) as conn:
+    with get_connection(prediction_db_path) as conn:
         df = pd.read_sql(query, conn, params=(mid_code, start_date_str))
 
     return df if not df.empty else pd.DataFrame()
@@ -1,14 +1,15 @@
-import sqlite3
 from pathlib import Path
 import pandas as pd
 import xgboost
 
+from utils.sqlite_util import get_connection
+
 
 def build_training_data(db_path: Path, mid_code: str) -> pd.DataFrame:
     """mid_sales 테이블을 기반으로 품절 예측 학습 데이터를 생성합니다."""
     if not db_path.exists():
         return pd.DataFrame()
-    with sqlite3.connect(db_path) as conn:
+    with get_connection(db_path) as conn:
         df = pd.read_sql(
             "SELECT collected_at, product_code, sales, stock FROM mid_sales WHERE mid_code = ?",
             conn,
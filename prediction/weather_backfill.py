@@ -0,0 +1,155 @@
+"""과거 일별 날씨 일괄 적재 스크립트.
+
+기상청 ASOS 일자료(API) 또는 로컬 CSV 파일에서 기간 내 일평균 기온과
+일강수량을 읽어 점포 DB의 ``weather_daily`` 테이블에 한 번에 저장합니다.
+학습 데이터는 이 테이블을 SQL 조인으로 읽으므로 날짜별 API 호출이 필요 없습니다.
+
+사용 예::
+
+    python -m prediction.weather_backfill code_outputs/db/hoban.db --start 2025-01-01 --end 2025-07-31
+    python -m prediction.weather_backfill code_outputs/db/*.db --file weather.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from utils.migrations import SALES
+from utils.sqlite_util import get_connection
+
+log = logging.getLogger(__name__)
+
+# 서울(108) 관측소. 예보 격자(60, 127)와 같은 지역입니다.
+DEFAULT_STATION_ID = 108
+ASOS_MAX_ROWS = 999
+ASOS_DAILY_URL = "https://apihub.kma.go.kr/api/typ02/openApi/AsosDalyInfoService/getWthrDataList"
+
+# 기상청 기상자료개방포털 CSV의 한글 컬럼명을 내부 컬럼명으로 매핑합니다.
+_FILE_COLUMN_ALIASES = {
+    "date": "date", "일시": "date", "tm": "date",
+    "temperature": "temperature", "평균기온(°C)": "temperature", "avgTa": "temperature",
+    "rainfall": "rainfall", "일강수량(mm)": "rainfall", "sumRn": "rainfall",
+}
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """컬럼명을 통일하고 date(YYYY-MM-DD), temperature, rainfall 형식으로 정리합니다."""
+    df = df.rename(columns={c: _FILE_COLUMN_ALIASES[c] for c in df.columns if c in _FILE_COLUMN_ALIASES})
+    missing = {"date", "temperature"} - set(df.columns)
+    if missing:
+        raise ValueError(f"날씨 데이터에 필요한 컬럼이 없습니다: {sorted(missing)}")
+    if "rainfall" not in df.columns:
+        df["rainfall"] = 0.0
+
+    out = pd.DataFrame({
+        "date": pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d"),
+        "temperature": pd.to_numeric(df["temperature"], errors="coerce"),
+        # 강수 없음은 빈 값으로 기록되므로 0으로 채웁니다.
+        "rainfall": pd.to_numeric(df["rainfall"], errors="coerce").fillna(0.0),
+    })
+    return out.dropna(subset=["temperature"]).drop_duplicates("date", keep="last")
+
+
+def load_weather_file(path: Path) -> pd.DataFrame:
+    """로컬 CSV(date, temperature, rainfall 또는 기상청 한글 헤더)를 읽습니다."""
+    for encoding in ("utf-8-sig", "cp949"):
+        try:
+            df = pd.read_csv(path, encoding=encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError(f"{path} 파일의 인코딩을 인식할 수 없습니다.")
+    return _normalize(df)
+
+
+def fetch_asos_daily(start: date, end: date, api_key: str, station_id: int = DEFAULT_STATION_ID) -> pd.DataFrame:
+    """기상청 ASOS 일자료 API에서 기간 내 일별 관측값을 조회합니다.
+
+    요청 한 번에 최대 ``ASOS_MAX_ROWS``일을 받으므로 긴 기간은 구간을 나눠 조회합니다.
+    """
+    items: list[dict] = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start + timedelta(days=ASOS_MAX_ROWS - 1))
+        params = {
+            "pageNo": 1,
+            "numOfRows": ASOS_MAX_ROWS,
+            "dataType": "JSON",
+            "dataCd": "ASOS",
+            "dateCd": "DAY",
+            "startDt": chunk_start.strftime("%Y%m%d"),
+            "endDt": chunk_end.strftime("%Y%m%d"),
+            "stnIds": station_id,
+            "authKey": api_key,
+        }
+        response = requests.get(ASOS_DAILY_URL, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        result_code = data.get("response", {}).get("header", {}).get("resultCode")
+        if result_code != "00":
+            raise RuntimeError(f"ASOS 일자료 API resultCode {result_code}")
+        items.extend(data.get("response", {}).get("body", {}).get("items", {}).get("item", []))
+        chunk_start = chunk_end + timedelta(days=1)
+    return _normalize(pd.DataFrame(items, columns=["tm", "avgTa", "sumRn"]))
+
+
+def store_weather_daily(db_path: Path, weather_df: pd.DataFrame, source: str) -> int:
+    """정규화된 날씨 데이터를 ``weather_daily``에 한 트랜잭션으로 저장합니다."""
+    loaded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [
+        (d, float(t), float(r), source, loaded_at)
+        for d, t, r in weather_df[["date", "temperature", "rainfall"]].itertuples(index=False)
+    ]
+    with get_connection(db_path, SALES) as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO weather_daily (date, temperature, rainfall, source, loaded_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+    log.info("[%s] weather_daily %d일 적재 (%s)", db_path.name, len(rows), source)
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="과거 일별 날씨를 weather_daily 테이블에 일괄 적재합니다.")
+    parser.add_argument("db_paths", nargs="+", help="적재할 점포 SQLite DB 경로")
+    parser.add_argument("--file", help="API 대신 읽을 로컬 CSV 파일 (오프라인 적재)")
+    parser.add_argument("--start", help="API 조회 시작일 (YYYY-MM-DD)")
+    parser.add_argument("--end", help="API 조회 종료일 (YYYY-MM-DD)")
+    parser.add_argument("--station", type=int, default=DEFAULT_STATION_ID, help="ASOS 관측소 번호")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    if args.file:
+        weather_df = load_weather_file(Path(args.file))
+        if args.start:
+            weather_df = weather_df[weather_df["date"] >= args.start]
+        if args.end:
+            weather_df = weather_df[weather_df["date"] <= args.end]
+        source = f"file:{Path(args.file).name}"
+    else:
+        api_key = os.environ.get("KMA_API_KEY")
+        if not (api_key and args.start and args.end):
+            parser.error("--file 이 없으면 --start, --end 와 KMA_API_KEY 환경 변수가 필요합니다.")
+        start = datetime.strptime(args.start, "%Y-%m-%d").date()
+        end = datetime.strptime(args.end, "%Y-%m-%d").date()
+        weather_df = fetch_asos_daily(start, end, api_key, args.station)
+        source = f"asos:{args.station}"
+
+    for db_path in map(Path, args.db_paths):
+        if not db_path.exists():
+            log.error("DB 파일을 찾을 수 없습니다: %s", db_path)
+            continue
+        store_weather_daily(db_path, weather_df, source)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""날씨 조회 결과 캐시.
+
+``get_weather_data``가 날짜마다 기상청 API나 ``forecast.json``을 다시 읽지
+않도록, 조회 결과를 프로세스 내 메모와 SQLite ``weather_cache`` 테이블에
+보관합니다. 키는 ``(date, nx, ny, source)``이며 출처별 TTL을 적용합니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from utils.sqlite_util import get_connection
+
+log = logging.getLogger(__name__)
+
+WEATHER_CACHE_DB = Path(__file__).resolve().parent.parent / "code_outputs" / "weather_cache.db"
+
+# 출처별 유효 기간. ``None``은 만료되지 않음(확정된 관측값)을 뜻합니다.
+SOURCE_TTL: dict[str, timedelta | None] = {
+    "forecast_file": timedelta(hours=3),
+    "forecast_api": timedelta(hours=3),
+    "observed_api": timedelta(hours=1),
+    # API 키 없음/오류/미지원 날짜의 대체값은 메모에만 두고 DB에는 저장하지 않습니다.
+    "fallback": timedelta(hours=1),
+}
+PERSISTED_SOURCES = {"forecast_file", "forecast_api", "observed_api"}
+# 같은 날짜에 여러 출처가 있으면 관측값을 우선합니다.
+SOURCE_PRIORITY = ["observed_api", "forecast_api", "forecast_file", "fallback"]
+
+
+def _now() -> datetime:
+    return datetime.now()
+
+
+class WeatherCache:
+    """메모 계층과 SQLite 계층으로 이루어진 날씨 캐시."""
+
+    def __init__(self, db_path: Path | None = WEATHER_CACHE_DB):
+        self.db_path = db_path
+        self._memo: dict[tuple[date, int, int, str], tuple[float, float, datetime]] = {}
+        self._loaded: set[tuple[date, int, int]] = set()
+        self._lock = threading.Lock()
+
+    # --- SQLite 계층 ---
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = get_connection(self.db_path)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS weather_cache (
+            date TEXT, nx INTEGER, ny INTEGER, source TEXT,
+            temperature REAL, rainfall REAL, fetched_at TEXT,
+            PRIMARY KEY (date, nx, ny, source)
+        )
+        """)
+        return conn
+
+    def _load_from_db(self, day: date, nx: int, ny: int) -> None:
+        if self.db_path is None or not self.db_path.exists():
+            return
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT source, temperature, rainfall, fetched_at FROM weather_cache WHERE date = ? AND nx = ? AND ny = ?",
+                    (day.isoformat(), nx, ny),
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning(f"날씨 캐시 DB 조회 실패: {e}")
+            return
+        for source, temperature, rainfall, fetched_at in rows:
+            key = (day, nx, ny, source)
+            if key not in self._memo:
+                self._memo[key] = (temperature, rainfall, datetime.fromisoformat(fetched_at))
+
+    # --- 공개 API ---
+    def get(self, day: date, nx: int, ny: int) -> tuple[float, float, str] | None:
+        """유효한 캐시 값이 있으면 ``(temperature, rainfall, source)``를 반환합니다."""
+        with self._lock:
+            if (day, nx, ny) not in self._loaded:
+                self._load_from_db(day, nx, ny)
+                self._loaded.add((day, nx, ny))
+            now = _now()
+            for source in SOURCE_PRIORITY:
+                entry = self._memo.get((day, nx, ny, source))
+                if entry is None:
+                    continue
+                temperature, rainfall, fetched_at = entry
+                ttl = SOURCE_TTL.get(source)
+                if ttl is None or now - fetched_at < ttl:
+                    return temperature, rainfall, source
+        return None
+
+    def put(self, day: date, nx: int, ny: int, source: str, temperature: float, rainfall: float) -> None:
+        fetched_at = _now()
+        with self._lock:
+            self._memo[(day, nx, ny, source)] = (temperature, rainfall, fetched_at)
+        if source not in PERSISTED_SOURCES or self.db_path is None:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO weather_cache (date, nx, ny, source, temperature, rainfall, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (day.isoformat(), nx, ny, source, temperature, rainfall, fetched_at.isoformat()),
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log.warning(f"날씨 캐시 DB 저장 실패: {e}")
+
+    def clear_memo(self) -> None:
+        with self._lock:
+            self._memo.clear()
+            self._loaded.clear()
+
+
+_default_cache = WeatherCache()
+
+
+def get_default_cache() -> WeatherCache:
+    return _default_cache
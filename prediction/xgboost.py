@@ -1,8 +1,6 @@
 from typing import Union
-import sqlite3
 import pandas as pd
 import xgboost
-import holidays
 import requests
 import logging
 import json
@@ -15,6 +13,11 @@ import pickle
 
 from utils.log_util import get_logger
 from prediction.monitor import update_performance_log
+from prediction.weather_cache import get_default_cache
+from utils.migrations import PREDICTIONS, SALES
+from utils.sales_schema import refresh_mid_daily_agg
+from utils.sqlite_util import get_connection
+from utils.calendar_util import CALENDAR_COLUMNS, calendar_features, holiday_code
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -24,143 +27,214 @@ SHELF_LIFE_DAYS: dict[str, int] = {}
 
 # --- 유틸리티 및 데이터 로딩 함수들 (변경 없음) ---
 
-def get_weather_data(dates: list[datetime.date]) -> pd.DataFrame:
-    """기상청 API 또는 저장된 예보 파일을 통해 날씨 데이터를 가져옵니다."""
-    api_key = os.environ.get("KMA_API_KEY")
-    weather_data = []
-    nx, ny = 60, 127
+WEATHER_NX, WEATHER_NY = 60, 127
+FORECAST_FILE = Path(__file__).resolve().parent.parent / 'code_outputs' / 'forecast.json'
+
+
+def _fetch_weather_for_date(date: datetime.date, api_key: Union[str, None], nx: int, ny: int) -> tuple[dict, str]:
+    """한 날짜의 날씨를 예보 파일 또는 기상청 API에서 가져와 ``(레코드, 출처)``로 반환합니다."""
     today = datetime.now().date()
-    forecast_file = Path(__file__).resolve().parent.parent / 'code_outputs' / 'forecast.json'
+    forecast_file = FORECAST_FILE
+    is_tomorrow = date == (today + timedelta(days=1))
+
+    if is_tomorrow:
+        if forecast_file.exists():
+            try:
+                with open(forecast_file, 'r', encoding='utf-8') as f:
+                    forecast_data = json.load(f)
+                if forecast_data.get('target_date') == date.strftime('%Y-%m-%d'):
+                    log.info(f"Loaded tomorrow's forecast from {forecast_file}")
+                    return {
+                        'date': date,
+                        'temperature': forecast_data.get('temperature', 0.0),
+                        'rainfall': forecast_data.get('rainfall', 0.0)
+                    }, 'forecast_file'
+                else:
+                    log.warning("Forecast file is outdated. Falling back to API.")
+            except (json.JSONDecodeError, IOError) as e:
+                log.error(f"Error reading forecast file: {e}. Falling back to API.")
+        else:
+            log.warning("Forecast file not found. Falling back to API for tomorrow's data.")
+
+    if not api_key:
+        log.warning("기상청 API 키가 없어 임의의 날씨 데이터로 대체합니다.")
+        temp = random.uniform(5, 25)
+        rainfall = random.uniform(0, 20) if random.random() > 0.7 else 0
+        return {'date': date, 'temperature': temp, 'rainfall': rainfall}, 'fallback'
+
+    if is_tomorrow:
+        base_date_str = today.strftime('%Y%m%d')
+        base_time_str = '0200'
+        url = (
+            "https://apihub.kma.go.kr/api/typ02/openApi/VilageFcstInfoService_2.0/getVilageFcst"
+            f"?pageNo=1&numOfRows=1000&dataType=JSON&base_date={base_date_str}&base_time={base_time_str}"
+            f"&nx={nx}&ny={ny}&authKey={api_key}"
+        )
+    elif date == today:
+        request_time = datetime.now() - timedelta(hours=1)
+        base_date_str = request_time.strftime('%Y%m%d')
+        base_time_str = request_time.strftime('%H00')
+        url = (
+            "https://apihub.kma.go.kr/api/typ02/openApi/VilageFcstInfoService_2.0/getUltraSrtNcst"
+            f"?pageNo=1&numOfRows=1000&dataType=JSON&base_date={base_date_str}&base_time={base_time_str}"
+            f"&nx={nx}&ny={ny}&authKey={api_key}"
+        )
+    else:
+        log.warning(f"{date} 는 API 조회 지원 날짜(오늘, 내일)가 아니므로 기본값으로 처리됩니다.")
+        return {'date': date, 'temperature': 0.0, 'rainfall': 0.0}, 'fallback'
 
-    for date in dates:
-        is_tomorrow = date == (today + timedelta(days=1))
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        data = response.json()
 
-        if is_tomorrow:
-            if forecast_file.exists():
-                try:
-                    with open(forecast_file, 'r', encoding='utf-8') as f:
-                        forecast_data = json.load(f)
-                    if forecast_data.get('target_date') == date.strftime('%Y-%m-%d'):
-                        weather_data.append({
-                            'date': date, 
-                            'temperature': forecast_data.get('temperature', 0.0),
-                            'rainfall': forecast_data.get('rainfall', 0.0)
-                        })
-                        log.info(f"Loaded tomorrow's forecast from {forecast_file}")
-                        continue
-                    else:
-                        log.warning("Forecast file is outdated. Falling back to API.")
-                except (json.JSONDecodeError, IOError) as e:
-                    log.error(f"Error reading forecast file: {e}. Falling back to API.")
-            else:
-                log.warning("Forecast file not found. Falling back to API for tomorrow's data.")
-
-        if not api_key:
-            log.warning("기상청 API 키가 없어 임의의 날씨 데이터로 대체합니다.")
-            temp = random.uniform(5, 25)
-            rainfall = random.uniform(0, 20) if random.random() > 0.7 else 0
-            weather_data.append({'date': date, 'temperature': temp, 'rainfall': rainfall})
-            continue
+        result_code = data.get('response', {}).get('header', {}).get('resultCode')
+        if result_code != '00':
+            log.warning(f"{date} 날씨 API resultCode {result_code}. 기본값으로 저장합니다.")
+            return {'date': date, 'temperature': 0.0, 'rainfall': 0.0}, 'fallback'
+
+        items = data.get('response', {}).get('body', {}).get('items', {}).get('item', [])
 
         if is_tomorrow:
-            base_date_str = today.strftime('%Y%m%d')
-            base_time_str = '0200'
-            url = (
-                "https://apihub.kma.go.kr/api/typ02/openApi/VilageFcstInfoService_2.0/getVilageFcst"
-                f"?pageNo=1&numOfRows=1000&dataType=JSON&base_date={base_date_str}&base_time={base_time_str}"
-                f"&nx={nx}&ny={ny}&authKey={api_key}"
-            )
-        elif date == today:
-            request_time = datetime.now() - timedelta(hours=1)
-            base_date_str = request_time.strftime('%Y%m%d')
-            base_time_str = request_time.strftime('%H00')
-            url = (
-                "https://apihub.kma.go.kr/api/typ02/openApi/VilageFcstInfoService_2.0/getUltraSrtNcst"
-                f"?pageNo=1&numOfRows=1000&dataType=JSON&base_date={base_date_str}&base_time={base_time_str}"
-                f"&nx={nx}&ny={ny}&authKey={api_key}"
-            )
+            temps = [float(item['fcstValue']) for item in items if item['category'] == 'TMP' and item['fcstDate'] == date.strftime('%Y%m%d')]
+            rains = []
+            for item in items:
+                if item['category'] == 'PCP' and item['fcstDate'] == date.strftime('%Y%m%d'):
+                    value = item['fcstValue']
+                    if '강수없음' in str(value):
+                        rains.append(0.0)
+                    else:
+                        try:
+                            numeric_value = float(str(value).lower().replace('mm', '').replace('cm', ''))
+                            rains.append(numeric_value)
+                        except (ValueError, TypeError):
+                            rains.append(0.0)
+            avg_temp = sum(temps) / len(temps) if temps else 0.0
+            total_rainfall = sum(rains) if rains else 0.0
+            source = 'forecast_api'
         else:
-             log.warning(f"{date} 는 API 조회 지원 날짜(오늘, 내일)가 아니므로 기본값으로 처리됩니다.")
-             weather_data.append({'date': date, 'temperature': 0.0, 'rainfall': 0.0})
-             continue
-
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            result_code = data.get('response', {}).get('header', {}).get('resultCode')
-            if result_code != '00':
-                log.warning(f"{date} 날씨 API resultCode {result_code}. 기본값으로 저장합니다.")
-                weather_data.append({'date': date, 'temperature': 0.0, 'rainfall': 0.0})
-                continue
+            avg_temp = float(next((item['obsrValue'] for item in items if item['category'] == 'T1H'), 0.0))
+            total_rainfall = float(next((item['obsrValue'] for item in items if item['category'] == 'RN1'), 0.0))
+            source = 'observed_api'
 
-            items = data.get('response', {}).get('body', {}).get('items', {}).get('item', [])
-            
-            if is_tomorrow:
-                temps = [float(item['fcstValue']) for item in items if item['category'] == 'TMP' and item['fcstDate'] == date.strftime('%Y%m%d')]
-                rains = []
-                for item in items:
-                    if item['category'] == 'PCP' and item['fcstDate'] == date.strftime('%Y%m%d'):
-                        value = item['fcstValue']
-                        if '강수없음' in str(value):
-                            rains.append(0.0)
-                        else:
-                            try:
-                                numeric_value = float(str(value).lower().replace('mm', '').replace('cm', ''))
-                                rains.append(numeric_value)
-                            except (ValueError, TypeError):
-                                rains.append(0.0)
-                avg_temp = sum(temps) / len(temps) if temps else 0.0
-                total_rainfall = sum(rains) if rains else 0.0
-            else:
-                avg_temp = float(next((item['obsrValue'] for item in items if item['category'] == 'T1H'), 0.0))
-                total_rainfall = float(next((item['obsrValue'] for item in items if item['category'] == 'RN1'), 0.0))
-
-            weather_data.append({'date': date, 'temperature': avg_temp, 'rainfall': total_rainfall})
-
-        except requests.exceptions.RequestException as e:
-            log.error(f"{date} 날씨 데이터 요청 중 오류: {e}. 기본값으로 대체합니다.", exc_info=True)
-            weather_data.append({'date': date, 'temperature': 0.0, 'rainfall': 0.0})
-        except Exception as e:
-            log.error(f"{date} 날씨 데이터 파싱 중 예상치 못한 오류: {e}. 기본값으로 대체합니다.", exc_info=True)
-            weather_data.append({'date': date, 'temperature': 0.0, 'rainfall': 0.0})
+        return {'date': date, 'temperature': avg_temp, 'rainfall': total_rainfall}, source
+
+    except requests.exceptions.RequestException as e:
+        log.error(f"{date} 날씨 데이터 요청 중 오류: {e}. 기본값으로 대체합니다.", exc_info=True)
+    except Exception as e:
+        log.error(f"{date} 날씨 데이터 파싱 중 예상치 못한 오류: {e}. 기본값으로 대체합니다.", exc_info=True)
+    return {'date': date, 'temperature': 0.0, 'rainfall': 0.0}, 'fallback'
+
+
+def get_weather_data(dates: list[datetime.date]) -> pd.DataFrame:
+    """기상청 API 또는 저장된 예보 파일을 통해 날씨 데이터를 가져옵니다.
+
+    조회 결과는 ``weather_cache``에 보관되어, 같은 날짜는 한 번의 실행에서
+    (그리고 출처별 TTL 동안) 다시 조회하지 않습니다.
+    """
+    api_key = os.environ.get("KMA_API_KEY")
+    cache = get_default_cache()
+    weather_data = []
+
+    for date in dates:
+        cached = cache.get(date, WEATHER_NX, WEATHER_NY)
+        if cached is not None:
+            temperature, rainfall, _source = cached
+            weather_data.append({'date': date, 'temperature': temperature, 'rainfall': rainfall})
+            continue
+
+        record, source = _fetch_weather_for_date(date, api_key, WEATHER_NX, WEATHER_NY)
+        cache.put(date, WEATHER_NX, WEATHER_NY, source, record['temperature'], record['rainfall'])
+        weather_data.append(record)
 
     return pd.DataFrame(weather_data)
 
+_DAILY_CATEGORY_QUERY = (
+    "SELECT s.mid_code, s.collected_at, s.total_sales, s.total_purchase, s.total_disposal, "
+    "s.total_soldout, s.total_stock, w.temperature, w.rainfall, "
+    "c.weekday, c.month, c.week_of_year, c.is_holiday "
+    "FROM mid_daily_agg s "
+    "LEFT JOIN weather_daily w ON w.date = s.sale_date "
+    "LEFT JOIN calendar c ON c.date = s.sale_date "
+    "{where} ORDER BY s.mid_code, s.sale_date"
+)
+
+
+def _read_daily_category_sales(db_path: Path, mid_code: Union[str, None] = None) -> pd.DataFrame:
+    """중분류·일자별 합계를 ``mid_daily_agg`` 집계 테이블에서 읽습니다.
+
+    변경된 판매일만 먼저 다시 집계하고, 과거 날씨는 weather_daily,
+    날짜 특성은 calendar 테이블을 조인합니다(없으면 NULL).
+    """
+    with get_connection(db_path, SALES) as conn:
+        refresh_mid_daily_agg(conn)
+        if mid_code is None:
+            return pd.read_sql(_DAILY_CATEGORY_QUERY.format(where=""), conn)
+        return pd.read_sql(_DAILY_CATEGORY_QUERY.format(where="WHERE s.mid_code = ?"), conn, params=(mid_code,))
+
+
+def _add_features(df: pd.DataFrame) -> pd.DataFrame:
+    """날짜·수요 특성을 벡터 연산으로 추가합니다."""
+    dates = pd.to_datetime(df['collected_at'].str.slice(0, 10))
+    df['date'] = dates.dt.date
+    # calendar 조인으로 채워지지 않은 날짜(테이블 범위 밖)만 메모리 달력에서 보충합니다.
+    if not set(CALENDAR_COLUMNS) <= set(df.columns) or df[CALENDAR_COLUMNS].isna().any(axis=None):
+        lookup = calendar_features(dates)
+        for col in CALENDAR_COLUMNS:
+            df[col] = df[col].fillna(lookup[col]) if col in df.columns else lookup[col]
+    df[CALENDAR_COLUMNS] = df[CALENDAR_COLUMNS].astype(int)
+    df['is_stockout'] = (df['total_stock'] == 0).astype(int)
+    df['true_demand'] = df['total_sales'] + df['total_disposal']
+    df['disposal_ratio'] = df['total_disposal'] / (df['true_demand'] + 1e-6)
+    df['demand_gap'] = df['total_purchase'] - df['total_sales']
+    df['shelf_life_days'] = df['mid_code'].map(SHELF_LIFE_DAYS).fillna(0).astype(int)
+    return df
+
+
 def get_training_data_for_category(db_path: Path, mid_code: str) -> pd.DataFrame:
     """특정 중분류의 판매 데이터를 DB에서 읽어와 날짜 특성을 추가합니다."""
     if not db_path.exists():
         return pd.DataFrame()
 
-    with sqlite3.connect(db_path) as conn:
-        query = (
-            "SELECT collected_at, "
-            "SUM(sales) as total_sales, "
-            "SUM(purchase) as total_purchase, "
-            "SUM(disposal) as total_disposal, "
-            "SUM(soldout) as total_soldout, "
-            "SUM(stock) as total_stock "
-            "FROM mid_sales WHERE mid_code = ? GROUP BY SUBSTR(collected_at, 1, 10)"
-        )
-        df = pd.read_sql(query, conn, params=(mid_code,))
-
+    df = _read_daily_category_sales(db_path, mid_code)
     if df.empty:
         return pd.DataFrame()
+    return _add_features(df).drop(columns=['mid_code'])
 
-    df['date'] = pd.to_datetime(df['collected_at']).dt.date
-    df['weekday'] = df['date'].apply(lambda x: x.weekday())
-    df['month'] = df['date'].apply(lambda x: x.month)
-    df['week_of_year'] = df['date'].apply(lambda x: x.isocalendar()[1])
-    kr_holidays = holidays.KR()
-    df['is_holiday'] = df['date'].apply(lambda x: x in kr_holidays).astype(int)
-    df['is_stockout'] = (df['total_stock'] == 0).astype(int)
-    df['true_demand'] = df['total_sales'] + df['total_disposal']
-    df['disposal_ratio'] = df['total_disposal'] / (df['true_demand'] + 1e-6)
-    df['demand_gap'] = df['total_purchase'] - df['total_sales']
-    df['shelf_life_days'] = SHELF_LIFE_DAYS.get(mid_code, 0)
 
-    return df
+def get_training_data_for_all_categories(db_path: Path) -> dict[str, pd.DataFrame]:
+    """점포의 모든 중분류 학습 데이터를 한 번의 쿼리로 만들어 ``{mid_code: DataFrame}``으로 반환합니다.
+
+    각 DataFrame은 ``get_training_data_for_category``의 결과와 같은 컬럼을 가집니다.
+    """
+    if not db_path.exists():
+        return {}
+
+    df = _read_daily_category_sales(db_path)
+    if df.empty:
+        return {}
+    df = _add_features(df)
+    return {
+        mid_code: group.drop(columns=['mid_code']).reset_index(drop=True)
+        for mid_code, group in df.groupby('mid_code', sort=False)
+    }
+
+def attach_weather(training_df: pd.DataFrame) -> pd.DataFrame:
+    """``weather_daily``에서 채우지 못한 날짜만 ``get_weather_data``로 보충합니다."""
+    df = training_df.copy()
+    for col in ('temperature', 'rainfall'):
+        if col not in df.columns:
+            df[col] = float('nan')
+
+    missing = df['temperature'].isna()
+    if missing.any():
+        weather_df = get_weather_data(df.loc[missing, 'date'].tolist())
+        if not weather_df.empty:
+            fill = df.loc[missing, ['date']].merge(weather_df, on='date', how='left')
+            df.loc[missing, 'temperature'] = fill['temperature'].to_numpy()
+            df.loc[missing, 'rainfall'] = fill['rainfall'].to_numpy()
+    df['rainfall'] = df['rainfall'].fillna(0.0)
+    return df.dropna(subset=['temperature'])
 
 # --- 신규/수정된 핵심 함수들 ---
 
@@ -182,13 +256,11 @@ def train_model_for_category(mid_code: str, training_df: pd.DataFrame, model_dir
         logger.warning(f"[{mid_code}] 학습 데이터가 7일 미만({len(training_df)}일)이므로 모델을 학습하지 않습니다.")
         return
 
-    # 학습 데이터 기간에 대한 날씨 정보 가져오기
-    weather_df = get_weather_data(training_df['date'].tolist())
-    if weather_df.empty:
+    # 학습 데이터 기간의 날씨 정보 (weather_daily 우선, 없는 날짜만 조회)
+    df = attach_weather(training_df)
+    if df.empty:
         logger.error(f"[{mid_code}] 학습 기간의 날씨 데이터를 가져올 수 없어 모델 학습을 중단합니다.")
         return
-        
-    df = pd.merge(training_df, weather_df, on='date')
 
     target = 'true_demand'
     X = df[features].astype('float32')
@@ -242,7 +314,7 @@ def predict_sales_for_tomorrow(mid_code: str, latest_data_df: pd.DataFrame, mode
         'weekday': tomorrow.weekday(),
         'month': tomorrow.month,
         'week_of_year': tomorrow.isocalendar()[1],
-        'is_holiday': int(tomorrow in holidays.KR()),
+        'is_holiday': holiday_code(tomorrow),
         'temperature': tomorrow_weather['temperature'].iloc[0],
         'rainfall': tomorrow_weather['rainfall'].iloc[0],
         'total_stock': current_stock,
@@ -263,12 +335,12 @@ def predict_sales_for_tomorrow(mid_code: str, latest_data_df: pd.DataFrame, mode
 def recommend_product_mix(db_path: Path, mid_code: str, predicted_sales: float) -> list[dict[str, any]]:
     if not db_path.exists():
         return []
-    with sqlite3.connect(db_path) as conn:
+    with get_connection(db_path, SALES) as conn:
         query = "SELECT product_code, product_name, SUM(sales) as total_sales FROM mid_sales WHERE mid_code = ? GROUP BY product_code, product_name HAVING SUM(sales) > 0"
         sales_by_product = pd.read_sql(query, conn, params=(mid_code,))
         lookback_days = 7
         start_date = (datetime.now() - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
-        stockout_query = "SELECT product_code, SUM(CASE WHEN stock = 0 THEN 1 ELSE 0 END) AS stockout_count, COUNT(*) AS total_days FROM mid_sales WHERE mid_code = ? AND DATE(collected_at) >= ? GROUP BY product_code"
+        stockout_query = "SELECT product_code, SUM(CASE WHEN stock = 0 THEN 1 ELSE 0 END) AS stockout_count, COUNT(*) AS total_days FROM mid_sales WHERE mid_code = ? AND sale_date >= ? GROUP BY product_code"
         stockout_df = pd.read_sql(stockout_query, conn, params=(mid_code, start_date))
     if sales_by_product.empty:
         return []
@@ -356,26 +428,19 @@ def recommend_product_mix(db_path: Path, mid_code: str, predicted_sales: float)
 def init_prediction_db(db_path: Path):
     """예측 결과를 저장할 DB와 테이블을 초기화합니다."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(db_path) as conn:
-        conn.execute(
-            """
-        CREATE TABLE IF NOT EXISTS category_predictions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            prediction_date TEXT, target_date TEXT, mid_code TEXT,
-            mid_name TEXT, predicted_sales REAL,
-            UNIQUE(target_date, mid_code)
-        )"""
-        )
-        conn.execute(
-            """
-        CREATE TABLE IF NOT EXISTS category_prediction_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            prediction_id INTEGER, product_code TEXT, product_name TEXT,
-            recommended_quantity INTEGER,
-            FOREIGN KEY (prediction_id) REFERENCES category_predictions (id)
-        )"""
-        )
-        conn.commit()
+    get_connection(db_path, PREDICTIONS)
+
+_UPSERT_PREDICTION_SQL = """
+INSERT INTO category_predictions (prediction_date, target_date, mid_code, mid_name, predicted_sales)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (target_date, mid_code) DO UPDATE SET
+    prediction_date = excluded.prediction_date,
+    mid_name = excluded.mid_name,
+    predicted_sales = excluded.predicted_sales
+"""
+# RETURNING은 SQLite 3.35 이상에서만 동작하므로(배포 이미지는 3.34) id는 따로 조회합니다.
+_SELECT_PREDICTION_ID_SQL = "SELECT id FROM category_predictions WHERE target_date = ? AND mid_code = ?"
+
 
 def run_all_category_predictions(sales_db_path: Path):
     """(수정됨) 모든 중분류에 대해 '예측'만 실행하고 결과를 DB에 저장합니다."""
@@ -387,35 +452,39 @@ def run_all_category_predictions(sales_db_path: Path):
     logger = get_logger(__name__, level=logging.DEBUG, store_id=store_name)
     logger.info(f"[{store_name}] 모든 카테고리 '예측' 시작...")
 
-    with sqlite3.connect(sales_db_path) as conn:
+    with get_connection(sales_db_path) as conn:
         mid_categories = pd.read_sql("SELECT DISTINCT mid_code, mid_name FROM mid_sales", conn)
 
     prediction_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     target_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
 
-    with sqlite3.connect(prediction_db_path) as conn:
+    # 모든 중분류의 특성을 한 번에 만들어 두고 카테고리별로 꺼내 씁니다.
+    features_by_category = get_training_data_for_all_categories(sales_db_path)
+
+    with get_connection(prediction_db_path) as conn:
         cursor = conn.cursor()
         for index, row in mid_categories.iterrows():
             mid_code = row['mid_code']
             mid_name = row['mid_name']
 
             # 예측에는 전체 데이터가 아닌, 최신 재고량 파악을 위한 데이터만 필요합니다.
-            # 여기서는 간단하게 get_training_data_for_category를 재사용합니다.
-            latest_data = get_training_data_for_category(sales_db_path, mid_code)
+            latest_data = features_by_category.get(mid_code, pd.DataFrame())
             
             # '예측' 함수 호출
             predicted_sales = predict_sales_for_tomorrow(
                 mid_code, latest_data, model_dir=model_dir
             )
 
+            # (target_date, mid_code)가 같으면 기존 행을 갱신해 prediction id를 유지합니다.
             cursor.execute(
-                "INSERT OR REPLACE INTO category_predictions (prediction_date, target_date, mid_code, mid_name, predicted_sales) VALUES (?, ?, ?, ?, ?)",
+                _UPSERT_PREDICTION_SQL,
                 (prediction_date, target_date, mid_code, mid_name, predicted_sales),
             )
-            prediction_id = cursor.lastrowid
+            prediction_id = cursor.execute(_SELECT_PREDICTION_ID_SQL, (target_date, mid_code)).fetchone()[0]
 
-            # 예측 판매량 기반으로 상품 조합 추천
+            # 예측 판매량 기반으로 상품 조합 추천. 이전 실행의 추천 상품은 같은 트랜잭션에서 교체합니다.
             recommended_mix = recommend_product_mix(sales_db_path, mid_code, predicted_sales)
+            cursor.execute("DELETE FROM category_prediction_items WHERE prediction_id = ?", (prediction_id,))
             if recommended_mix:
                 item_insert_sql = "INSERT INTO category_prediction_items (prediction_id, product_code, product_name, recommended_quantity) VALUES (?, ?, ?, ?)"
                 items_to_insert = [
@@ -0,0 +1,93 @@
+import threading
+
+import pandas as pd
+
+from utils import api_collector
+
+
+def test_fetch_sales_data_concurrently_yields_every_date(monkeypatch):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fake_fetch(session, store_code, date_str):
+        # 세 요청이 동시에 진행 중이어야 barrier를 통과할 수 있다.
+        barrier.wait()
+        return pd.DataFrame([{"date": date_str, "store": store_code}])
+
+    monkeypatch.setattr(api_collector, "fetch_sales_data", fake_fetch)
+
+    dates = ["20250101", "20250102", "20250103"]
+    results = dict(
+        api_collector.fetch_sales_data_concurrently(object(), "S1", dates, max_workers=3)
+    )
+
+    assert sorted(results) == dates
+    assert all(df["store"].iloc[0] == "S1" for df in results.values())
+
+
+def test_fetch_sales_data_concurrently_serial_keeps_order(monkeypatch):
+    calls = []
+
+    def fake_fetch(session, store_code, date_str):
+        calls.append(date_str)
+        return None
+
+    monkeypatch.setattr(api_collector, "fetch_sales_data", fake_fetch)
+
+    dates = ["20250103", "20250101", "20250102"]
+    results = list(
+        api_collector.fetch_sales_data_concurrently(object(), "S1", dates, max_workers=1)
+    )
+
+    assert calls == dates
+    assert results == [(d, None) for d in dates]
+
+
+def test_fetch_sales_data_concurrently_survives_worker_error(monkeypatch):
+    def fake_fetch(session, store_code, date_str):
+        if date_str == "20250102":
+            raise RuntimeError("boom")
+        return pd.DataFrame([{"date": date_str}])
+
+    monkeypatch.setattr(api_collector, "fetch_sales_data", fake_fetch)
+
+    results = dict(
+        api_collector.fetch_sales_data_concurrently(
+            object(), "S1", ["20250101", "20250102"], max_workers=2
+        )
+    )
+
+    assert results["20250102"] is None
+    assert not results["20250101"].empty
+
+
+class _FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("not json")
+        return self._body
+
+
+class _FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(kwargs)
+        return self.response
+
+
+def test_validate_session_asks_for_an_empty_day_without_following_redirects():
+    session = _FakeSession(_FakeResponse(200, {"ds_list": []}))
+    assert api_collector.validate_session(session, "S1")
+    call = session.calls[0]
+    assert call["allow_redirects"] is False
+    tomorrow = (pd.Timestamp.now() + pd.Timedelta(days=1)).strftime("%Y%m%d")
+    assert f'"send_date":"{tomorrow}"' in call["data"]["_dataSet_"]
+
+    assert not api_collector.validate_session(_FakeSession(_FakeResponse(302, None)), "S1")
+    assert not api_collector.validate_session(_FakeSession(_FakeResponse(200, None)), "S1")
@@ -0,0 +1,28 @@
+import sqlite3
+from datetime import date
+
+from utils import calendar_util
+
+
+def test_holiday_codes_follow_saturday_rule():
+    assert calendar_util.holiday_code(date(2025, 8, 14)) == 0  # 목요일
+    assert calendar_util.holiday_code(date(2025, 8, 15)) == 1  # 광복절(금)
+    assert calendar_util.holiday_code(date(2025, 8, 16)) == 2  # 토요일
+    assert calendar_util.holiday_code(date(2025, 8, 17)) == 0  # 일요일
+
+    features = calendar_util.calendar_features(["2025-08-16", "2025-08-14", "2025-08-15"])
+    assert features["is_holiday"].tolist() == [2, 0, 1]
+    assert features["weekday"].tolist() == [5, 3, 4]
+    assert features["week_of_year"].tolist() == [33, 33, 33]
+
+
+def test_init_calendar_populates_range_once(tmp_path):
+    conn = sqlite3.connect(tmp_path / "cal.db")
+    calendar_util.init_calendar(conn, 2024, 2025)
+    assert conn.execute("SELECT COUNT(*) FROM calendar").fetchone()[0] == 366 + 365
+    assert conn.execute("SELECT is_holiday, month FROM calendar WHERE date = '2025-08-15'").fetchone() == (1, 8)
+
+    conn.execute("DELETE FROM calendar WHERE date = '2024-06-01'")
+    calendar_util.init_calendar(conn, 2024, 2025)
+    assert conn.execute("SELECT COUNT(*) FROM calendar").fetchone()[0] == 366 + 365 - 1
+    conn.close()
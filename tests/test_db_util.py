@@ -160,3 +160,194 @@ def test_write_sales_data_handles_soldout(tmp_path):
     updated = cur.fetchone()[0]
     conn.close()
     assert updated == 2
+
+
+def test_write_sales_data_batches_upsert_and_dedupes_legacy_rows(tmp_path, monkeypatch):
+    db_path = tmp_path / "sales.db"
+    monkeypatch.setattr(
+        db_util, "get_weather_data", lambda dates: pd.DataFrame([{"temperature": 9.0, "rainfall": 0.0}])
+    )
+    # 인덱스가 생기기 전의 DB: 같은 날짜·상품이 두 번 저장되어 있음
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE mid_sales (id INTEGER PRIMARY KEY AUTOINCREMENT, collected_at TEXT, mid_code TEXT, "
+        "mid_name TEXT, product_code TEXT, product_name TEXT, sales INTEGER, order_cnt INTEGER, "
+        "purchase INTEGER, disposal INTEGER, stock INTEGER, soldout INTEGER, weekday INTEGER, month INTEGER, "
+        "week_of_year INTEGER, is_holiday INTEGER, temperature REAL, rainfall REAL, UNIQUE(collected_at, product_code))"
+    )
+    conn.executemany(
+        "INSERT INTO mid_sales (collected_at, product_code, sales, temperature) VALUES (?, ?, ?, ?)",
+        [("2025-08-01 00:00:00", "111", 1, 20.0), ("2025-08-01 09:00:00", "111", 2, 21.0)],
+    )
+    conn.commit()
+    conn.close()
+
+    records = [
+        {"productCode": "111", "sales": 4, "stock": 0},
+        {"productCode": "222", "sales": 1},
+        {"productCode": "333"},
+    ]
+    assert db_util.write_sales_data(records, db_path, "20250801") == 2
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT product_code, sales, soldout, temperature FROM mid_sales ORDER BY product_code"
+    ).fetchall()
+    conn.close()
+    assert rows == [("111", 4, 1, 21.0), ("222", 1, 0, 9.0)]
+
+
+def test_write_sales_data_refreshes_daily_category_aggregate(tmp_path, monkeypatch):
+    db_path = tmp_path / "sales.db"
+    monkeypatch.setattr(
+        db_util, "get_weather_data", lambda dates: pd.DataFrame([{"temperature": 9.0, "rainfall": 0.0}])
+    )
+    records = [
+        {"midCode": "001", "productCode": "111", "sales": 2, "stock": 1},
+        {"midCode": "001", "productCode": "222", "sales": 3, "stock": 0},
+        {"midCode": "002", "productCode": "333", "sales": 5, "stock": 4},
+    ]
+    db_util.write_sales_data(records, db_path, "20250801")
+    db_util.write_sales_data(records[:1], db_path, "20250802")
+    # 같은 날짜 재수집은 그 날짜의 합계만 다시 계산합니다.
+    db_util.write_sales_data([{**records[0], "sales": 7}], db_path, "20250801")
+
+    conn = sqlite3.connect(db_path)
+    agg = conn.execute(
+        "SELECT sale_date, mid_code, total_sales, total_stock, total_soldout FROM mid_daily_agg ORDER BY 1, 2"
+    ).fetchall()
+    dirty = conn.execute("SELECT COUNT(*) FROM mid_daily_agg_dirty").fetchone()[0]
+    conn.close()
+    assert agg == [
+        ("2025-08-01", "001", 10, 1, 1),
+        ("2025-08-01", "002", 5, 4, 0),
+        ("2025-08-02", "001", 2, 1, 0),
+    ]
+    assert dirty == 0
+
+
+def test_check_dates_exist_migrates_legacy_db_to_sale_date_index(tmp_path):
+    db_path = tmp_path / "sales.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE mid_sales (id INTEGER PRIMARY KEY AUTOINCREMENT, collected_at TEXT, "
+        "mid_code TEXT, product_code TEXT, sales INTEGER)"
+    )
+    conn.execute("INSERT INTO mid_sales (collected_at, product_code, sales) VALUES ('2025-08-01 09:00:00', '111', 1)")
+    conn.commit()
+    conn.close()
+
+    assert db_util.check_dates_exist(db_path, ["2025-08-01", "2025-08-02"]) == ["2025-08-02"]
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT sale_date FROM mid_sales").fetchone() == ("2025-08-01",)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT SUM(sales) FROM mid_sales WHERE sale_date = '2025-08-01'"
+    ).fetchall()
+    conn.close()
+    assert any("idx_sales_fact" in row[3] for row in plan)
+
+
+def test_plan_collection_dates_refetches_mutable_and_backfills_missing(tmp_path):
+    from datetime import date
+
+    db_path = tmp_path / "sales.db"
+    conn = db_util.init_db(db_path)
+    for day in ("2025-08-01", "2025-08-02", "2025-08-04", "2025-08-07"):
+        conn.execute(
+            "INSERT INTO mid_sales (collected_at, product_code, sales) VALUES (?, ?, ?)",
+            (f"{day} 00:00:00", "111", 1),
+        )
+    conn.commit()
+    conn.close()
+
+    planned = db_util.plan_collection_dates(
+        db_path, date(2025, 8, 8), lookback_days=8, mutable_days=3
+    )
+
+    # 08-06~08-08은 항상 재수집, 08-01~08-05 중 없는 날짜만 보충
+    assert planned == ["20250803", "20250805", "20250806", "20250807", "20250808"]
+
+
+def test_payload_fingerprint_ignores_row_and_key_order(tmp_path):
+    a = [{"ITEM_CD": "1", "SALE_QTY": 2}, {"ITEM_CD": "2", "SALE_QTY": 0}]
+    b = [{"SALE_QTY": 0, "ITEM_CD": "2"}, {"SALE_QTY": 2, "ITEM_CD": "1"}]
+    digest = db_util.payload_fingerprint(a)
+    assert digest == db_util.payload_fingerprint(b)
+    assert digest != db_util.payload_fingerprint([{"ITEM_CD": "1", "SALE_QTY": 3}])
+
+    db_path = tmp_path / "sales.db"
+    assert not db_util.is_payload_unchanged(db_path, "S1", "20250801", digest)
+    db_util.record_payload_fingerprint(db_path, "S1", "20250801", digest)
+    assert db_util.is_payload_unchanged(db_path, "S1", "20250801", digest)
+    assert not db_util.is_payload_unchanged(db_path, "S1", "20250802", digest)
+    assert not db_util.is_payload_unchanged(db_path, "S2", "20250801", digest)
+
+
+def test_write_sales_data_reupserts_many_rows_of_one_day(tmp_path, monkeypatch):
+    db_path = tmp_path / "sales.db"
+    monkeypatch.setattr(
+        db_util, "get_weather_data", lambda dates: pd.DataFrame([{"temperature": 9.0, "rainfall": 0.0}])
+    )
+    records = [{"midCode": "001", "productCode": f"{i:03d}", "sales": 1, "stock": 1} for i in range(5)]
+    db_util.write_sales_data(records, db_path, "20250801")
+    # 같은 날짜 여러 행이 한 UPSERT 문장의 UPDATE 경로를 타도 변경 표시가 충돌하지 않아야 합니다.
+    db_util.write_sales_data([{**r, "sales": 3} for r in records], db_path, "20250801")
+
+    conn = sqlite3.connect(db_path)
+    total = conn.execute("SELECT total_sales FROM mid_daily_agg WHERE sale_date = '2025-08-01'").fetchone()
+    conn.close()
+    assert total == (15,)
+
+
+def test_ingest_sales_frame_is_idempotent_and_counts_changes(tmp_path):
+    db_path = tmp_path / "sales.db"
+    api_rows = pd.DataFrame(
+        [
+            {"MID_CD": "001", "MID_NM": "도시락", "ITEM_CD": "111", "ITEM_NM": "A", "SALE_QTY": "2",
+             "ORD_QTY": "1", "BUY_QTY": "3", "DISUSE_QTY": "0", "STOCK_QTY": "0"},
+            {"MID_CD": "001", "MID_NM": "도시락", "ITEM_CD": "222", "ITEM_NM": "B", "SALE_QTY": "1",
+             "ORD_QTY": "0", "BUY_QTY": "1", "DISUSE_QTY": "0", "STOCK_QTY": "4"},
+            {"MID_CD": "002", "MID_NM": "김밥", "ITEM_CD": None, "ITEM_NM": "X", "SALE_QTY": "9"},
+        ]
+    )
+
+    conn = db_util.init_db(db_path)
+    with conn:
+        first = db_util.ingest_sales_frame(conn, api_rows, "20250801")
+    with conn:
+        again = db_util.ingest_sales_frame(conn, api_rows, "20250801")
+    changed_rows = api_rows.iloc[:1].assign(SALE_QTY="5")
+    with conn:
+        changed = db_util.ingest_sales_frame(conn, changed_rows, "20250801")
+    rows = conn.execute(
+        "SELECT sale_date, mid_code, product_code, product_name, sales, stock, soldout, is_holiday FROM mid_sales"
+    ).fetchall()
+    total = conn.execute("SELECT total_sales FROM mid_daily_agg WHERE sale_date = '2025-08-01'").fetchone()
+    conn.close()
+
+    assert first == {"new": 2, "changed": 0, "unchanged": 0, "removed": 0}
+    assert again == {"new": 0, "changed": 0, "unchanged": 2, "removed": 0}
+    assert changed == {"new": 0, "changed": 1, "unchanged": 0, "removed": 1}
+    assert rows == [("2025-08-01", "001", "111", "A", 5, 0, 1, 0)]
+    assert total == (5,)
+
+
+def test_update_past_holiday_data_extends_an_outdated_calendar(tmp_path):
+    db_path = tmp_path / "sales.db"
+    conn = db_util.init_db(db_path)
+    # 오래전에 마이그레이션되어 calendar가 최근 날짜를 덮지 못하는 DB
+    conn.execute("DELETE FROM calendar WHERE date >= '2025-01-01'")
+    conn.execute(
+        "INSERT INTO mid_sales (collected_at, mid_code, product_code, sales, is_holiday) "
+        "VALUES ('2025-08-16 00:00:00', '001', '111', 1, 0)"
+    )
+    conn.commit()
+    conn.close()
+
+    db_util.update_past_holiday_data(db_path)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT is_holiday FROM mid_sales").fetchone() == (2,)  # 토요일
+    assert conn.execute("SELECT MAX(date) FROM calendar").fetchone()[0] >= f"{datetime.now().year + 1}-12-31"
+    conn.close()
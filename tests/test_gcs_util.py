@@ -0,0 +1,163 @@
+from pathlib import Path
+
+from google.api_core import exceptions as gcs_exceptions
+
+from utils import gcs_util
+
+
+class FakeBlob:
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.downloads = 0
+        self.uploads = 0
+        self._load()
+
+    def _load(self):
+        entry = self.store.get(self.name)
+        self.generation = entry["generation"] if entry else None
+        self.crc32c = entry["crc32c"] if entry else None
+        self.md5_hash = entry["md5_hash"] if entry else None
+        self.size = len(entry["data"]) if entry else None
+        self.metadata = entry.get("metadata") if entry else None
+        self.content_encoding = entry.get("content_encoding") if entry else None
+
+    def download_to_filename(self, filename, if_generation_match=None, raw_download=False):
+        self.downloads += 1
+        assert raw_download or not self.content_encoding
+        with open(filename, "wb") as f:
+            f.write(self.store[self.name]["data"])
+
+    def upload_from_filename(self, filename, if_generation_match=None, checksum=None):
+        self.uploads += 1
+        current = self.store.get(self.name)
+        # GCS 조건부 쓰기: 0은 "객체가 없을 때만", 그 외에는 generation이 같을 때만
+        if if_generation_match is not None and (current["generation"] if current else 0) != if_generation_match:
+            raise gcs_exceptions.PreconditionFailed("generation mismatch")
+        with open(filename, "rb") as f:
+            data = f.read()
+        self.store[self.name] = {
+            "data": data,
+            "generation": (current["generation"] if current else 0) + 1,
+            "metadata": self.metadata,
+            "content_encoding": self.content_encoding,
+            **gcs_util.file_checksums(Path(filename)),
+        }
+        self._load()
+
+
+class FakeBucket:
+    def __init__(self):
+        self.store = {}
+        self.blobs = []
+
+    def blob(self, name):
+        blob = FakeBlob(self.store, name)
+        self.blobs.append(blob)
+        return blob
+
+    def get_blob(self, name):
+        return self.blob(name) if name in self.store else None
+
+
+def test_sync_skips_unchanged_transfers(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(gcs_util, "_bucket", lambda name: bucket)
+    local = tmp_path / "hoban.db"
+    local.write_bytes(b"v1")
+
+    assert gcs_util.upload_to_gcs("b", local, "db/hoban.db")
+    assert gcs_util.upload_to_gcs("b", local, "db/hoban.db")  # 변경 없음 -> 건너뜀
+    assert sum(b.uploads for b in bucket.blobs) == 1
+
+    assert gcs_util.download_from_gcs("b", "db/hoban.db", local)  # 같은 generation -> 건너뜀
+    assert sum(b.downloads for b in bucket.blobs) == 0
+
+    local.write_bytes(b"v2-local-edit")
+    assert gcs_util.download_from_gcs("b", "db/hoban.db", local)  # 로컬이 달라졌으면 받음
+    assert local.read_bytes() == b"v1"
+    assert sum(b.downloads for b in bucket.blobs) == 1
+
+    local.write_bytes(b"v3")
+    assert gcs_util.upload_to_gcs("b", local, "db/hoban.db")
+    assert bucket.store["db/hoban.db"]["generation"] == 2
+    assert gcs_util._read_sidecar(local)["generation"] == 2
+
+
+def test_upload_compresses_and_download_restores_content(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(gcs_util, "_bucket", lambda name: bucket)
+    local = tmp_path / "hoban.db"
+    content = "도시락 삼각김밥 샌드위치\n".encode("utf-8") * 2000
+    local.write_bytes(content)
+
+    assert gcs_util.upload_to_gcs("b", local, "db/hoban.db", codec="gzip")
+    stored = bucket.store["db/hoban.db"]
+    assert stored["content_encoding"] == "gzip"
+    assert stored["metadata"]["raw-size"] == str(len(content))
+    assert len(stored["data"]) * 5 < len(content)
+    assert not list(tmp_path.glob("*.upload*"))
+
+    other = tmp_path / "restored" / "hoban.db"
+    assert gcs_util.download_from_gcs("b", "db/hoban.db", other)
+    assert other.read_bytes() == content
+    # 압축 전 체크섬이 같으므로 다시 받지 않습니다.
+    other.touch()
+    assert gcs_util.download_from_gcs("b", "db/hoban.db", other)
+    assert sum(b.downloads for b in bucket.blobs) == 1
+
+    # 압축 메타데이터가 없는 기존 객체는 그대로 받습니다.
+    bucket.store["db/legacy.db"] = {"data": b"plain", "generation": 1, "crc32c": None, "md5_hash": None}
+    legacy = tmp_path / "legacy.db"
+    assert gcs_util.download_from_gcs("b", "db/legacy.db", legacy)
+    assert legacy.read_bytes() == b"plain"
+
+
+def test_download_rejects_corrupt_compressed_object(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(gcs_util, "_bucket", lambda name: bucket)
+    local = tmp_path / "hoban.db"
+    local.write_bytes(b"v1" * 100)
+    assert gcs_util.upload_to_gcs("b", local, "db/hoban.db", codec="gzip")
+    bucket.store["db/hoban.db"]["metadata"]["raw-crc32c"] = "AAAAAA=="
+
+    other = tmp_path / "other.db"
+    assert not gcs_util.download_from_gcs("b", "db/hoban.db", other)
+    assert not other.exists()
+
+
+def test_upload_without_sidecar_never_replaces_an_existing_object(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(gcs_util, "_bucket", lambda name: bucket)
+    history = tmp_path / "history.db"
+    history.write_bytes(b"full history")
+    assert gcs_util.upload_to_gcs("b", history, "db/hoban.db", codec="none")
+
+    # 다운로드에 실패해 sidecar 없이 새로 만든 DB
+    empty = tmp_path / "empty" / "hoban.db"
+    empty.parent.mkdir()
+    empty.write_bytes(b"")
+    assert not gcs_util.upload_to_gcs("b", empty, "db/hoban.db", codec="none")
+    assert bucket.store["db/hoban.db"]["data"] == b"full history"
+
+
+def test_download_reports_missing_object_separately(tmp_path, monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(gcs_util, "_bucket", lambda name: bucket)
+    transfer = {}
+
+    assert not gcs_util.download_from_gcs("b", "db/missing.db", tmp_path / "missing.db", transfer=transfer)
+    assert transfer["missing"]
+
+
+def test_upload_defaults_to_gzip_even_with_zstandard_installed(tmp_path, monkeypatch):
+    from utils import compression
+
+    bucket = FakeBucket()
+    monkeypatch.setattr(gcs_util, "_bucket", lambda name: bucket)
+    monkeypatch.setattr(compression, "zstandard", object())
+    local = tmp_path / "hoban.db"
+    local.write_bytes(b"v1" * 100)
+
+    assert gcs_util.upload_to_gcs("b", local, "db/hoban.db")
+    assert bucket.store["db/hoban.db"]["content_encoding"] == "gzip"
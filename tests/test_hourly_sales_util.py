@@ -0,0 +1,45 @@
+import sqlite3
+
+from utils.hourly_sales_util import write_hourly_data
+
+
+def _hourly_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT hour, product_code, sales_inc, stock_inc, stock FROM hourly_sales ORDER BY hour, product_code"
+        ).fetchall()
+
+
+def test_write_hourly_data_stores_only_increments(tmp_path):
+    db_path = tmp_path / "hourly.db"
+    first = [
+        {"productCode": "A", "midCode": "001", "sales": 2, "stock": 5},
+        {"productCode": "B", "midCode": "001", "SALE_QTY": 1, "STOCK_QTY": 3},
+    ]
+    assert write_hourly_data(first, "2025-08-01 10:00", db_path) == 2
+
+    second = [
+        {"productCode": "A", "midCode": "001", "sales": 4, "stock": 3},
+        {"productCode": "B", "midCode": "001", "SALE_QTY": 1, "STOCK_QTY": 3},
+        {"productCode": "C", "midCode": "002", "sales": 0, "stock": 0},
+    ]
+    assert write_hourly_data(second, "2025-08-01 11:00", db_path) == 1
+
+    assert _hourly_rows(db_path) == [
+        ("10", "A", 2, 5, 5),
+        ("10", "B", 1, 3, 3),
+        ("11", "A", 2, -2, 3),
+    ]
+
+
+def test_write_hourly_data_diffs_repeated_product_against_earlier_record(tmp_path):
+    db_path = tmp_path / "hourly.db"
+    records = [
+        {"productCode": "A", "midCode": "001", "sales": 1},
+        {"productCode": "A", "midCode": "001", "sales": 3},
+    ]
+    assert write_hourly_data(records, "2025-08-01 10:00", db_path) == 2
+    # 같은 키는 마지막 레코드가 남고, 증가분은 앞 레코드 대비로 계산됨
+    assert _hourly_rows(db_path) == [("10", "A", 2, 0, 0)]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT sales FROM daily_snapshot WHERE product_code = 'A'").fetchone() == (3,)
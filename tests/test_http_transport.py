@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from utils import http_transport
+
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(http_transport.time, "monotonic", lambda: now[0])
+    breaker = http_transport.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    now[0] += 10
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    # 반개방 상태에서는 탐색 요청 하나만 통과시킨다.
+    assert not breaker.allow_request()
+
+    # 반개방 상태에서 실패하면 즉시 다시 열린다.
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 10
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_circuit_breaker_replaces_a_probe_that_never_reports(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(http_transport.time, "monotonic", lambda: now[0])
+    breaker = http_transport.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    now[0] += 10
+    assert breaker.allow_request()
+    now[0] += 5
+    assert not breaker.allow_request()
+    now[0] += 5
+    assert breaker.allow_request()
+
+
+def test_instrumented_session_records_latency_and_fails_fast():
+    breaker = http_transport.CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    stats = http_transport.RequestStats()
+    session = http_transport.InstrumentedSession(http_transport.build_adapter(), breaker, stats)
+
+    assert session.get_adapter("https://example.com") is session.adapters["https://"]
+    assert session.headers["Accept-Encoding"] == "gzip, deflate"
+
+    with patch.object(
+        requests.Session, "request", side_effect=requests.exceptions.ConnectionError("down")
+    ) as sent:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            session.post("https://example.com/api.do")
+        with pytest.raises(http_transport.CircuitOpenError):
+            session.post("https://example.com/api.do")
+
+    assert sent.call_count == 1
+    snapshot = stats.snapshot()["/api.do"]
+    assert snapshot["count"] == 1 and snapshot["errors"] == 1
+
+
+def test_create_session_shares_one_adapter():
+    first = http_transport.create_session()
+    second = http_transport.create_session()
+    assert first.adapters["https://"] is second.adapters["https://"]
+    assert first.breaker is second.breaker
+
+
+def test_session_stats_are_per_session_and_roll_up():
+    first = http_transport.create_session()
+    second = http_transport.create_session()
+    before = http_transport.get_request_stats().get("/stats.do", {}).get("count", 0)
+
+    first.stats.record("/stats.do", 0.1, ok=True)
+    second.stats.record("/stats.do", 0.2, ok=False)
+
+    assert first.stats.snapshot()["/stats.do"]["count"] == 1
+    assert second.stats.snapshot()["/stats.do"]["errors"] == 1
+    assert http_transport.get_request_stats()["/stats.do"]["count"] == before + 2
+
+
+def test_only_listed_post_endpoints_are_retried():
+    from utils.api_collector import API_URL, LOGIN_URL, new_session
+
+    session = new_session()
+
+    login_retry = session.get_adapter(LOGIN_URL).max_retries
+    query_retry = session.get_adapter(API_URL).max_retries
+    assert "GET" in login_retry.allowed_methods
+    assert "POST" not in login_retry.allowed_methods
+    assert "POST" in query_retry.allowed_methods
+    assert session.get_adapter(API_URL) is new_session().get_adapter(API_URL)
@@ -0,0 +1,112 @@
+import queue
+import sqlite3
+import threading
+
+import pytest
+
+from utils import ingest_queue
+from utils.sqlite_util import close_connections
+
+
+def _insert(conn, value):
+    conn.execute("INSERT INTO t (v) VALUES (?)", (value,))
+    return value
+
+
+def _fail(conn):
+    conn.execute("INSERT INTO t (v) VALUES (-1)")
+    raise ValueError("bad payload")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "ingest.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (v INTEGER)")
+    conn.commit()
+    conn.close()
+    yield path
+    close_connections()
+
+
+def test_writer_batches_producers_and_isolates_failures(db_path):
+    writer = ingest_queue.IngestWriter(db_path, commit_interval=5.0, max_batch=1000)
+
+    futures = []
+    lock = threading.Lock()
+
+    def produce(start):
+        for v in range(start, start + 10):
+            future = writer.submit(_insert, v)
+            with lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=produce, args=(i * 10,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    failed = writer.submit(_fail)
+    writer.close()
+
+    assert sorted(f.result() for f in futures) == list(range(40))
+    assert isinstance(failed.exception(), ValueError)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*), MIN(v) FROM t").fetchone() == (40, 0)
+    conn.close()
+    # 커밋 간격 안의 작업은 한 트랜잭션(배치)으로 묶입니다.
+    assert writer.stats == {"jobs": 41, "failed": 1, "batches": 1}
+    with pytest.raises(ingest_queue.WriterClosedError):
+        writer.submit(_insert, 99)
+
+
+def test_submit_blocks_when_queue_is_full(db_path):
+    release = threading.Event()
+
+    def slow(conn):
+        release.wait(5)
+
+    writer = ingest_queue.IngestWriter(db_path, max_pending=1, commit_interval=0.0)
+    writer.submit(slow)
+    writer.submit(_insert, 1)  # 큐를 채움 (writer는 slow 실행 중)
+    with pytest.raises(queue.Full):
+        writer.submit(_insert, 2, timeout=0.2)
+    release.set()
+    writer.flush(timeout=5)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT v FROM t").fetchall() == [(1,)]
+    conn.close()
+    writer.close()
+
+
+def test_dead_writer_fails_pending_jobs_instead_of_hanging(db_path, monkeypatch):
+    release = threading.Event()
+
+    def broken_connection(path):
+        release.wait(5)
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(ingest_queue, "get_connection", broken_connection)
+    writer = ingest_queue.IngestWriter(db_path, max_pending=1)
+    pending = writer.submit(_insert, 1)
+    blocked = []
+
+    def produce():
+        try:
+            blocked.append(writer.submit(_insert, 2))
+        except ingest_queue.WriterClosedError:
+            pass  # writer가 먼저 죽은 경우
+
+    producer = threading.Thread(target=produce)
+    producer.start()  # 큐가 가득 차 있어 writer가 죽을 때까지 대기
+    release.set()
+    producer.join(5)
+
+    assert not producer.is_alive()
+    for future in [pending, *blocked]:
+        with pytest.raises(ingest_queue.WriterClosedError) as excinfo:
+            future.result(timeout=5)
+        assert isinstance(excinfo.value.__cause__, sqlite3.OperationalError)
+    with pytest.raises(ingest_queue.WriterClosedError):
+        writer.submit(_insert, 3)
+    writer.close(timeout=5)
@@ -37,3 +37,31 @@ def test_json_logging_fields(tmp_path, monkeypatch):
     assert data["store_id"] == "store42"
     assert "timestamp" in data
 
+
+
+def test_redirect_log_file_moves_existing_handlers(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_FILE", str(tmp_path / "first.log"))
+    logger = log_util.get_logger("test_redirect")
+
+    target = tmp_path / "stores" / "hoban.log"
+    log_util.redirect_log_file(target)
+    logger.info("after redirect")
+    for h in logger.handlers:
+        h.flush()
+
+    file_handler = next(h for h in logger.handlers if isinstance(h, logging.FileHandler))
+    assert Path(file_handler.baseFilename) == target
+    assert "after redirect" in target.read_text(encoding="utf-8")
+
+
+def test_worker_process_does_not_truncate_inherited_log(tmp_path, monkeypatch):
+    log_file = tmp_path / "main.log"
+    log_file.write_text("parent line\n", encoding="utf-8")
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+    monkeypatch.setattr(log_util.multiprocessing, "parent_process", lambda: object())
+
+    logger = log_util.get_logger("test_worker_append")
+    for h in logger.handlers:
+        h.flush()
+
+    assert log_file.read_text(encoding="utf-8").startswith("parent line\n")
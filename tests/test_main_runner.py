@@ -0,0 +1,126 @@
+import logging
+import sqlite3
+
+import main
+from utils.storage import LocalStorage, TransferError
+
+
+def test_timed_stage_records_duration():
+    timings = {}
+    with main._timed_stage(timings, "collect"):
+        pass
+    assert set(timings) == {"collect"}
+    assert timings["collect"] >= 0.0
+
+
+def test_run_stores_sequential_collects_summaries(monkeypatch):
+    seen = []
+
+    def fake_run(store_name, store_config):
+        seen.append(store_name)
+        return {"store": store_name, "status": "ok", "stages": {"collect": 0.1}, "total": 0.1}
+
+    monkeypatch.setattr(main, "run_automation_for_store", fake_run)
+    stores = {"hoban": {}, "dongyang": {}}
+
+    summaries = main._run_stores(stores, 1, logging.getLogger("test"))
+
+    assert seen == ["hoban", "dongyang"]
+    assert [s["store"] for s in summaries] == ["hoban", "dongyang"]
+
+
+def test_log_run_summary_lists_stage_timings(caplog):
+    logger = logging.getLogger("test_summary")
+    with caplog.at_level(logging.INFO, logger="test_summary"):
+        main._log_run_summary(
+            logger,
+            [{"store": "hoban", "status": "ok", "stages": {"download": 1.5, "predict": 2.0}, "total": 3.5}],
+        )
+    assert "hoban: ok total=3.50s (download=1.50s, predict=2.00s)" in caplog.text
+
+
+def test_run_stores_pipelined_prefetches_next_store_during_prediction(monkeypatch):
+    events = []
+
+    class FakeRun:
+        def __init__(self, store_name, store_config):
+            self.store_name = store_name
+
+        def prepare(self):
+            events.append(("prepare", self.store_name))
+            return self.store_name != "broken"
+
+        def process(self, before_predict=None):
+            events.append(("collect", self.store_name))
+            before_predict()
+            events.append(("predict", self.store_name))
+
+        def finish(self):
+            events.append(("finish", self.store_name))
+            return {"store": self.store_name, "status": "ok", "stages": {}}
+
+    monkeypatch.setattr(main, "StoreRun", FakeRun)
+    stores = {"hoban": {}, "broken": {}, "dongyang": {}}
+
+    summaries = main._run_stores(stores, 1, logging.getLogger("test"), run_mode="pipelined")
+
+    assert [s["store"] for s in summaries] == ["hoban", "broken", "dongyang"]
+    # 다음 점포 준비는 현재 점포의 수집이 끝난 뒤, 예측과 겹쳐서 시작합니다.
+    assert events.index(("prepare", "broken")) > events.index(("collect", "hoban"))
+    # 준비에 실패한 점포는 건너뛰지만 그다음 점포는 그대로 진행합니다.
+    assert ("collect", "broken") not in events
+    assert ("collect", "dongyang") in events
+    assert events.count(("finish", "broken")) == 1
+
+
+class _FailingDownloadStorage(LocalStorage):
+    def __init__(self, root):
+        super().__init__(root)
+        self.uploads = []
+
+    def _download(self, key, dest, transfer):
+        raise TransferError(f"Failed to download {key}")
+
+    def _upload(self, src, key, transfer):
+        self.uploads.append(key)
+        return True
+
+
+def _store_config():
+    return {"db_file": "hoban.db", "store_code": "1", "credentials_env": {"id": "ID", "password": "PW"}}
+
+
+def test_failed_db_download_stops_the_run_before_upload(tmp_path, monkeypatch):
+    storage = _FailingDownloadStorage(tmp_path / "bucket")
+    monkeypatch.setattr(main, "CODE_OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(main, "open_storage", lambda config, base_dir=None: storage)
+    monkeypatch.setattr(main, "get_cached_session", lambda *args: object())
+
+    summary = main.run_automation_for_store("hoban", _store_config())
+
+    assert summary["status"] == "failed"
+    assert storage.uploads == []
+
+
+def test_missing_db_object_starts_a_new_db(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path / "bucket")
+    monkeypatch.setattr(main, "CODE_OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(main, "open_storage", lambda config, base_dir=None: storage)
+    monkeypatch.setattr(main, "get_cached_session", lambda *args: object())
+
+    assert main.StoreRun("hoban", _store_config()).prepare()
+
+
+def test_failed_db_upload_is_reported_in_the_summary(tmp_path, monkeypatch):
+    class RejectingStorage(LocalStorage):
+        def _upload(self, src, key, transfer):
+            return False
+
+    monkeypatch.setattr(main, "CODE_OUTPUT_DIR", tmp_path)
+    run = main.StoreRun("hoban", _store_config())
+    run.db_path.parent.mkdir(parents=True)
+    sqlite3.connect(run.db_path).close()
+    run.storage = RejectingStorage(tmp_path / "bucket")
+    run.summary["status"] = "ok"
+
+    assert run.finish()["status"] == "not_uploaded"
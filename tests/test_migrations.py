@@ -0,0 +1,168 @@
+import logging
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils import migrations, sales_schema
+
+
+def _indexes(conn, table):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,))}
+
+
+def test_legacy_sales_db_is_upgraded_once(tmp_path):
+    db_path = tmp_path / "hoban.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE mid_sales (id INTEGER PRIMARY KEY AUTOINCREMENT, collected_at TEXT, mid_code TEXT, "
+        "product_code TEXT, sales INTEGER, is_holiday INTEGER, UNIQUE(collected_at, product_code))"
+    )
+    conn.execute(
+        "INSERT INTO mid_sales (collected_at, mid_code, product_code, sales, is_holiday) "
+        "VALUES ('2025-08-16 00:00:00', '001', '111', 1, 0)"
+    )
+    conn.commit()
+    conn.close()
+
+    applied = migrations.migrate_db(db_path)
+    assert applied == [m.version for m in migrations.SALES_MIGRATIONS]
+    assert migrations.migrate_db(db_path) == []
+
+    conn = sqlite3.connect(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(mid_sales)")}
+    assert {"soldout", "soldout_since", "sale_date"} <= columns
+    assert {"idx_sales_fact_day_product", "idx_sales_fact_mid_date"} <= _indexes(conn, "sales_fact")
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'mid_sales'").fetchone() == ("view",)
+    # 토요일은 is_holiday=2로 백필됨
+    assert conn.execute("SELECT is_holiday FROM mid_sales").fetchone() == (2,)
+    assert conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] == len(migrations.SALES_MIGRATIONS)
+    conn.close()
+
+
+def test_mid_sales_is_split_into_dimensions_behind_a_view(tmp_path):
+    db_path = tmp_path / "hoban.db"
+    conn = sqlite3.connect(db_path)
+    migrations._create_mid_sales(conn)
+    conn.executemany(
+        "INSERT INTO mid_sales (collected_at, mid_code, mid_name, product_code, product_name, sales) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ("2025-08-01 00:00:00", "001", "도시락", "111", "옛 이름", 3),
+            ("2025-08-02 00:00:00", "001", "도시락", "111", "새 이름", 4),
+            ("2025-08-02 00:00:00", "002", "김밥", "222", "참치김밥", 1),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    migrations.migrate_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT product_code, product_name FROM products ORDER BY id").fetchall() == [
+        ("111", "새 이름"),
+        ("222", "참치김밥"),
+    ]
+    assert conn.execute("SELECT COUNT(*) FROM mid_categories").fetchone() == (2,)
+    fact_columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(sales_fact)")}
+    assert not {"mid_name", "product_name", "mid_code", "product_code"} & fact_columns
+    assert conn.execute(
+        "SELECT sale_date, mid_code, product_name, sales FROM mid_sales ORDER BY id"
+    ).fetchall() == [
+        ("2025-08-01", "001", "새 이름", 3),
+        ("2025-08-02", "001", "새 이름", 4),
+        ("2025-08-02", "002", "참치김밥", 1),
+    ]
+
+    # 뷰에 대한 쓰기는 트리거가 차원/팩트 테이블로 옮깁니다.
+    conn.execute(
+        "INSERT INTO mid_sales (collected_at, mid_code, mid_name, product_code, product_name, sales) "
+        "VALUES ('2025-08-03 00:00:00', '003', '음료', '333', '생수', 5)"
+    )
+    conn.execute("UPDATE mid_sales SET sales = 9 WHERE product_code = '111' AND sale_date = '2025-08-01'")
+    conn.execute("DELETE FROM mid_sales WHERE sale_date = '2025-08-02'")
+    assert conn.execute("SELECT product_code, sales FROM mid_sales ORDER BY id").fetchall() == [("111", 9), ("333", 5)]
+    assert conn.execute("SELECT COUNT(*) FROM sales_fact").fetchone() == (2,)
+    assert conn.execute("SELECT mid_name FROM mid_categories WHERE mid_code = '003'").fetchone() == ("음료",)
+    conn.close()
+
+
+def test_legacy_rows_without_product_code_are_reported(tmp_path, caplog):
+    db_path = tmp_path / "hoban.db"
+    conn = sqlite3.connect(db_path)
+    migrations._create_mid_sales(conn)
+    conn.executemany(
+        "INSERT INTO mid_sales (collected_at, mid_code, product_code, sales) VALUES (?, ?, ?, ?)",
+        [("2025-08-01 00:00:00", "001", "111", 3), ("2025-08-01 00:00:00", "001", None, 2)],
+    )
+    conn.commit()
+    conn.close()
+
+    with caplog.at_level(logging.WARNING):
+        migrations.migrate_db(db_path)
+
+    assert "product_code가 없는 mid_sales 1행" in caplog.text
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT product_code, sales FROM mid_sales").fetchall() == [("111", 3)]
+    conn.close()
+
+
+def test_legacy_split_aborts_when_rows_would_be_lost(tmp_path):
+    db_path = tmp_path / "hoban.db"
+    conn = sqlite3.connect(db_path)
+    migrations._create_mid_sales(conn)
+    conn.execute(
+        "INSERT INTO mid_sales (id, collected_at, mid_code, product_code, sales) "
+        "VALUES (1, '2025-08-01 00:00:00', '001', '111', 3)"
+    )
+    # 이전 변환이 중간에 멈춰 같은 id의 팩트 행이 이미 있는 경우
+    conn.executescript(sales_schema._CREATE_DIMENSIONS_SQL + sales_schema._CREATE_FACT_SQL)
+    conn.execute("INSERT INTO products (id, product_code) VALUES (1, '999')")
+    conn.execute("INSERT INTO sales_fact (id, collected_at, product_id, sales) VALUES (1, '2025-07-31 00:00:00', 1, 1)")
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(RuntimeError, match="1행"):
+        migrations.migrate_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'mid_sales'").fetchone() == ("table",)
+    assert conn.execute("SELECT COUNT(*) FROM mid_sales").fetchone() == (1,)
+    conn.close()
+
+
+def test_migrate_all_detects_db_kind(tmp_path):
+    sales_db = tmp_path / "dongyang.db"
+    prediction_db = tmp_path / "category_predictions_dongyang.db"
+
+    results = migrations.migrate_all([sales_db, prediction_db], workers=2)
+
+    assert results["dongyang.db"][-1] == migrations.SALES_MIGRATIONS[-1].version
+    assert results["category_predictions_dongyang.db"][-1] == migrations.PREDICTION_MIGRATIONS[-1].version
+    conn = sqlite3.connect(prediction_db)
+    assert "idx_prediction_items_prediction_id" in _indexes(conn, "category_prediction_items")
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'mid_sales'").fetchone() is None
+    conn.close()
+
+
+def test_pandas_created_sales_table_without_id_is_migrated(tmp_path):
+    db_path = tmp_path / "hoban.db"
+    conn = sqlite3.connect(db_path)
+    pd.DataFrame(
+        [
+            {"collected_at": "2025-08-01 00:00:00", "mid_code": "001", "product_code": "111", "sales": 1},
+            {"collected_at": "2025-08-01 09:00:00", "mid_code": "001", "product_code": "111", "sales": 2},
+            {"collected_at": "2025-08-02 09:00:00", "mid_code": "001", "product_code": "111", "sales": 5},
+        ]
+    ).to_sql("mid_sales", conn, index=False)
+    conn.close()
+
+    migrations.migrate_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    # 같은 판매일의 중복은 가장 최근 수집분만 남습니다.
+    assert conn.execute("SELECT sale_date, sales FROM mid_sales ORDER BY sale_date").fetchall() == [
+        ("2025-08-01", 2),
+        ("2025-08-02", 5),
+    ]
+    conn.close()
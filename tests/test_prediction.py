@@ -189,7 +189,7 @@ def test_run_for_db_paths_with_tuning(tmp_path, monkeypatch):
         )
         conn.commit()
 
-    def fake_get_training_data_for_category(db, mid):
+    def fake_training_frame():
         return pd.DataFrame(
             {
                 "date": [datetime(2024, 1, 1).date()],
@@ -210,18 +210,16 @@ def test_run_for_db_paths_with_tuning(tmp_path, monkeypatch):
             }
         )
 
-    def fake_get_weather_data(dates):
-        return pd.DataFrame(
-            {
-                "date": [datetime(2024, 1, 1).date()],
-                "temperature": [20.0],
-                "rainfall": [0.0],
-            }
-        )
+    def fake_get_training_data_for_all_categories(db):
+        return {mid: fake_training_frame() for mid in ("001", "002")}
+
+    def fake_attach_weather(training_df):
+        return training_df.assign(temperature=20.0, rainfall=0.0)
 
     call_order = []
 
     def fake_tune_model(mid, df, output_dir, prediction_db_path, error_threshold):
+        assert {"temperature", "rainfall"} <= set(df.columns) and "date" not in df.columns
         call_order.append(mid)
         if mid == "002":
             raise ValueError("fail")
@@ -230,9 +228,9 @@ def test_run_for_db_paths_with_tuning(tmp_path, monkeypatch):
     import prediction.main as pred_main
 
     monkeypatch.setattr(
-        pred_main, "get_training_data_for_category", fake_get_training_data_for_category
+        pred_main, "get_training_data_for_all_categories", fake_get_training_data_for_all_categories
     )
-    monkeypatch.setattr(pred_main, "get_weather_data", fake_get_weather_data)
+    monkeypatch.setattr(pred_main, "attach_weather", fake_attach_weather)
     monkeypatch.setattr(pred_main, "tune_model", fake_tune_model)
     monkeypatch.setattr(pred_main, "run_all_category_predictions", lambda db: None)
     pred_main.run_for_db_paths([sales_db], tune=True, model_dir=tmp_path)
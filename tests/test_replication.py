@@ -0,0 +1,123 @@
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils import replication
+from utils.db_util import ingest_sales_frame, init_db
+from utils.sqlite_util import close_connections
+from utils.storage import LocalStorage
+
+
+def _dump(db_path):
+    conn = sqlite3.connect(db_path)
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    dump = {t: sorted(conn.execute(f"SELECT * FROM {t}").fetchall(), key=repr) for t in tables}
+    conn.close()
+    return dump
+
+
+@pytest.fixture(autouse=True)
+def _close_pool():
+    yield
+    close_connections()
+
+
+def _insert(conn, day, code, sales):
+    conn.execute(
+        "INSERT INTO mid_sales (collected_at, mid_code, mid_name, product_code, product_name, sales) "
+        "VALUES (?, '001', '도시락', ?, '상품', ?)",
+        (f"{day} 00:00:00", code, sales),
+    )
+    conn.commit()
+
+
+def test_replicate_uploads_changesets_and_restores(tmp_path):
+    storage = LocalStorage(tmp_path / "bucket")
+    db_path = tmp_path / "hoban.db"
+    conn = init_db(db_path)
+    _insert(conn, "2025-08-01", "111", 1)
+
+    first = replication.replicate(db_path, storage, "replicas/hoban")
+    assert first["mode"] == "snapshot"
+    assert replication.replicate(db_path, storage, "replicas/hoban")["mode"] == "noop"
+
+    _insert(conn, "2025-08-02", "222", 2)
+    conn.execute("UPDATE sales_fact SET sales = 5 WHERE sale_date = '2025-08-01'")
+    conn.commit()
+    second = replication.replicate(db_path, storage, "replicas/hoban")
+    assert second["mode"] == "changeset"
+    assert second["bytes"] < first["bytes"]
+
+    conn.execute("DELETE FROM mid_sales WHERE sale_date = '2025-08-02'")
+    conn.commit()
+    assert replication.replicate(db_path, storage, "replicas/hoban")["mode"] == "changeset"
+
+    restored = tmp_path / "restore" / "hoban.db"
+    assert replication.restore(storage, "replicas/hoban", restored) == 3
+    assert _dump(restored) == _dump(db_path)
+    assert sqlite3.connect(restored).execute("SELECT product_code, sales FROM mid_sales").fetchall() == [("111", 5)]
+
+
+def test_schema_change_and_full_chain_take_a_new_snapshot(tmp_path):
+    storage = LocalStorage(tmp_path / "bucket")
+    db_path = tmp_path / "hoban.db"
+    conn = init_db(db_path)
+    replication.replicate(db_path, storage, "p", snapshot_every=1)
+
+    _insert(conn, "2025-08-01", "111", 1)
+    assert replication.replicate(db_path, storage, "p", snapshot_every=1)["mode"] == "changeset"
+    _insert(conn, "2025-08-02", "111", 1)
+    result = replication.replicate(db_path, storage, "p", snapshot_every=1)
+    assert result == {**result, "mode": "snapshot", "reason": "changeset chain full"}
+    assert storage.list("p/") == ["p/manifest.json", "p/snapshots/00000003.db.gz"]
+
+    conn.execute("CREATE TABLE extra (x INTEGER)")
+    conn.commit()
+    assert replication.replicate(db_path, storage, "p")["reason"] == "schema changed"
+
+
+def test_sync_local_copy_discards_unreplicated_writes(tmp_path):
+    storage = LocalStorage(tmp_path / "bucket")
+    db_path = tmp_path / "hoban.db"
+    conn = init_db(db_path)
+    _insert(conn, "2025-08-01", "111", 1)
+    replication.replicate(db_path, storage, "p")
+    expected = _dump(db_path)
+
+    _insert(conn, "2025-08-02", "222", 2)  # 실패한 실행이 남긴 쓰기
+    close_connections(db_path)
+    assert replication.sync_local_copy(db_path, storage, "p") == 1
+    assert _dump(db_path) == expected
+
+    other = tmp_path / "other" / "hoban.db"
+    other.parent.mkdir()
+    shutil.copyfile(db_path, other)
+    assert replication.sync_local_copy(other, storage, "p") == 1  # 로컬 replica 없음 -> 복원
+    assert _dump(other) == expected
+
+
+def test_restore_does_not_replay_trigger_side_effects(tmp_path):
+    storage = LocalStorage(tmp_path / "bucket")
+    db_path = tmp_path / "hoban.db"
+    conn = init_db(db_path)
+    day = pd.DataFrame([{"MID_CD": "001", "MID_NM": "도시락", "ITEM_CD": "111", "ITEM_NM": "A", "SALE_QTY": "2"}])
+    with conn:
+        ingest_sales_frame(conn, day, "20250801")
+    replication.replicate(db_path, storage, "p")
+
+    with conn:
+        ingest_sales_frame(conn, day.assign(SALE_QTY="4"), "20250801")
+        ingest_sales_frame(conn, day.assign(ITEM_CD="222"), "20250802")
+    assert conn.execute("SELECT COUNT(*) FROM mid_daily_agg_dirty").fetchone() == (0,)
+    assert replication.replicate(db_path, storage, "p")["mode"] == "changeset"
+
+    restored = tmp_path / "restore" / "hoban.db"
+    assert replication.restore(storage, "p", restored) == 2
+    assert _dump(restored) == _dump(db_path)
+    # 복원본이 곧 다음 replicate의 기준이므로, 다음 실행에 가짜 삭제가 생기면 안 됩니다.
+    close_connections()
+    assert replication.replicate(restored, storage, "p")["mode"] == "noop"
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+import requests
+
+from utils import session_cache
+
+cryptography = pytest.importorskip("cryptography")
+from cryptography.fernet import Fernet  # noqa: E402
+
+
+@pytest.fixture
+def cache_key(monkeypatch):
+    monkeypatch.setenv(session_cache.SESSION_CACHE_KEY_ENV, Fernet.generate_key().decode())
+
+
+def _logged_in_session() -> requests.Session:
+    session = requests.Session()
+    session.cookies.set("JSESSIONID", "abc", domain="www.bgfretail.com", path="/")
+    return session
+
+
+def test_cookies_round_trip_encrypted(tmp_path, cache_key):
+    db_path = tmp_path / "store.db"
+    assert session_cache.save_session_cookies(db_path, "hoban", _logged_in_session())
+
+    with sqlite3.connect(db_path) as conn:
+        stored = conn.execute("SELECT cookies FROM session_cookies").fetchone()[0]
+    assert b"abc" not in stored
+
+    cookies = session_cache.load_session_cookies(db_path, "hoban")
+    assert cookies[0]["name"] == "JSESSIONID" and cookies[0]["value"] == "abc"
+    assert session_cache.load_session_cookies(db_path, "hoban", max_age_hours=0) is None
+
+
+def test_cache_disabled_without_key(tmp_path, monkeypatch):
+    monkeypatch.delenv(session_cache.SESSION_CACHE_KEY_ENV, raising=False)
+    db_path = tmp_path / "store.db"
+    assert not session_cache.save_session_cookies(db_path, "hoban", _logged_in_session())
+    assert session_cache.load_session_cookies(db_path, "hoban") is None
+
+
+def test_get_cached_session_skips_login_when_valid(tmp_path, cache_key, monkeypatch):
+    db_path = tmp_path / "store.db"
+    session_cache.save_session_cookies(db_path, "hoban", _logged_in_session())
+
+    monkeypatch.setattr(session_cache, "validate_session", lambda s, code: s.cookies.get("JSESSIONID") == "abc")
+    monkeypatch.setattr(session_cache, "get_session", lambda creds: pytest.fail("should not log in"))
+
+    session = session_cache.get_cached_session({}, db_path, "hoban", "HOBAN")
+    assert session.cookies.get("JSESSIONID") == "abc"
+
+
+def test_get_cached_session_logs_in_when_expired(tmp_path, cache_key, monkeypatch):
+    db_path = tmp_path / "store.db"
+    session_cache.save_session_cookies(db_path, "hoban", _logged_in_session())
+
+    fresh = requests.Session()
+    fresh.cookies.set("JSESSIONID", "new", domain="www.bgfretail.com", path="/")
+    monkeypatch.setattr(session_cache, "validate_session", lambda s, code: False)
+    monkeypatch.setattr(session_cache, "get_session", lambda creds: fresh)
+
+    assert session_cache.get_cached_session({}, db_path, "hoban", "HOBAN") is fresh
+    assert session_cache.load_session_cookies(db_path, "hoban")[0]["value"] == "new"
@@ -0,0 +1,101 @@
+import threading
+
+from utils import sqlite_util
+
+
+def test_connection_is_reused_per_thread_with_pragmas(tmp_path):
+    db_path = tmp_path / "store.db"
+    conn = sqlite_util.get_connection(db_path)
+    assert sqlite_util.get_connection(db_path) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(sqlite_util.get_connection(db_path)))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    sqlite_util.close_connections(db_path)
+
+
+def test_close_rolls_back_but_keeps_connection(tmp_path):
+    db_path = tmp_path / "store.db"
+    conn = sqlite_util.get_connection(db_path)
+    with conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+
+    again = sqlite_util.get_connection(db_path)
+    assert again is conn
+    assert again.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    sqlite_util.close_connections(db_path)
+
+
+def test_replaced_file_gets_fresh_connection(tmp_path):
+    db_path = tmp_path / "store.db"
+    conn = sqlite_util.get_connection(db_path)
+    with conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+
+    sqlite_util.checkpoint_and_close(db_path)
+    assert not (tmp_path / "store.db-wal").exists() or (tmp_path / "store.db-wal").stat().st_size == 0
+    sqlite_util.prepare_for_replace(db_path)
+    db_path.unlink()
+
+    fresh = sqlite_util.get_connection(db_path)
+    assert fresh is not conn
+    assert fresh.execute("SELECT name FROM sqlite_master WHERE name = 't'").fetchone() is None
+    sqlite_util.close_connections()
+
+
+def test_callee_scopes_do_not_end_the_callers_transaction(tmp_path):
+    db_path = tmp_path / "store.db"
+    conn = sqlite_util.get_connection(db_path)
+    with conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+
+    def callee_with_block():
+        with sqlite_util.get_connection(db_path) as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+
+    def callee_close():
+        inner = sqlite_util.get_connection(db_path)
+        inner.execute("SELECT COUNT(*) FROM t").fetchone()
+        inner.close()
+
+    try:
+        with conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            callee_with_block()  # 안쪽 with는 바깥 트랜잭션을 커밋하지 않습니다.
+            callee_close()  # 안쪽 close()도 롤백하지 않습니다.
+            assert conn.in_transaction
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO t VALUES (3)")
+    callee_close()
+    assert conn.in_transaction
+    conn.commit()
+    assert conn.execute("SELECT x FROM t").fetchall() == [(3,)]
+    sqlite_util.close_connections(db_path)
+
+
+def test_get_connection_migrates_once_when_opened(tmp_path, monkeypatch):
+    from utils import migrations
+
+    calls = []
+    real = migrations.apply_migrations
+    monkeypatch.setattr(migrations, "apply_migrations", lambda conn, kind: calls.append(kind) or real(conn, kind))
+    db_path = tmp_path / "hoban.db"
+
+    conn = sqlite_util.get_connection(db_path, migrations.SALES)
+    assert sqlite_util.get_connection(db_path, migrations.SALES) is conn
+    assert calls == [migrations.SALES]
+    assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == len(migrations.SALES_MIGRATIONS)
+    sqlite_util.close_connections(db_path)
@@ -0,0 +1,79 @@
+import pytest
+
+from utils.storage import GcsStorage, LocalStorage, Storage, TransferError, open_storage
+
+
+def test_local_storage_syncs_files_and_records_transfer_stats(tmp_path):
+    storage = LocalStorage(tmp_path / "bucket")
+    src = tmp_path / "hoban.db"
+    src.write_bytes(b"x" * 1000)
+
+    assert storage.upload(src, "db/hoban.db")
+    assert storage.upload(src, "db/hoban.db")  # 같은 내용 -> 건너뜀
+    info = storage.stat("db/hoban.db")
+    assert (info.key, info.size) == ("db/hoban.db", 1000)
+    assert storage.list("db/") == ["db/hoban.db"]
+
+    dest = tmp_path / "local" / "hoban.db"
+    assert storage.download("db/hoban.db", dest)
+    assert dest.read_bytes() == b"x" * 1000
+    assert not storage.download("db/missing.db", tmp_path / "missing.db")
+    assert storage.stat("db/missing.db") is None
+
+    stats = storage.stats()
+    assert stats["upload"]["count"] == 2
+    assert stats["upload"]["skipped"] == 1
+    assert stats["upload"]["bytes"] == 1000
+    assert stats["download"]["count"] == 2
+    assert stats["download"]["bytes"] == 1000
+    assert stats["download"]["mean_seconds"] >= 0.0
+
+
+def test_open_storage_selects_backend_from_config(tmp_path):
+    local = open_storage({"backend": "local", "root": "bucket"}, base_dir=tmp_path)
+    assert isinstance(local, LocalStorage)
+    assert local.root == tmp_path / "bucket"
+
+    gcs = open_storage({"backend": "gcs", "bucket": "my-bucket"})
+    assert isinstance(gcs, GcsStorage)
+    assert gcs.bucket_name == "my-bucket"
+
+    assert gcs.codec is None
+    assert open_storage({"backend": "gcs", "bucket": "my-bucket", "codec": "gzip"}).codec == "gzip"
+    with pytest.raises(ValueError):
+        open_storage({"backend": "gcs", "bucket": "my-bucket", "codec": "brotli"})
+
+    with pytest.raises(ValueError):
+        open_storage(None)
+    with pytest.raises(ValueError):
+        open_storage({"backend": "s3"})
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class NoUpload(LocalStorage):
+        _upload = Storage._upload
+
+    with pytest.raises(TypeError):
+        Storage()
+    with pytest.raises(TypeError, match="_upload"):
+        NoUpload("bucket")
+
+
+def test_gcs_download_failure_is_not_reported_as_missing(tmp_path, monkeypatch):
+    from utils import gcs_util
+
+    outcome = {}
+
+    def fake_download(bucket, key, dest, transfer):
+        transfer.update(bytes=0, skipped=False, missing=outcome["missing"])
+        return False
+
+    monkeypatch.setattr(gcs_util, "download_from_gcs", fake_download)
+    storage = GcsStorage("my-bucket")
+
+    outcome["missing"] = True
+    assert not storage.download("db/hoban.db", tmp_path / "hoban.db")
+    outcome["missing"] = False
+    with pytest.raises(TransferError):
+        storage.download("db/hoban.db", tmp_path / "hoban.db")
+    assert storage.stats()["download"]["failed"] == 1
@@ -0,0 +1,80 @@
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+from prediction import weather_backfill, xgboost
+from utils.db_util import init_db
+
+
+def _seed_sales(db_path):
+    conn = init_db(db_path)
+    conn.executemany(
+        "INSERT INTO mid_sales (collected_at, mid_code, product_code, sales, purchase, disposal, soldout, stock) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("2025-08-01 00:00:00", "001", "P1", 3, 3, 0, 0, 5),
+            ("2025-08-02 00:00:00", "001", "P1", 4, 4, 0, 0, 5),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_load_weather_file_accepts_kma_headers(tmp_path):
+    csv = tmp_path / "weather.csv"
+    csv.write_text(
+        "지점,일시,평균기온(°C),일강수량(mm)\n108,2025-08-01,27.5,\n108,2025-08-02,26.0,12.5\n",
+        encoding="cp949",
+    )
+
+    df = weather_backfill.load_weather_file(csv)
+
+    assert df.to_dict("records") == [
+        {"date": "2025-08-01", "temperature": 27.5, "rainfall": 0.0},
+        {"date": "2025-08-02", "temperature": 26.0, "rainfall": 12.5},
+    ]
+
+
+def test_training_data_joins_weather_daily(tmp_path, monkeypatch):
+    db_path = tmp_path / "sales.db"
+    _seed_sales(db_path)
+    weather_backfill.store_weather_daily(
+        db_path,
+        pd.DataFrame([{"date": "2025-08-01", "temperature": 27.5, "rainfall": 0.0}]),
+        source="test",
+    )
+
+    df = xgboost.get_training_data_for_category(db_path, "001")
+    assert df["temperature"].tolist()[0] == 27.5
+    assert pd.isna(df["temperature"].tolist()[1])
+
+    looked_up = []
+
+    def fake_weather(dates):
+        looked_up.extend(dates)
+        return pd.DataFrame({"date": dates, "temperature": [20.0] * len(dates), "rainfall": [1.0] * len(dates)})
+
+    monkeypatch.setattr(xgboost, "get_weather_data", fake_weather)
+    filled = xgboost.attach_weather(df)
+
+    # weather_daily에 없는 날짜만 개별 조회한다.
+    assert looked_up == [date(2025, 8, 2)]
+    assert filled["temperature"].tolist() == [27.5, 20.0]
+    assert filled["rainfall"].tolist() == [0.0, 1.0]
+
+
+def test_reading_training_data_does_not_fill_calendar(tmp_path):
+    db_path = tmp_path / "sales.db"
+    _seed_sales(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM calendar")
+    conn.commit()
+    conn.close()
+
+    df = xgboost.get_training_data_for_category(db_path, "001")
+
+    # calendar는 마이그레이션만 채우고, 읽기 경로는 날짜에서 특성을 계산합니다.
+    assert df["weekday"].tolist() == [4, 5]
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM calendar").fetchone() == (0,)
+    conn.close()
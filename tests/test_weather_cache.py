@@ -0,0 +1,47 @@
+from datetime import date, datetime, timedelta
+
+from prediction import weather_cache, xgboost
+
+
+def test_cache_persists_observed_but_not_fallback(tmp_path):
+    db_path = tmp_path / "weather.db"
+    cache = weather_cache.WeatherCache(db_path)
+    day = date(2025, 8, 1)
+
+    cache.put(day, 60, 127, "observed_api", 25.0, 1.5)
+    cache.put(date(2025, 8, 2), 60, 127, "fallback", 0.0, 0.0)
+
+    fresh = weather_cache.WeatherCache(db_path)
+    assert fresh.get(day, 60, 127) == (25.0, 1.5, "observed_api")
+    assert fresh.get(date(2025, 8, 2), 60, 127) is None
+
+
+def test_cache_expires_by_source_ttl(tmp_path, monkeypatch):
+    now = [datetime(2025, 8, 1, 9, 0)]
+    monkeypatch.setattr(weather_cache, "_now", lambda: now[0])
+    cache = weather_cache.WeatherCache(tmp_path / "weather.db")
+    day = date(2025, 8, 2)
+
+    cache.put(day, 60, 127, "forecast_api", 28.0, 0.0)
+    now[0] += timedelta(hours=2)
+    assert cache.get(day, 60, 127) == (28.0, 0.0, "forecast_api")
+    now[0] += timedelta(hours=2)
+    assert cache.get(day, 60, 127) is None
+
+
+def test_get_weather_data_fetches_each_date_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(weather_cache, "_default_cache", weather_cache.WeatherCache(tmp_path / "w.db"))
+    calls = []
+
+    def fake_fetch(day, api_key, nx, ny):
+        calls.append(day)
+        return {"date": day, "temperature": 20.0, "rainfall": 0.0}, "forecast_api"
+
+    monkeypatch.setattr(xgboost, "_fetch_weather_for_date", fake_fetch)
+    tomorrow = date.today() + timedelta(days=1)
+
+    for _ in range(65):
+        df = xgboost.get_weather_data([tomorrow])
+
+    assert calls == [tomorrow]
+    assert df["temperature"].iloc[0] == 20.0
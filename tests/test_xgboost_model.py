@@ -33,3 +33,67 @@ def test_train_and_predict_loads_tuned_model(tmp_path, monkeypatch):
     )
 
     assert result == 99.0
+
+
+def test_training_data_for_all_categories_matches_per_category(tmp_path):
+    from utils.db_util import init_db
+
+    db_path = tmp_path / "sales.db"
+    conn = init_db(db_path)
+    conn.executemany(
+        "INSERT INTO mid_sales (collected_at, mid_code, product_code, sales, purchase, disposal, soldout, stock) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("2025-08-14 00:00:00", "001", "P1", 3, 4, 1, 0, 5),
+            ("2025-08-14 00:00:00", "001", "P2", 2, 2, 0, 0, 0),
+            ("2025-08-15 00:00:00", "001", "P1", 4, 4, 0, 0, 5),
+            ("2025-08-15 00:00:00", "002", "P3", 1, 1, 0, 1, 0),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    bulk = xgboost.get_training_data_for_all_categories(db_path)
+
+    assert sorted(bulk) == ["001", "002"]
+    for mid_code, df in bulk.items():
+        single = xgboost.get_training_data_for_category(db_path, mid_code)
+        pd.testing.assert_frame_equal(df, single.reset_index(drop=True))
+    assert bulk["001"]["total_sales"].tolist() == [5, 4]
+    # 2025-08-15 광복절
+    assert bulk["001"]["is_holiday"].tolist() == [0, 1]
+
+
+def test_run_all_category_predictions_keeps_prediction_id_and_replaces_items(tmp_path, monkeypatch):
+    import sqlite3
+
+    from utils.db_util import init_db
+
+    db_path = tmp_path / "hoban.db"
+    conn = init_db(db_path)
+    conn.execute(
+        "INSERT INTO mid_sales (collected_at, mid_code, mid_name, product_code, sales) "
+        "VALUES ('2025-08-14 00:00:00', '001', '도시락', 'P1', 3)"
+    )
+    conn.commit()
+    conn.close()
+
+    runs = iter([
+        [{"product_code": "P1", "product_name": "A", "recommended_quantity": 2},
+         {"product_code": "P2", "product_name": "B", "recommended_quantity": 1}],
+        [{"product_code": "P1", "product_name": "A", "recommended_quantity": 3}],
+    ])
+    monkeypatch.setattr(xgboost, "predict_sales_for_tomorrow", lambda *args, **kwargs: 5.0)
+    monkeypatch.setattr(xgboost, "recommend_product_mix", lambda *args: next(runs))
+    monkeypatch.setattr(xgboost, "update_performance_log", lambda *args: None)
+
+    xgboost.run_all_category_predictions(db_path)
+    xgboost.run_all_category_predictions(db_path)
+
+    pred_conn = sqlite3.connect(tmp_path / "category_predictions_hoban.db")
+    predictions = pred_conn.execute("SELECT id, mid_code FROM category_predictions").fetchall()
+    items = pred_conn.execute(
+        "SELECT prediction_id, product_code, recommended_quantity FROM category_prediction_items"
+    ).fetchall()
+    pred_conn.close()
+    assert predictions == [(1, "001")]
+    assert items == [(1, "P1", 3)]
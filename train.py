@@ -1,5 +1,3 @@
-import sqlite3
-import pandas as pd
 from pathlib import Path
 import logging
 
@@ -9,7 +7,7 @@ import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from prediction.xgboost import get_training_data_for_category, train_model_for_category
+from prediction.xgboost import get_training_data_for_all_categories, train_model_for_category
 from utils.log_util import get_logger
 
 # --- 설정 --- #
@@ -36,16 +34,13 @@ def main():
         logger.info(f"--- {store_name} 매장 모델 학습 시작 ---")
 
         try:
-            with sqlite3.connect(db_path) as conn:
-                # 학습할 모든 중분류 카테고리 목록을 가져옴
-                mid_categories = pd.read_sql("SELECT DISTINCT mid_code FROM mid_sales", conn)
+            # 모든 중분류의 학습 데이터를 한 번의 쿼리로 만들어 둠
+            training_by_category = get_training_data_for_all_categories(db_path)
             
-            logger.info(f"{store_name} 매장에서 {len(mid_categories)}개의 카테리에 대한 학습을 진행합니다.")
+            logger.info(f"{store_name} 매장에서 {len(training_by_category)}개의 카테리에 대한 학습을 진행합니다.")
 
-            for mid_code in mid_categories['mid_code']:
-                # 1. 특정 카테고리의 전체 학습 데이터를 가져옴
-                training_data = get_training_data_for_category(db_path, mid_code)
-                
+            for mid_code, training_data in training_by_category.items():
+                # 1. 특정 카테고리의 전체 학습 데이터
                 if training_data.empty:
                     logger.warning(f"[{store_name}/{mid_code}] 학습 데이터가 없어 건너뜁니다.")
                     continue
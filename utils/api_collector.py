@@ -1,23 +1,30 @@
 import requests
 import pandas as pd
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from utils.http_transport import create_session, request_timeout
 
 logger = logging.getLogger(__name__)
 
 LOGIN_URL = "https://www.bgfretail.com/bgf/login/login.do"
 API_URL = "https://www.bgfretail.com/st/STMB011_M0_SELECT.do"
 
+def new_session() -> requests.Session:
+    """A session on the shared transport; only the read-only sales query POST is retried."""
+    return create_session(retry_post_urls=(API_URL,))
+
 def get_session(credentials: Dict[str, str]) -> Optional[requests.Session]:
-    """Logs in and returns a session object."""
-    session = requests.Session()
+    """Logs in and returns a session on the shared pooled transport."""
+    session = new_session()
     try:
         login_data = {
             'user_id': credentials.get('id'),
             'user_pwd': credentials.get('password'),
         }
-        response = session.post(LOGIN_URL, data=login_data, timeout=10)
+        response = session.post(LOGIN_URL, data=login_data, timeout=request_timeout(10))
         response.raise_for_status()
 
         if "login_fail" in response.text:
@@ -30,8 +37,9 @@ def get_session(credentials: Dict[str, str]) -> Optional[requests.Session]:
         logger.error(f"Failed to create session: {e}", exc_info=True)
         return None
 
-def fetch_sales_data(session: requests.Session, store_code: str, date_str: str) -> Optional[pd.DataFrame]:
-    """Fetches sales data for a given store and date using the API."""
+def _sales_request(
+    session: requests.Session, store_code: str, date_str: str, read_timeout: float, **kwargs: Any
+) -> requests.Response:
     headers = {
         "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
         "User-Agent": "Mozilla/5.0",
@@ -40,9 +48,30 @@ def fetch_sales_data(session: requests.Session, store_code: str, date_str: str)
     payload = {
         '_dataSet_': f'{{ "_id_":"ds_cond", "_state_":1, "_rowidx_":0, "_rows_":[{{ "_state_":2, "send_date":"{date_str}", "store_code":"{store_code}" }}] }}'
     }
+    return session.post(API_URL, headers=headers, data=payload, timeout=request_timeout(read_timeout), **kwargs)
 
+def validate_session(session: requests.Session, store_code: str) -> bool:
+    """Checks with one empty-result API call whether the session is still logged in.
+
+    Asks for tomorrow's sales, which cannot exist yet: a logged-in session gets an
+    empty ``ds_list`` back without the server assembling a day of rows. An expired
+    session is redirected to the login page, which is not followed.
+    """
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y%m%d")
     try:
-        response = session.post(API_URL, headers=headers, data=payload, timeout=30)
+        response = _sales_request(session, store_code, tomorrow, read_timeout=10, allow_redirects=False)
+        if response.status_code != 200:
+            logger.debug(f"Session validation for {store_code} got HTTP {response.status_code}.")
+            return False
+        return 'ds_list' in response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.debug(f"Session validation failed for {store_code}: {e}")
+        return False
+
+def fetch_sales_data(session: requests.Session, store_code: str, date_str: str) -> Optional[pd.DataFrame]:
+    """Fetches sales data for a given store and date using the API."""
+    try:
+        response = _sales_request(session, store_code, date_str, read_timeout=30)
         response.raise_for_status()
         data = response.json()
         records = data.get('ds_list', [])
@@ -60,4 +89,38 @@ def fetch_sales_data(session: requests.Session, store_code: str, date_str: str)
         return None
     except (ValueError, KeyError) as e:
         logger.error(f"Failed to parse JSON response for {store_code} on {date_str}: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+def fetch_sales_data_concurrently(
+    session: requests.Session,
+    store_code: str,
+    date_strs: Iterable[str],
+    max_workers: int = 4,
+) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+    """Fetches several dates over one session and yields results as they complete.
+
+    Yields ``(date_str, DataFrame or None)`` tuples in completion order so the
+    caller can persist each day as soon as it arrives. With ``max_workers`` of
+    1 the dates are fetched serially in the given order.
+    """
+    date_strs = list(date_strs)
+    if max_workers <= 1 or len(date_strs) <= 1:
+        for date_str in date_strs:
+            yield date_str, fetch_sales_data(session, store_code, date_str)
+        return
+
+    workers = min(max_workers, len(date_strs))
+    logger.info(f"Fetching {len(date_strs)} dates for {store_code} with {workers} workers.")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fetch-{store_code}") as executor:
+        futures = {
+            executor.submit(fetch_sales_data, session, store_code, date_str): date_str
+            for date_str in date_strs
+        }
+        for future in as_completed(futures):
+            date_str = futures[future]
+            try:
+                yield date_str, future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error while fetching {store_code} on {date_str}: {e}", exc_info=True)
+                yield date_str, None
@@ -0,0 +1,115 @@
+"""날짜 특성(요일·월·ISO 주차·휴일 코드) 계산과 ``calendar`` 테이블 관리.
+
+휴일 코드는 모든 경로에서 같은 규칙을 씁니다.
+
+* ``0``: 평일(일요일 포함)
+* ``1``: 공휴일
+* ``2``: 토요일(공휴일이 아닌 경우)
+
+``holidays.KR`` 객체는 연도별로 한 번만 만들어 캐시하고, 특성 계산은
+연 단위로 미리 만든 DataFrame을 조회하는 방식이라 행별 파이썬 람다가 없습니다.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Iterable
+
+import holidays
+import pandas as pd
+
+HOLIDAY_WEEKDAY = 0
+HOLIDAY_PUBLIC = 1
+HOLIDAY_SATURDAY = 2
+
+CALENDAR_START_YEAR = 2020
+# 오늘 기준 몇 년 뒤까지 미리 채워 둘지 (내일 예측이 연말을 넘어가도 조인되도록)
+CALENDAR_YEARS_AHEAD = 2
+
+CALENDAR_COLUMNS = ["weekday", "month", "week_of_year", "is_holiday"]
+
+
+@lru_cache(maxsize=None)
+def _holidays_for_year(year: int) -> frozenset[date]:
+    return frozenset(holidays.KR(years=year).keys())
+
+
+@lru_cache(maxsize=None)
+def _calendar_for_year(year: int) -> pd.DataFrame:
+    """한 해의 날짜별 특성. ``date`` (``datetime64``) 인덱스를 가집니다."""
+    dates = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D")
+    weekday = dates.weekday.to_numpy()
+    is_public = dates.isin(pd.to_datetime(sorted(_holidays_for_year(year))))
+    is_holiday = pd.Series(HOLIDAY_WEEKDAY, index=dates)
+    is_holiday[weekday == 5] = HOLIDAY_SATURDAY
+    is_holiday[is_public] = HOLIDAY_PUBLIC
+    return pd.DataFrame(
+        {
+            "weekday": weekday,
+            "month": dates.month.to_numpy(),
+            "week_of_year": dates.isocalendar().week.astype(int).to_numpy(),
+            "is_holiday": is_holiday.to_numpy(),
+        },
+        index=pd.Index(dates, name="date"),
+    )
+
+
+def calendar_frame(start_year: int, end_year: int) -> pd.DataFrame:
+    """``start_year``~``end_year`` 범위의 달력 DataFrame (``date`` 컬럼은 ``YYYY-MM-DD`` 문자열)."""
+    frame = pd.concat([_calendar_for_year(y) for y in range(start_year, end_year + 1)])
+    frame = frame.reset_index()
+    frame["date"] = frame["date"].dt.strftime("%Y-%m-%d")
+    return frame
+
+
+def calendar_features(dates: Iterable) -> pd.DataFrame:
+    """날짜 목록에 대한 ``weekday, month, week_of_year, is_holiday``를 입력 순서대로 반환합니다."""
+    index = pd.DatetimeIndex(pd.to_datetime(list(dates))).normalize()
+    if index.empty:
+        return pd.DataFrame(columns=CALENDAR_COLUMNS, dtype=int)
+    years = range(index.year.min(), index.year.max() + 1)
+    lookup = pd.concat([_calendar_for_year(y) for y in years])
+    return lookup.reindex(index).reset_index(drop=True)
+
+
+def holiday_code(day: date) -> int:
+    """단일 날짜의 휴일 코드 (0: 평일, 1: 공휴일, 2: 토요일)."""
+    if day in _holidays_for_year(day.year):
+        return HOLIDAY_PUBLIC
+    if day.weekday() == 5:
+        return HOLIDAY_SATURDAY
+    return HOLIDAY_WEEKDAY
+
+
+def init_calendar(
+    conn: sqlite3.Connection,
+    start_year: int = CALENDAR_START_YEAR,
+    end_year: int | None = None,
+) -> None:
+    """``calendar`` 테이블을 만들고 ``start_year``~``end_year`` 범위를 채웁니다.
+
+    이미 범위가 채워져 있으면 아무것도 하지 않으므로 매번 호출해도 됩니다.
+    """
+    if end_year is None:
+        end_year = datetime.now().year + CALENDAR_YEARS_AHEAD
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS calendar (
+        date TEXT PRIMARY KEY,
+        weekday INTEGER,
+        month INTEGER,
+        week_of_year INTEGER,
+        is_holiday INTEGER
+    )
+    """)
+    first, last = conn.execute("SELECT MIN(date), MAX(date) FROM calendar").fetchone()
+    if first is not None and first <= f"{start_year}-01-01" and last >= f"{end_year}-12-31":
+        return
+
+    frame = calendar_frame(start_year, end_year)
+    conn.executemany(
+        "INSERT OR REPLACE INTO calendar (date, weekday, month, week_of_year, is_holiday) VALUES (?, ?, ?, ?, ?)",
+        frame[["date", *CALENDAR_COLUMNS]].astype(object).to_numpy().tolist(),
+    )
+    conn.commit()
@@ -0,0 +1,97 @@
+"""Streaming compression for DB artifacts (SQLite files, SQL dumps).
+
+Files are compressed and decompressed chunk by chunk, so a multi-hundred-MB
+database never has to fit in memory. ``gzip`` is the default because every
+reader can decode it (including GCS decompressive transcoding); ``zstd`` needs
+the optional ``zstandard`` package on every machine that reads the output, so
+it is only used when explicitly requested. ``none`` copies bytes through
+unchanged.
+"""
+
+from __future__ import annotations
+
+import gzip
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+CODECS = ("zstd", "gzip", "none")
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+Observer = Callable[[bytes], None]
+
+
+def default_codec() -> str:
+    """The codec used unless one is configured; independent of what is installed."""
+    return "gzip"
+
+
+def check_codec(codec: str) -> None:
+    """Raises unless ``codec`` is known and usable in this environment."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec {codec!r}; expected one of {', '.join(CODECS)}")
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+
+
+@contextmanager
+def open_writer(path: Path, codec: str) -> Iterator[BinaryIO]:
+    """Binary writer whose output lands compressed with ``codec`` in ``path``."""
+    check_codec(codec)
+    with open(path, "wb") as raw:
+        if codec == "gzip":
+            # mtime=0 keeps the output byte-identical for identical input.
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as out:
+                yield out
+        elif codec == "zstd":
+            cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL, write_checksum=True)
+            with cctx.stream_writer(raw, closefd=False) as out:
+                yield out
+        else:
+            yield raw
+
+
+@contextmanager
+def open_reader(path: Path, codec: str) -> Iterator[BinaryIO]:
+    """Binary reader that decompresses ``path`` written with ``codec``."""
+    check_codec(codec)
+    with open(path, "rb") as raw:
+        if codec == "gzip":
+            with gzip.GzipFile(fileobj=raw, mode="rb") as src:
+                yield src
+        elif codec == "zstd":
+            with zstandard.ZstdDecompressor().stream_reader(raw, closefd=False) as src:
+                yield src
+        else:
+            yield raw
+
+
+def _pump(src: BinaryIO, dest: BinaryIO, observe: Optional[Observer]) -> None:
+    if observe is None:
+        shutil.copyfileobj(src, dest, CHUNK_SIZE)
+        return
+    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+        observe(chunk)
+        dest.write(chunk)
+
+
+def compress_file(src: Path, dest: Path, codec: str, observe: Optional[Observer] = None) -> None:
+    """Compresses ``src`` into ``dest``; ``observe`` sees every uncompressed chunk."""
+    with open(src, "rb") as fin, open_writer(dest, codec) as fout:
+        _pump(fin, fout, observe)
+
+
+def decompress_file(src: Path, dest: Path, codec: str, observe: Optional[Observer] = None) -> None:
+    """Decompresses ``src`` into ``dest``; ``observe`` sees every uncompressed chunk."""
+    with open_reader(src, codec) as fin, open(dest, "wb") as fout:
+        _pump(fin, fout, observe)
@@ -1,11 +1,11 @@
-from typing import Union
+from typing import Any, Union
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import logging
 import json
+import hashlib
 import pandas as pd
-import holidays
 
 # prediction.xgboost 모듈을 임포트하기 위해 경로 추가
 import sys
@@ -15,7 +15,11 @@ if str(ROOT_DIR) not in sys.path:
 
 from prediction.xgboost import get_weather_data
 
+from utils.calendar_util import holiday_code, init_calendar
 from utils.log_util import get_logger
+from utils.migrations import SALES
+from utils.sales_schema import UPSERT_MID_CATEGORY_SQL, UPSERT_PRODUCT_SQL, refresh_mid_daily_agg
+from utils.sqlite_util import get_connection
 
 log = get_logger(__name__, level=logging.DEBUG)
 
@@ -23,36 +27,106 @@ log = get_logger(__name__, level=logging.DEBUG)
 
 def init_db(path: Path) -> sqlite3.Connection:
     path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(path)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS mid_sales (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        collected_at TEXT, mid_code TEXT, mid_name TEXT, product_code TEXT, 
-        product_name TEXT, sales INTEGER, order_cnt INTEGER, purchase INTEGER,
-        disposal INTEGER, stock INTEGER, soldout INTEGER,
-        weekday INTEGER, month INTEGER, week_of_year INTEGER, is_holiday INTEGER,
-        temperature REAL, rainfall REAL,
-        UNIQUE(collected_at, product_code)
-    );
-    """)
-    conn.commit()
-    return conn
-
-
-def _get_value(record: dict[str, any], *keys: str):
+    return get_connection(path, SALES)
+
+
+def _get_value(record: dict[str, Any], *keys: str):
     for k in keys:
         if k in record:
             return record[k]
     return None
 
 
+# 같은 날짜·상품이 이미 있으면 수치와 날짜 특성만 갱신하고, 최초 저장 시의 날씨는 유지합니다.
+# 중분류/상품은 차원 테이블의 정수 키로 저장합니다 (utils.sales_schema).
+_UPSERT_SALES_SQL = """
+INSERT INTO sales_fact (
+    collected_at, mid_id, product_id, sales, order_cnt,
+    purchase, disposal, stock, soldout, weekday, month, week_of_year, is_holiday,
+    temperature, rainfall
+) VALUES (
+    ?,
+    (SELECT id FROM mid_categories WHERE mid_code = ?),
+    (SELECT id FROM products WHERE product_code = ?),
+    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+)
+ON CONFLICT (sale_date, product_id) DO UPDATE SET
+    collected_at = excluded.collected_at,
+    mid_id = excluded.mid_id,
+    sales = excluded.sales,
+    order_cnt = excluded.order_cnt,
+    purchase = excluded.purchase,
+    disposal = excluded.disposal,
+    stock = excluded.stock,
+    soldout = excluded.soldout,
+    weekday = excluded.weekday,
+    month = excluded.month,
+    week_of_year = excluded.week_of_year,
+    is_holiday = excluded.is_holiday
+"""
+
+# 레코드 필드별 허용 키 (API 원본 키와 가공된 키를 모두 지원)
+_SALES_FIELD_KEYS = {
+    "product_code": ("productCode", "product_code", "ITEM_CD"),
+    "sales": ("sales", "SALE_QTY"),
+    "mid_code": ("midCode", "mid_code", "MID_CD"),
+    "mid_name": ("midName", "mid_name", "MID_NM"),
+    "product_name": ("productName", "product_name", "ITEM_NM"),
+    "order_cnt": ("order", "order_cnt", "ORD_QTY"),
+    "purchase": ("purchase", "BUY_QTY"),
+    "disposal": ("disposal", "DISUSE_QTY"),
+    "stock": ("stock", "STOCK_QTY"),
+    "soldout": ("soldout",),
+}
+
+
+def _normalize_sales_records(records: list[dict[str, Any]], logger: logging.Logger) -> tuple[dict[str, list], int]:
+    """레코드 목록을 컬럼별 리스트로 변환합니다. 상품코드/판매량이 없거나 잘못된 레코드는 건너뜁니다."""
+    columns: dict[str, list] = {name: [] for name in _SALES_FIELD_KEYS}
+    skipped = 0
+    for i, rec in enumerate(records):
+        values = {name: _get_value(rec, *keys) for name, keys in _SALES_FIELD_KEYS.items()}
+        if values["product_code"] is None or values["sales"] is None:
+            logger.warning(
+                "Record %s is missing product_code or sales. Skipping. Record: %s",
+                i + 1,
+                json.dumps(rec, ensure_ascii=False),
+            )
+            skipped += 1
+            continue
+        try:
+            values["sales"] = int(values["sales"])
+            stock = values["stock"]
+            if values["soldout"] is None:
+                # 품절 상태 결정: 재고가 0이고 판매가 1 이상일 때 품절로 간주
+                values["soldout"] = 1 if stock is not None and int(stock) == 0 and values["sales"] > 0 else 0
+            else:
+                values["soldout"] = int(values["soldout"])
+        except (ValueError, TypeError):
+            logger.warning(
+                "Record %s has invalid sales/stock value. Skipping. Record: %s",
+                i + 1,
+                json.dumps(rec, ensure_ascii=False),
+            )
+            skipped += 1
+            continue
+        for name, value in values.items():
+            columns[name].append(value)
+    return columns, skipped
+
+
 def write_sales_data(
-    records: list[dict[str, any]],
+    records: list[dict[str, Any]],
     db_path: Path,
     target_date_str: Union[str, None] = None,
     store_id: Union[str, None] = None,
 ) -> int:
-    """매출 데이터를 통합 DB에 저장합니다."""
+    """매출 데이터를 통합 DB에 저장합니다.
+
+    레코드를 컬럼 단위로 정규화한 뒤 차원 테이블(중분류·상품) upsert와
+    ``sales_fact``의 ``INSERT ... ON CONFLICT DO UPDATE``를 ``executemany``로
+    한 트랜잭션에서 실행합니다. 반환값은 저장 후 팩트 테이블 전체 행 수입니다.
+    """
     logger = get_logger(__name__, level=logging.DEBUG, store_id=store_id)
     logger.info(
         f"DB: {db_path.name}. Received {len(records)} records to write for date: {target_date_str or 'today'}."
@@ -60,11 +134,7 @@ def write_sales_data(
     if not records:
         logger.warning("Received an empty list of records. Nothing to write.")
         return 0
-    
-    processed_count = 0
-    skipped_count = 0
-    insert_count = 0
-    update_count = 0
+
     conn = None  # Initialize conn to None
 
     try:
@@ -84,142 +154,69 @@ def write_sales_data(
         weekday = current_date_dt.weekday()
         month = current_date_dt.month
         week_of_year = current_date_dt.isocalendar()[1]
-        # Determine is_holiday based on new rules
-        is_holiday_val = 0 # Default to weekday
-        if current_date_dt in holidays.KR():
-            is_holiday_val = 1 # Public holiday
-        elif current_date_dt.weekday() == 5: # Saturday (Monday is 0, Sunday is 6)
-            is_holiday_val = 2 # Saturday
-        
-        is_holiday = is_holiday_val
+        # 0: 평일, 1: 공휴일, 2: 토요일 (utils.calendar_util 규칙)
+        is_holiday = holiday_code(current_date_dt)
+
+        columns, skipped_count = _normalize_sales_records(records, logger)
+        product_codes = columns["product_code"]
+        if not product_codes:
+            logger.warning(f"DB: {db_path.name}. No valid records to write. Skipped {skipped_count}.")
+            cur.execute("SELECT COUNT(*) FROM sales_fact")
+            return cur.fetchone()[0]
 
         weather_df = get_weather_data([current_date_dt])
-        temperature = weather_df['temperature'].iloc[0] if not weather_df.empty else 0.0
-        rainfall = weather_df['rainfall'].iloc[0] if not weather_df.empty else 0.0
+        temperature = float(weather_df['temperature'].iloc[0]) if not weather_df.empty else 0.0
+        rainfall = float(weather_df['rainfall'].iloc[0]) if not weather_df.empty else 0.0
 
-        for i, rec in enumerate(records):
-            logger.debug(
-                "Processing record %s/%s: %s",
-                i + 1,
-                len(records),
-                json.dumps(rec, ensure_ascii=False),
+        # 삽입/갱신 건수는 해당 날짜에 이미 있는 상품코드 집합으로 계산합니다 (인덱스 조회 1회).
+        existing = {
+            row[0]
+            for row in cur.execute(
+                "SELECT product_code FROM mid_sales WHERE sale_date = ?",
+                (current_date,),
             )
-            try:
-                product_code = _get_value(rec, "productCode", "product_code")
-                sales_raw = _get_value(rec, "sales", "SALE_QTY")
-                
-                if product_code is None or sales_raw is None:
-                    logger.warning(
-                        "Record %s is missing product_code or sales. Skipping. Record: %s",
-                        i + 1,
-                        json.dumps(rec, ensure_ascii=False),
-                    )
-                    skipped_count += 1
-                    continue
-                
-                try:
-                    sales = int(sales_raw)
-                except (ValueError, TypeError):
-                    logger.warning(
-                        "Record %s has invalid sales value '%s'. Skipping. Record: %s",
-                        i + 1,
-                        sales_raw,
-                        json.dumps(rec, ensure_ascii=False),
-                    )
-                    skipped_count += 1
-                    continue
-
-                mid_code = _get_value(rec, "midCode", "mid_code")
-                mid_name = _get_value(rec, "midName", "mid_name")
-                product_name = _get_value(rec, "productName", "product_name")
-                order_cnt = _get_value(rec, "order", "order_cnt", "ORD_QTY")
-                purchase = _get_value(rec, "purchase", "BUY_QTY")
-                disposal = _get_value(rec, "disposal", "DISUSE_QTY")
-                stock = _get_value(rec, "stock", "STOCK_QTY")
+        }
+        seen = set(existing)
+        insert_count = 0
+        for code in product_codes:
+            if code not in seen:
+                insert_count += 1
+                seen.add(code)
+        update_count = len(product_codes) - insert_count
 
-                # 품절 상태 결정: 재고가 0이고 판매가 1 이상일 때 품절로 간주
-                soldout = 1 if stock is not None and int(stock) == 0 and sales > 0 else 0
-
-                cur.execute(
-                    "SELECT 1 FROM mid_sales WHERE product_code=? AND SUBSTR(collected_at,1,10)=?",
-                    (product_code, current_date),
-                )
-                row = cur.fetchone()
-
-                logger.debug(
-                    f"Product: {product_code}, Date: {current_date}, New Sales: {sales}, Soldout: {soldout}, Existing Row: {row}"
-                )
-
-                if row:
-                    cur.execute(
-                        """UPDATE mid_sales SET collected_at = ?, mid_code = ?, mid_name = ?, product_name = ?, sales = ?, order_cnt = ?, purchase = ?, disposal = ?, stock = ?, soldout = ?, weekday = ?, month = ?, week_of_year = ?, is_holiday = ? WHERE product_code = ? AND SUBSTR(collected_at,1,10) = ?""",
-                        (
-                            collected_at_val,
-                            mid_code,
-                            mid_name,
-                            product_name,
-                            sales,
-                            order_cnt,
-                            purchase,
-                            disposal,
-                            stock,
-                            soldout,
-                            weekday,
-                            month,
-                            week_of_year,
-                            is_holiday,
-                            product_code,
-                            current_date,
-                        ),
-                    )
-                    update_count += 1
-                    logger.debug(
-                        f"Updated existing record for {product_code} with soldout {soldout}; preserved weather data."
-                    )
-                else:
-                    cur.execute(
-                        """INSERT INTO mid_sales (collected_at, mid_code, mid_name, product_code, product_name, sales, order_cnt, purchase, disposal, stock, soldout, weekday, month, week_of_year, is_holiday, temperature, rainfall) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (
-                            collected_at_val,
-                            mid_code,
-                            mid_name,
-                            product_code,
-                            product_name,
-                            sales,
-                            order_cnt,
-                            purchase,
-                            disposal,
-                            stock,
-                            soldout,
-                            weekday,
-                            month,
-                            week_of_year,
-                            is_holiday,
-                            temperature,
-                            rainfall,
-                        ),
-                    )
-                    insert_count += 1
-                    logger.debug(
-                        f"Inserted new record for {product_code} with weather data and soldout {soldout}."
-                    )
-                processed_count += 1
-            except Exception as e:
-                logger.error(
-                    "Error processing record %s: %s. Error: %s",
-                    i + 1,
-                    json.dumps(rec, ensure_ascii=False),
-                    e,
-                    exc_info=True,
-                )
-                skipped_count += 1
+        n = len(product_codes)
+        rows = zip(
+            [collected_at_val] * n,
+            columns["mid_code"],
+            product_codes,
+            columns["sales"],
+            columns["order_cnt"],
+            columns["purchase"],
+            columns["disposal"],
+            columns["stock"],
+            columns["soldout"],
+            [weekday] * n,
+            [month] * n,
+            [week_of_year] * n,
+            [is_holiday] * n,
+            [temperature] * n,
+            [rainfall] * n,
+        )
+        with conn:
+            cur.executemany(
+                UPSERT_MID_CATEGORY_SQL,
+                [(c, name) for c, name in zip(columns["mid_code"], columns["mid_name"]) if c is not None],
+            )
+            cur.executemany(UPSERT_PRODUCT_SQL, zip(product_codes, columns["product_name"]))
+            cur.executemany(_UPSERT_SALES_SQL, rows)
+            # 이번에 바뀐 판매일의 중분류 합계만 다시 집계합니다.
+            refresh_mid_daily_agg(conn)
 
-        conn.commit()
         logger.info(
             f"DB: {db_path.name}. Inserted {insert_count} records, updated {update_count} records. Skipped {skipped_count}."
         )
 
-        cur.execute("SELECT COUNT(*) FROM mid_sales")
+        cur.execute("SELECT COUNT(*) FROM sales_fact")
         count = cur.fetchone()[0]
         logger.info(f"Total rows in {db_path.name}: {count}.")
         return count
@@ -235,36 +232,151 @@ def write_sales_data(
             conn.close()
             logger.debug(f"DB connection to {db_path.name} closed.")
 
+# --- DataFrame 일괄 적재 (API ds_list 형식) ---
+
+_STAGE_TEXT_COLUMNS = ("mid_code", "mid_name", "product_code", "product_name")
+_STAGE_QTY_COLUMNS = ("sales", "order_cnt", "purchase", "disposal", "stock", "soldout")
+_STAGE_COLUMNS = _STAGE_TEXT_COLUMNS + _STAGE_QTY_COLUMNS
+
+_CREATE_STAGE_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS sales_stage (
+    {", ".join(f"{c} TEXT" for c in _STAGE_TEXT_COLUMNS)},
+    {", ".join(f"{c} INTEGER" for c in _STAGE_QTY_COLUMNS)}
+)
+"""
+
+_FEATURE_COLUMNS = ("weekday", "month", "week_of_year", "is_holiday")
+
+# 값이 하나라도 다른 행만 갱신합니다. 날씨는 최초 저장 시의 값을 유지합니다.
+_MERGE_STAGE_SQL = f"""
+INSERT INTO sales_fact (
+    collected_at, mid_id, product_id, {", ".join(_STAGE_QTY_COLUMNS)}, {", ".join(_FEATURE_COLUMNS)}
+)
+SELECT :collected_at, m.id, p.id, {", ".join(f"s.{c}" for c in _STAGE_QTY_COLUMNS)},
+       {", ".join(f":{c}" for c in _FEATURE_COLUMNS)}
+FROM sales_stage s
+JOIN products p ON p.product_code = s.product_code
+LEFT JOIN mid_categories m ON m.mid_code = s.mid_code
+WHERE true
+ON CONFLICT (sale_date, product_id) DO UPDATE SET
+    {", ".join(f"{c} = excluded.{c}" for c in ("collected_at", "mid_id", *_STAGE_QTY_COLUMNS, *_FEATURE_COLUMNS))}
+WHERE {" OR ".join(
+    f"sales_fact.{c} IS NOT excluded.{c}"
+    for c in ("collected_at", "mid_id", *_STAGE_QTY_COLUMNS, *_FEATURE_COLUMNS)
+)}
+"""
+
+# 병합 전에 스테이징 행을 신규/변경/동일로 분류합니다 (병합의 갱신 조건과 같은 비교).
+_CLASSIFY_STAGE_SQL = f"""
+SELECT
+    COALESCE(SUM(f.id IS NULL), 0),
+    COALESCE(SUM(f.id IS NOT NULL AND (
+        f.collected_at IS NOT :collected_at OR f.mid_id IS NOT m.id
+        OR {" OR ".join(f"f.{c} IS NOT s.{c}" for c in _STAGE_QTY_COLUMNS)}
+        OR {" OR ".join(f"f.{c} IS NOT :{c}" for c in _FEATURE_COLUMNS)}
+    )), 0)
+FROM sales_stage s
+LEFT JOIN products p ON p.product_code = s.product_code
+LEFT JOIN mid_categories m ON m.mid_code = s.mid_code
+LEFT JOIN sales_fact f ON f.sale_date = :sale_date AND f.product_id = p.id
+"""
+
+
+def normalize_sales_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """API ``ds_list`` (또는 가공된) DataFrame을 적재용 컬럼과 타입으로 변환합니다.
+
+    컬럼명은 ``_SALES_FIELD_KEYS``의 별칭으로 찾고, 수량은 정수(``Int64``)로 변환합니다.
+    상품코드가 없는 행은 버리고, 같은 상품이 여러 번 있으면 마지막 행을 남깁니다.
+    """
+    frame = pd.DataFrame(index=df.index)
+    for name, keys in _SALES_FIELD_KEYS.items():
+        key = next((k for k in keys if k in df.columns), None)
+        if name in _STAGE_TEXT_COLUMNS:
+            values = df[key] if key is not None else pd.Series(pd.NA, index=df.index)
+            frame[name] = values.astype("string").str.strip()
+        elif key is not None:
+            frame[name] = pd.to_numeric(df[key], errors="coerce").round().astype("Int64")
+        elif name != "soldout":
+            frame[name] = pd.Series(0, index=df.index, dtype="Int64")
+    if "soldout" not in frame.columns:
+        # 품절 상태 결정: 재고가 0이고 판매가 1 이상일 때 품절로 간주
+        frame["soldout"] = ((frame["stock"] == 0) & (frame["sales"] > 0)).fillna(False).astype("Int64")
+    frame = frame[frame["product_code"].notna() & (frame["product_code"] != "")]
+    return frame.drop_duplicates("product_code", keep="last")[list(_STAGE_COLUMNS)].reset_index(drop=True)
+
+
+def ingest_sales_frame(conn: sqlite3.Connection, df: pd.DataFrame, sale_date: str) -> dict[str, int]:
+    """하루치 판매 DataFrame을 스테이징 테이블을 거쳐 한 번의 ``INSERT ... ON CONFLICT``로 병합합니다.
+
+    같은 데이터로 몇 번을 다시 실행해도 결과가 같습니다. 값이 바뀌지 않은 행은
+    다시 쓰지 않고, 재수집한 날짜에 더 이상 없는 상품 행은 지웁니다.
+    커밋은 호출하는 쪽에서 합니다.
+
+    Returns:
+        ``{"new", "changed", "unchanged", "removed"}`` 행 수
+    """
+    day = pd.Timestamp(sale_date).date()
+    sale_date = day.strftime("%Y-%m-%d")
+    collected_at = f"{sale_date} 00:00:00"
+    frame = normalize_sales_frame(df)
+    params = {
+        "sale_date": sale_date,
+        "collected_at": collected_at,
+        "weekday": day.weekday(),
+        "month": day.month,
+        "week_of_year": day.isocalendar()[1],
+        "is_holiday": holiday_code(day),
+    }
+
+    conn.execute(_CREATE_STAGE_SQL)
+    conn.execute("DELETE FROM sales_stage")
+    conn.executemany(
+        f"INSERT INTO sales_stage ({', '.join(_STAGE_COLUMNS)}) VALUES ({', '.join('?' * len(_STAGE_COLUMNS))})",
+        frame.astype(object).where(frame.notna(), None).to_numpy().tolist(),
+    )
+    conn.execute(
+        "INSERT INTO mid_categories (mid_code, mid_name) "
+        "SELECT mid_code, MAX(mid_name) FROM sales_stage WHERE mid_code IS NOT NULL GROUP BY mid_code "
+        "ON CONFLICT (mid_code) DO UPDATE SET mid_name = COALESCE(excluded.mid_name, mid_name)"
+    )
+    conn.execute(
+        "INSERT INTO products (product_code, product_name) "
+        "SELECT product_code, MAX(product_name) FROM sales_stage GROUP BY product_code "
+        "ON CONFLICT (product_code) DO UPDATE SET product_name = COALESCE(excluded.product_name, product_name)"
+    )
+
+    new, changed = conn.execute(_CLASSIFY_STAGE_SQL, params).fetchone()
+    conn.execute(_MERGE_STAGE_SQL, {k: v for k, v in params.items() if k != "sale_date"})
+    removed = conn.execute(
+        "DELETE FROM sales_fact WHERE sale_date = ? AND product_id NOT IN ("
+        "SELECT p.id FROM sales_stage s JOIN products p ON p.product_code = s.product_code)",
+        (sale_date,),
+    ).rowcount
+    conn.execute("DELETE FROM sales_stage")
+    refresh_mid_daily_agg(conn)
+    return {"new": new, "changed": changed, "unchanged": len(frame) - new - changed, "removed": removed}
+
+
 def update_past_holiday_data(db_path: Path):
     """
-    mid_sales 테이블의 과거 데이터에 대해 is_holiday 값을 새로운 규칙에 맞춰 업데이트합니다.
+    판매 팩트 테이블(sales_fact)의 과거 데이터에 대해 is_holiday 값을 새로운 규칙에 맞춰 업데이트합니다.
     0: 평일, 1: 공휴일, 2: 토요일
     """
     log.info(f"Updating past holiday data for {db_path.name}...")
     conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection(db_path, SALES)
         cur = conn.cursor()
 
-        # 모든 고유한 날짜를 가져옵니다.
-        cur.execute("SELECT DISTINCT SUBSTR(collected_at, 1, 10) FROM mid_sales")
-        dates_in_db = [row[0] for row in cur.fetchall()]
-
-        updated_count = 0
-        for date_str in dates_in_db:
-            current_date_dt = datetime.strptime(date_str, "%Y-%m-%d").date()
-            
-            is_holiday_val = 0 # Default to weekday
-            if current_date_dt in holidays.KR():
-                is_holiday_val = 1 # Public holiday
-            elif current_date_dt.weekday() == 5: # Saturday (Monday is 0, Sunday is 6)
-                is_holiday_val = 2 # Saturday
-            
-            cur.execute(
-                """UPDATE mid_sales SET is_holiday = ? WHERE SUBSTR(collected_at, 1, 10) = ?""",
-                (is_holiday_val, date_str)
-            )
-            updated_count += cur.rowcount
+        # 마이그레이션 이후의 날짜까지 calendar를 늘린 뒤, 범위 밖 날짜는 기존 값을 유지합니다.
+        init_calendar(conn)
+        cur.execute(
+            """UPDATE sales_fact SET is_holiday = (
+                   SELECT c.is_holiday FROM calendar c WHERE c.date = sales_fact.sale_date
+               )
+               WHERE sale_date IN (SELECT date FROM calendar)"""
+        )
+        updated_count = cur.rowcount
         
         conn.commit()
         log.info(f"Successfully updated {updated_count} records in {db_path.name} for is_holiday.")
@@ -284,16 +396,82 @@ def check_dates_exist(db_path: Path, dates_to_check: list[str]) -> list[str]:
     if not db_path.exists():
         return dates_to_check
 
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    
-    missing_dates = []
-    for date_str in dates_to_check:
-        cur.execute("SELECT 1 FROM mid_sales WHERE SUBSTR(collected_at, 1, 10) = ? LIMIT 1", (date_str,))
-        if cur.fetchone() is None:
-            missing_dates.append(date_str)
-            
-    conn.close()
+    conn = get_connection(db_path, SALES)
+    try:
+        placeholders = ",".join("?" * len(dates_to_check))
+        present = {
+            row[0]
+            for row in conn.execute(
+                f"SELECT DISTINCT sale_date FROM sales_fact WHERE sale_date IN ({placeholders})",
+                dates_to_check,
+            )
+        }
+    finally:
+        conn.close()
+    missing_dates = [d for d in dates_to_check if d not in present]
     log.info(f"DB에 없는 날짜: {missing_dates}", extra={'tag': 'db'})
     return missing_dates
 
+
+def plan_collection_dates(
+    db_path: Path,
+    today: Union[date, None] = None,
+    lookback_days: int = 8,
+    mutable_days: int = 3,
+) -> list[str]:
+    """수집할 날짜 목록(YYYYMMDD)을 오래된 순으로 반환합니다.
+
+    BGF가 아직 수정할 수 있는 최근 ``mutable_days``일(오늘 포함)은 항상 다시
+    수집하고, 그보다 오래된 ``lookback_days`` 범위의 날짜는 DB에 없을 때만
+    보충 수집합니다.
+    """
+    today = today or datetime.now().date()
+    mutable_days = max(1, min(mutable_days, lookback_days))
+    window = [today - timedelta(days=i) for i in range(lookback_days - 1, -1, -1)]
+    settled = [d.strftime("%Y-%m-%d") for d in window[: lookback_days - mutable_days]]
+    mutable = window[lookback_days - mutable_days:]
+
+    backfill = check_dates_exist(db_path, settled) if settled else []
+    planned = sorted(backfill) + [d.strftime("%Y-%m-%d") for d in mutable]
+    log.info(
+        f"수집 계획: 재수집 {len(mutable)}일, 보충 {len(backfill)}일 (전체 {lookback_days}일 중)",
+        extra={'tag': 'db'},
+    )
+    return [d.replace("-", "") for d in planned]
+
+
+# --- 수집 payload 지문(fingerprint) 관리 ---
+
+def payload_fingerprint(records: list[dict[str, Any]]) -> str:
+    """레코드 목록을 정규화(키·행 정렬)한 뒤 SHA-256 지문을 계산합니다."""
+    rows = sorted(
+        json.dumps(rec, ensure_ascii=False, sort_keys=True, default=str) for rec in records
+    )
+    return hashlib.sha256("\n".join(rows).encode("utf-8")).hexdigest()
+
+
+def is_payload_unchanged(db_path: Path, store_code: str, sale_date: str, digest: str) -> bool:
+    """(store, date)에 대해 마지막으로 저장한 payload와 지문이 같으면 True를 반환합니다."""
+    if not db_path.exists():
+        return False
+    with get_connection(db_path, SALES) as conn:
+        row = conn.execute(
+            "SELECT digest FROM payload_fingerprints WHERE store_code = ? AND sale_date = ?",
+            (store_code, sale_date),
+        ).fetchone()
+    return row is not None and row[0] == digest
+
+
+def upsert_payload_fingerprint(conn: sqlite3.Connection, store_code: str, sale_date: str, digest: str) -> None:
+    """열린 연결(트랜잭션)에 payload 지문을 기록합니다. 커밋은 호출하는 쪽에서 합니다."""
+    conn.execute(
+        "INSERT OR REPLACE INTO payload_fingerprints (store_code, sale_date, digest, updated_at) VALUES (?, ?, ?, ?)",
+        (store_code, sale_date, digest, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    )
+
+
+def record_payload_fingerprint(db_path: Path, store_code: str, sale_date: str, digest: str) -> None:
+    """저장에 성공한 payload의 지문을 기록합니다."""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with get_connection(db_path, SALES) as conn:
+        upsert_payload_fingerprint(conn, store_code, sale_date, digest)
@@ -1,34 +1,279 @@
-from google.cloud import storage
+"""Google Cloud Storage sync for the store SQLite files.
+
+Transfers are skipped when they would not change anything:
+
+* every successful download/upload writes a ``<file>.gcs.json`` sidecar with
+  the blob's generation and checksums plus the local file's size and mtime;
+* a download is skipped when the local file still matches the blob
+  (same generation and untouched since the last sync, or same CRC32C/MD5);
+* an upload is skipped when the local checksums equal those of the last
+  synced version, i.e. nothing was written since.
+
+Uploads are conditional on the generation we last saw, so a run never
+silently overwrites a newer object written by another run. One
+``storage.Client`` is shared by all calls in the process.
+
+Objects are stored compressed (gzip, or zstd when the storage config asks
+for it) and streamed through a temporary file in both directions. The codec is recorded
+in ``Content-Encoding`` and the ``codec`` metadata key, together with the
+size and CRC32C/MD5 of the uncompressed file, which the skip checks above
+and the post-download verification use. Objects without ``codec`` metadata
+(uploaded before compression) are still read as plain files.
+"""
+
+import base64
+import hashlib
+import json
 import logging
+import os
+import threading
 from pathlib import Path
+from typing import Optional
+
+import google_crc32c
+from google.api_core import exceptions as gcs_exceptions
+from google.cloud import storage
+
+from utils.compression import EXTENSIONS, compress_file, decompress_file, default_codec
 
 logger = logging.getLogger(__name__)
 
-def download_from_gcs(bucket_name: str, source_blob_name: str, destination_file_path: Path):
-    """Downloads a file from the bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(source_blob_name)
+SIDECAR_SUFFIX = ".gcs.json"
+_CHUNK_SIZE = 1024 * 1024
+
+_client_lock = threading.Lock()
+_client: Optional[storage.Client] = None
+
+
+def get_client() -> storage.Client:
+    """Returns the process-wide storage client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = storage.Client()
+        return _client
+
+
+def _bucket(bucket_name: str) -> storage.Bucket:
+    return get_client().bucket(bucket_name)
+
+
+class _Checksummer:
+    """Accumulates CRC32C and MD5 over streamed chunks."""
+
+    def __init__(self):
+        self._crc = google_crc32c.Checksum()
+        self._md5 = hashlib.md5()
+        self.size = 0
+
+    def update(self, chunk: bytes) -> None:
+        self._crc.update(chunk)
+        self._md5.update(chunk)
+        self.size += len(chunk)
+
+    def result(self) -> dict:
+        return {
+            "crc32c": base64.b64encode(self._crc.digest()).decode("ascii"),
+            "md5_hash": base64.b64encode(self._md5.digest()).decode("ascii"),
+        }
+
+
+def file_checksums(path: Path) -> dict:
+    """Base64 CRC32C and MD5 of ``path``, in the format GCS reports them."""
+    summer = _Checksummer()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            summer.update(chunk)
+    return summer.result()
+
+
+def _codec(blob: storage.Blob) -> str:
+    return (blob.metadata or {}).get("codec", "none")
+
+
+def _content_checksums(blob: storage.Blob) -> dict:
+    """Checksums of the uncompressed content (the stored bytes for plain objects)."""
+    if _codec(blob) == "none":
+        return {"crc32c": blob.crc32c, "md5_hash": blob.md5_hash}
+    metadata = blob.metadata
+    return {"crc32c": metadata.get("raw-crc32c"), "md5_hash": metadata.get("raw-md5")}
 
+
+def _sidecar_path(path: Path) -> Path:
+    return path.with_name(path.name + SIDECAR_SUFFIX)
+
+
+def _read_sidecar(path: Path) -> dict:
+    try:
+        return json.loads(_sidecar_path(path).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_sidecar(path: Path, blob: storage.Blob, checksums: dict) -> None:
+    stat = path.stat()
+    state = {
+        "generation": blob.generation,
+        "crc32c": checksums["crc32c"],
+        "md5_hash": checksums["md5_hash"],
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    _sidecar_path(path).write_text(json.dumps(state), encoding="utf-8")
+
+
+def _untouched_since_sync(path: Path, state: dict) -> bool:
+    stat = path.stat()
+    return state.get("size") == stat.st_size and state.get("mtime_ns") == stat.st_mtime_ns
+
+
+def _matches_blob(checksums: dict, blob: storage.Blob) -> bool:
+    expected = _content_checksums(blob)
+    if expected["crc32c"] and checksums["crc32c"] != expected["crc32c"]:
+        return False
+    if expected["md5_hash"] and checksums["md5_hash"] != expected["md5_hash"]:
+        return False
+    return bool(expected["crc32c"] or expected["md5_hash"])
+
+
+def _download_content(blob: storage.Blob, dest: Path) -> None:
+    """Downloads ``blob`` to ``dest``, decompressing and verifying it on the way."""
+    codec = _codec(blob)
+    if codec == "none":
+        blob.download_to_filename(str(dest), if_generation_match=blob.generation)
+        return
+    packed = dest.with_name(dest.name + EXTENSIONS[codec])
+    try:
+        # raw_download keeps GCS from transcoding gzip objects; we decompress ourselves.
+        blob.download_to_filename(str(packed), if_generation_match=blob.generation, raw_download=True)
+        summer = _Checksummer()
+        decompress_file(packed, dest, codec, observe=summer.update)
+    finally:
+        packed.unlink(missing_ok=True)
+    if not _matches_blob(summer.result(), blob):
+        dest.unlink(missing_ok=True)
+        raise ValueError(f"Decompressed {blob.name} does not match its recorded checksums")
+
+
+def download_from_gcs(
+    bucket_name: str,
+    source_blob_name: str,
+    destination_file_path: Path,
+    transfer: Optional[dict] = None,
+) -> bool:
+    """Downloads a file from the bucket unless the local copy is already current.
+
+    Returns True when the local file is current afterwards (downloaded or skipped).
+    ``transfer``, if given, receives the bytes that crossed the network and
+    ``missing=True`` when False only means the object does not exist yet.
+    """
+    transfer = {} if transfer is None else transfer
+    transfer.update(bytes=0, skipped=False, missing=False)
     try:
+        blob = _bucket(bucket_name).get_blob(source_blob_name)
+        if blob is None:
+            logger.warning(f"Blob {source_blob_name} not found in {bucket_name}. Skipping download.")
+            transfer["missing"] = True
+            return False
+
+        if destination_file_path.exists():
+            state = _read_sidecar(destination_file_path)
+            if state.get("generation") == blob.generation and _untouched_since_sync(destination_file_path, state):
+                logger.info(f"Blob {source_blob_name} generation {blob.generation} already local. Skipping download.")
+                transfer["skipped"] = True
+                return True
+            checksums = file_checksums(destination_file_path)
+            if _matches_blob(checksums, blob):
+                _write_sidecar(destination_file_path, blob, checksums)
+                logger.info(f"Local {destination_file_path.name} matches {source_blob_name}. Skipping download.")
+                transfer["skipped"] = True
+                return True
+
         destination_file_path.parent.mkdir(parents=True, exist_ok=True)
-        blob.download_to_filename(destination_file_path)
-        logger.info(f"Blob {source_blob_name} downloaded to {destination_file_path}.")
+        tmp_path = destination_file_path.with_name(destination_file_path.name + ".download")
+        _download_content(blob, tmp_path)
+        os.replace(tmp_path, destination_file_path)
+        _write_sidecar(destination_file_path, blob, file_checksums(destination_file_path))
+        transfer["bytes"] = blob.size or 0
+        logger.info(
+            f"Blob {source_blob_name} ({blob.size} bytes, {_codec(blob)}) downloaded to {destination_file_path} "
+            f"({destination_file_path.stat().st_size} bytes)."
+        )
+        return True
     except Exception as e:
         logger.error(f"Failed to download {source_blob_name}: {e}", exc_info=True)
+        return False
+
+
+def upload_to_gcs(
+    bucket_name: str,
+    source_file_path: Path,
+    destination_blob_name: str,
+    codec: Optional[str] = None,
+    transfer: Optional[dict] = None,
+) -> bool:
+    """Uploads a file to the bucket unless it is unchanged since the last sync.
 
-def upload_to_gcs(bucket_name: str, source_file_path: Path, destination_blob_name: str):
-    """Uploads a file to the bucket."""
+    The object is compressed with ``codec`` (default: :func:`default_codec`).
+    Returns True when the bucket holds the local content afterwards (uploaded or skipped).
+    ``transfer``, if given, receives the bytes that crossed the network.
+    """
+    transfer = {} if transfer is None else transfer
+    transfer.update(bytes=0, skipped=False)
     if not source_file_path.exists():
         logger.warning(f"Source file {source_file_path} not found. Skipping upload.")
-        return
-
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(destination_blob_name)
+        return False
 
+    codec = codec or default_codec()
+    packed = source_file_path.with_name(source_file_path.name + ".upload" + EXTENSIONS[codec])
     try:
-        blob.upload_from_filename(str(source_file_path))
-        logger.info(f"File {source_file_path} uploaded to {destination_blob_name}.")
+        checksums = file_checksums(source_file_path)
+        state = _read_sidecar(source_file_path)
+        if state.get("crc32c") == checksums["crc32c"] and state.get("md5_hash") == checksums["md5_hash"]:
+            logger.info(f"{source_file_path.name} unchanged since last sync. Skipping upload.")
+            transfer["skipped"] = True
+            return True
+
+        blob = _bucket(bucket_name).blob(destination_blob_name)
+        if codec == "none":
+            upload_path = source_file_path
+            blob.metadata = None
+            blob.content_encoding = None
+        else:
+            # Checksum what was actually compressed, in case the file changes meanwhile.
+            summer = _Checksummer()
+            compress_file(source_file_path, packed, codec, observe=summer.update)
+            checksums = summer.result()
+            upload_path = packed
+            blob.metadata = {
+                "codec": codec,
+                "raw-size": str(summer.size),
+                "raw-crc32c": checksums["crc32c"],
+                "raw-md5": checksums["md5_hash"],
+            }
+            blob.content_encoding = codec
+        # Only replace the generation we last synced with; without a sidecar only
+        # create the object (generation 0), never replace one we have not seen.
+        blob.upload_from_filename(
+            str(upload_path),
+            if_generation_match=state.get("generation") or 0,
+            checksum="crc32c",
+        )
+        _write_sidecar(source_file_path, blob, checksums)
+        transfer["bytes"] = upload_path.stat().st_size
+        logger.info(
+            f"File {source_file_path} uploaded to {destination_blob_name} "
+            f"({upload_path.stat().st_size} bytes, {codec}, generation {blob.generation})."
+        )
+        return True
+    except gcs_exceptions.PreconditionFailed:
+        logger.error(
+            f"{destination_blob_name} changed in the bucket since generation {state.get('generation', 0)}. "
+            f"Not overwriting it with {source_file_path}."
+        )
+        return False
     except Exception as e:
         logger.error(f"Failed to upload {source_file_path}: {e}", exc_info=True)
+        return False
+    finally:
+        packed.unlink(missing_ok=True)
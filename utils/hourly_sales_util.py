@@ -5,47 +5,44 @@ from pathlib import Path
 from typing import Any, List, Dict
 from datetime import datetime
 
+import numpy as np
+
+from utils.migrations import SALES
+from utils.sqlite_util import get_connection
+
 def init_hourly_db(db_path: Path) -> sqlite3.Connection:
-    """증분 저장을 위한 테이블과 스냅샷 테이블 초기화."""
+    """증분 저장을 위한 테이블과 스냅샷 테이블 초기화 (utils.migrations의 sales 스키마)."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS hourly_sales (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT,
-        hour TEXT,
-        product_code TEXT,
-        mid_code TEXT,
-        sales_inc INTEGER,
-        order_cnt_inc INTEGER,
-        purchase_inc INTEGER,
-        disposal_inc INTEGER,
-        stock_inc INTEGER, -- 재고 증감분
-        stock INTEGER, -- 현재 재고 상태
-        UNIQUE(date, hour, product_code, mid_code)
-    )
-    """)
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS daily_snapshot (
-        date TEXT,
-        product_code TEXT,
-        mid_code TEXT,
-        sales INTEGER,
-        order_cnt INTEGER,
-        purchase INTEGER,
-        disposal INTEGER,
-        stock INTEGER,
-        PRIMARY KEY (date, product_code, mid_code)
-    )
-    """)
-    conn.commit()
-    return conn
+    return get_connection(db_path, SALES)
+
+# 누적값 컬럼과 레코드 키. ``or`` 체인과 같이 앞의 키 값이 비어 있으면 다음 키를 씁니다.
+_VALUE_KEYS = (
+    ("sales", "SALE_QTY"),
+    ("order_cnt", "ORD_QTY"),
+    ("purchase", "BUY_QTY"),
+    ("disposal", "DISUSE_QTY"),
+    ("stock", "STOCK_QTY"),
+)
+
+
+def _first_truthy(rec: Dict[str, Any], *keys: str) -> Any:
+    """``rec.get(a) or rec.get(b)``와 같습니다 (모두 비어 있으면 마지막 값)."""
+    value = None
+    for key in keys:
+        value = rec.get(key)
+        if value:
+            return value
+    return value
+
 
 def write_hourly_data(records: List[Dict[str, Any]], collected_at: str, db_path: Path) -> int:
     """
     기존 누적값과 비교해 증가분만 hourly_sales 테이블에 저장하고,
     daily_snapshot 테이블을 업데이트한다.
 
+    해당 날짜의 스냅샷을 한 번에 메모리로 읽고 전체 상품의 증감분을 NumPy 배열
+    차이로 계산한 뒤, 값이 바뀐 상품만 ``executemany`` 두 번으로 기록한다.
+
     Parameters
     ----------
     records : list of dict
@@ -60,54 +57,68 @@ def write_hourly_data(records: List[Dict[str, Any]], collected_at: str, db_path:
     int : 저장된 행 수
     """
     conn = init_hourly_db(db_path)
-    cur = conn.cursor()
     date_part = collected_at.split()[0]
     hour_part = collected_at.split()[1][:2]  # 'HH'
+    if not records:
+        conn.close()
+        return 0
+
+    keys = [
+        (_first_truthy(rec, "productCode", "product_code"), _first_truthy(rec, "midCode", "mid_code"))
+        for rec in records
+    ]
+    # 현재 누적값 (상품 수 x 5)
+    current = np.array(
+        [[int(_first_truthy(rec, *value_keys) or 0) for value_keys in _VALUE_KEYS] for rec in records],
+        dtype=np.int64,
+    )
+
+    # 스냅샷에서 직전 누적값 조회 (날짜당 1회)
+    latest = {
+        (product_code, mid_code): values
+        for product_code, mid_code, *values in conn.execute(
+            "SELECT product_code, mid_code, sales, order_cnt, purchase, disposal, stock FROM daily_snapshot WHERE date = ?",
+            (date_part,),
+        )
+    }
+    previous = np.zeros_like(current)
+    for i, key in enumerate(keys):
+        # 키가 비어 있으면 스냅샷과 매칭되지 않으므로 직전 값은 0입니다.
+        if key[0] is None or key[1] is None:
+            continue
+        prev = latest.get(key)
+        if prev is not None:
+            previous[i] = prev
+        # 같은 상품이 한 번에 여러 번 들어오면 앞선 레코드가 직전 값이 됩니다.
+        latest[key] = current[i]
+
+    # 증감분 계산 (음수 포함)
+    increments = current - previous
+    changed = np.flatnonzero(increments.any(axis=1))
+    if changed.size == 0:
+        conn.close()
+        return 0
 
-    inserted = 0
-    for rec in records:
-        product_code = rec.get("productCode") or rec.get("product_code")
-        mid_code = rec.get("midCode") or rec.get("mid_code")
-        # 현재 누적값
-        sales = int(rec.get("sales") or rec.get("SALE_QTY") or 0)
-        order_cnt = int(rec.get("order_cnt") or rec.get("ORD_QTY") or 0)
-        purchase = int(rec.get("purchase") or rec.get("BUY_QTY") or 0)
-        disposal = int(rec.get("disposal") or rec.get("DISUSE_QTY") or 0)
-        stock = int(rec.get("stock") or rec.get("STOCK_QTY") or 0)
-
-        # 스냅샷에서 직전 누적값 조회
-        cur.execute("""
-        SELECT sales, order_cnt, purchase, disposal, stock
-          FROM daily_snapshot
-         WHERE date = ? AND product_code = ? AND mid_code = ?
-        """, (date_part, product_code, mid_code))
-        row = cur.fetchone()
-        prev_sales, prev_order, prev_purchase, prev_disposal, prev_stock = row if row else (0, 0, 0, 0, 0)
-
-        # 증감분 계산 (음수 포함)
-        sales_inc = sales - prev_sales
-        order_inc = order_cnt - prev_order
-        purchase_inc = purchase - prev_purchase
-        disposal_inc = disposal - prev_disposal
-        stock_inc = stock - prev_stock
+    changed_values = current[changed].tolist()
+    changed_increments = increments[changed].tolist()
+    changed_keys = [keys[i] for i in changed]
 
+    with conn:
         # 변경분이 있는 경우에만 hourly_sales 저장
-        if any([sales_inc, order_inc, purchase_inc, disposal_inc, stock_inc]):
-            cur.execute("""
-            INSERT OR REPLACE INTO hourly_sales
-            (date, hour, product_code, mid_code, sales_inc, order_cnt_inc, purchase_inc, disposal_inc, stock_inc, stock)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (date_part, hour_part, product_code, mid_code,
-                  sales_inc, order_inc, purchase_inc, disposal_inc, stock_inc, stock))
-            inserted += 1
-
-        # 스냅샷 업데이트
-        cur.execute("""
+        conn.executemany("""
+        INSERT OR REPLACE INTO hourly_sales
+        (date, hour, product_code, mid_code, sales_inc, order_cnt_inc, purchase_inc, disposal_inc, stock_inc, stock)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (date_part, hour_part, *key, *inc, values[4])
+            for key, inc, values in zip(changed_keys, changed_increments, changed_values)
+        ])
+        # 스냅샷 업데이트 (값이 그대로인 상품은 다시 쓰지 않음)
+        conn.executemany("""
         INSERT OR REPLACE INTO daily_snapshot
         (date, product_code, mid_code, sales, order_cnt, purchase, disposal, stock)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (date_part, product_code, mid_code, sales, order_cnt, purchase, disposal, stock))
+        """, [(date_part, *key, *values) for key, values in zip(changed_keys, changed_values)])
 
-    conn.commit()
     conn.close()
-    return inserted
+    return int(changed.size)
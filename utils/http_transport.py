@@ -0,0 +1,233 @@
+"""Shared HTTP transport for the BGF API collector.
+
+All sessions created here share one pooled ``HTTPAdapter`` (keep-alive,
+gzip, jittered retries), a circuit breaker that fails fast while the BGF
+endpoint is down, and per-endpoint latency counters.
+
+Only GET is retried automatically. POST endpoints that are safe to repeat
+(read-only queries) are passed to :func:`create_session` and get a second
+shared adapter that retries POST too; everything else, such as the login
+form, is sent exactly once.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_BACKOFF_JITTER = 0.5
+RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 60.0
+CONNECT_TIMEOUT = 5
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe.
+
+    Once ``reset_timeout`` has passed, exactly one caller is let through as the
+    probe; everyone else keeps failing fast until it reports back. A probe that
+    never reports (e.g. it raised something other than a request error) is
+    replaced after another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._state_locked()
+            if state != "half_open":
+                return state == "closed"
+            now = time.monotonic()
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state_locked() == "half_open" or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit breaker opened after {self._failures} consecutive failures.")
+                self._opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+class RequestStats:
+    """Thread-safe per-endpoint request counters.
+
+    Every request recorded here is also recorded in ``parent``, so a session can
+    keep its own counters while the process-wide totals keep growing.
+    """
+
+    def __init__(self, parent: Optional["RequestStats"] = None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, endpoint: str, elapsed: float, ok: bool) -> None:
+        if self.parent is not None:
+            self.parent.record(endpoint, elapsed, ok)
+        with self._lock:
+            entry = self._stats.setdefault(
+                endpoint, {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["count"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["total_seconds"] += elapsed
+            entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for endpoint, entry in self._stats.items():
+                item = dict(entry)
+                item["avg_seconds"] = item["total_seconds"] / item["count"] if item["count"] else 0.0
+                result[endpoint] = item
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+def _build_retry(methods: Iterable[str]) -> Retry:
+    kwargs = dict(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_FORCELIST,
+        allowed_methods=frozenset(methods),
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=RETRY_BACKOFF_JITTER, **kwargs)
+    except TypeError:  # urllib3 < 2.0 has no backoff_jitter
+        return Retry(**kwargs)
+
+
+def build_adapter(
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+    retry_methods: Iterable[str] = ("GET",),
+) -> HTTPAdapter:
+    """Returns an ``HTTPAdapter`` with sized keep-alive pools and jittered retries of ``retry_methods``."""
+    return HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=_build_retry(retry_methods),
+    )
+
+
+_shared_adapter = build_adapter()
+_shared_query_adapter = build_adapter(retry_methods=("GET", "POST"))
+_shared_breaker = CircuitBreaker()
+_shared_stats = RequestStats()
+
+
+class InstrumentedSession(requests.Session):
+    """``requests.Session`` guarded by a circuit breaker and timed per request."""
+
+    def __init__(self, adapter: HTTPAdapter, breaker: CircuitBreaker, stats: RequestStats):
+        super().__init__()
+        self.breaker = breaker
+        self.stats = stats
+        self.headers.update(DEFAULT_HEADERS)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = urlsplit(url).path or url
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open; refusing {method} {endpoint}")
+
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.RequestException:
+            self.stats.record(endpoint, time.perf_counter() - start, ok=False)
+            self.breaker.record_failure()
+            raise
+
+        ok = response.status_code < 500
+        self.stats.record(endpoint, time.perf_counter() - start, ok=ok)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return response
+
+
+def create_session(retry_post_urls: Iterable[str] = ()) -> InstrumentedSession:
+    """Creates a session on the shared adapters and breaker.
+
+    POSTs to URLs starting with one of ``retry_post_urls`` are retried like GETs;
+    list only read-only endpoints there. ``session.stats`` counts only this
+    session's requests (one store run); :func:`get_request_stats` still reports
+    the process-wide totals.
+    """
+    session = InstrumentedSession(_shared_adapter, _shared_breaker, RequestStats(parent=_shared_stats))
+    for url in retry_post_urls:
+        session.mount(url, _shared_query_adapter)
+    return session
+
+
+def request_timeout(read_timeout: float):
+    """Returns a ``(connect, read)`` timeout tuple so dead hosts fail fast."""
+    return (CONNECT_TIMEOUT, read_timeout)
+
+
+def get_request_stats() -> Dict[str, Dict[str, float]]:
+    """Returns per-endpoint latency counters collected so far."""
+    return _shared_stats.snapshot()
+
+
+def reset_request_stats() -> None:
+    _shared_stats.reset()
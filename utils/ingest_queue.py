@@ -0,0 +1,258 @@
+"""Single-writer ingest queue for SQLite databases.
+
+Producers (API fetch loops, collectors) hand write jobs to an
+:class:`IngestWriter` instead of opening their own write transactions.
+Each database file gets exactly one writer thread, which
+
+* drains the bounded queue and runs the jobs of one batch inside a single
+  transaction, committing at most every ``commit_interval`` seconds or
+  every ``max_batch`` jobs,
+* isolates jobs from each other with savepoints, so one failing job only
+  fails its own future,
+* blocks producers in :meth:`IngestWriter.submit` while the queue is full
+  (backpressure), and
+* commits whatever is queued on :meth:`IngestWriter.flush` /
+  :meth:`IngestWriter.close`.
+
+If the writer thread itself dies (e.g. the database cannot be opened), the
+writer closes: every pending future fails with :class:`WriterClosedError`
+and later submissions are rejected instead of waiting forever.
+
+A job is ``fn(conn, *args)``. It runs on the writer's connection and must not
+commit or roll back itself. Its return value becomes the result of the
+:class:`concurrent.futures.Future` returned by ``submit``, which is resolved
+only after the batch containing it has been committed.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from utils.sqlite_util import get_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING = 32
+DEFAULT_COMMIT_INTERVAL = 1.0
+DEFAULT_MAX_BATCH = 64
+
+PathLike = Union[str, Path]
+Job = Callable[..., Any]
+
+_STOP = object()
+_FLUSH = object()
+
+
+class WriterClosedError(RuntimeError):
+    """Raised when a job is submitted to a writer that is shutting down."""
+
+
+class IngestWriter:
+    """Owns the only write connection to one SQLite file for the run."""
+
+    def __init__(
+        self,
+        db_path: PathLike,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        self.db_path = Path(db_path)
+        self.commit_interval = commit_interval
+        self.max_batch = max(1, max_batch)
+        self.stats = {"jobs": 0, "failed": 0, "batches": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name=f"ingest-{self.db_path.stem}", daemon=True
+        )
+        self._thread.start()
+
+    # --- producer side ---
+
+    def submit(self, fn: Job, *args: Any, timeout: Optional[float] = None) -> Future:
+        """Queues ``fn(conn, *args)``; blocks while the queue is full.
+
+        Raises ``queue.Full`` if ``timeout`` expires and :class:`WriterClosedError`
+        after :meth:`close`.
+        """
+        with self._lock:
+            if self._closed:
+                raise self._closed_error()
+        future: Future = Future()
+        self._put((fn, args, future), timeout)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Commits every job queued so far and waits until that is done."""
+        marker: Future = Future()
+        self._put((_FLUSH, (), marker), None)
+        marker.result(timeout=timeout)
+
+    def _put(self, item: tuple, timeout: Optional[float]) -> None:
+        self._queue.put(item, timeout=timeout)
+        # The writer may have died while we waited; it drained the queue before
+        # our item arrived, so nobody else will resolve it.
+        if self._error is not None:
+            self._fail_pending()
+
+    def _closed_error(self) -> WriterClosedError:
+        if self._error is None:
+            return WriterClosedError(f"Ingest writer for {self.db_path.name} is closed")
+        error = WriterClosedError(f"Ingest writer for {self.db_path.name} stopped: {self._error}")
+        error.__cause__ = self._error
+        return error
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stops accepting jobs, commits the remaining ones and stops the thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put((_STOP, (), None))
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Ingest writer for {self.db_path.name} did not stop within {timeout}s")
+
+    # --- writer thread ---
+
+    def _next_batch(self) -> tuple[list, bool]:
+        """Collects jobs until the commit interval, batch size, a flush or a stop."""
+        batch: list = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.commit_interval
+        while True:
+            fn = item[0]
+            if fn is _STOP:
+                return batch, True
+            batch.append(item)
+            if fn is _FLUSH or len(batch) >= self.max_batch:
+                return batch, False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, False
+
+    def _run(self) -> None:
+        batch: list = []
+        try:
+            conn = get_connection(self.db_path)
+            try:
+                stopping = False
+                while not stopping:
+                    batch, stopping = self._next_batch()
+                    if batch:
+                        self._write_batch(conn, batch)
+                    batch = []
+            finally:
+                conn.close()
+        except BaseException as e:
+            logger.error(f"Ingest writer for {self.db_path.name} stopped: {e}", exc_info=True)
+            with self._lock:
+                self._closed = True
+                self._error = e
+            self._fail_pending(batch)
+
+    def _fail_pending(self, batch: list = ()) -> None:
+        """Fails the unresolved futures of ``batch`` and of everything still queued."""
+        items = list(batch)
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for _fn, _args, future in items:
+            if future is not None and not future.done():
+                future.set_exception(self._closed_error())
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        done: list[tuple[Future, Any]] = []
+        markers: list[Future] = []
+        failed = 0
+        try:
+            conn.execute("BEGIN")
+            for fn, args, future in batch:
+                if fn is _FLUSH:
+                    markers.append(future)
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT ingest_job")
+                try:
+                    result = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO ingest_job")
+                    conn.execute("RELEASE ingest_job")
+                    logger.error(f"Ingest job {getattr(fn, '__name__', fn)} failed: {e}", exc_info=True)
+                    future.set_exception(e)
+                    failed += 1
+                    continue
+                conn.execute("RELEASE ingest_job")
+                done.append((future, result))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Ingest batch commit failed for {self.db_path.name}: {e}", exc_info=True)
+            if conn.in_transaction:
+                conn.rollback()
+            for future, _result in done:
+                future.set_exception(e)
+            failed += len(done)
+            done = []
+
+        for future, result in done:
+            future.set_result(result)
+        for marker in markers:
+            marker.set_result(None)
+        self.stats["jobs"] += len(done) + failed
+        self.stats["failed"] += failed
+        self.stats["batches"] += 1
+
+
+_writers_lock = threading.Lock()
+_writers: dict[str, IngestWriter] = {}
+
+
+def get_writer(db_path: PathLike, **options: Any) -> IngestWriter:
+    """Returns the process-wide writer for ``db_path``, starting it on first use.
+
+    ``options`` (``max_pending``, ``commit_interval``, ``max_batch``) only apply
+    when the writer is created.
+    """
+    key = str(Path(db_path).resolve())
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = IngestWriter(db_path, **options)
+        return writer
+
+
+def close_writer(db_path: PathLike, timeout: Optional[float] = None) -> Optional[dict]:
+    """Flushes and stops the writer for ``db_path``; returns its stats if it existed."""
+    key = str(Path(db_path).resolve())
+    with _writers_lock:
+        writer = _writers.pop(key, None)
+    if writer is None:
+        return None
+    writer.close(timeout)
+    return dict(writer.stats)
+
+
+def close_all_writers(timeout: Optional[float] = None) -> None:
+    """Flushes and stops every writer, e.g. at process shutdown."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout)
@@ -1,5 +1,6 @@
 from typing import Union
 import logging
+import multiprocessing
 import os
 import json
 from datetime import datetime
@@ -104,7 +105,9 @@ def _setup_logger(name: str, level: int = logging.INFO, default_tag: str = "syst
     else:
         log_path = _get_log_path()
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_path, mode="w", encoding="utf-8")
+        # 작업 프로세스는 부모가 쓰던 로그 파일을 물려받으므로 비우지 않고 이어서 씁니다.
+        mode = "a" if multiprocessing.parent_process() is not None else "w"
+        file_handler = logging.FileHandler(log_path, mode=mode, encoding="utf-8")
         file_handler.setFormatter(fmt)
         file_handler.addFilter(tag_filter)
         file_handler.setLevel(logging.DEBUG)
@@ -112,6 +115,33 @@ def _setup_logger(name: str, level: int = logging.INFO, default_tag: str = "syst
     return logger
 
 
+def redirect_log_file(path: Path) -> None:
+    """이후 로그와 이미 생성된 로거의 파일 출력을 ``path``로 전환합니다.
+
+    점포별 작업 프로세스에서 호출하여 로그 파일을 점포마다 분리할 때 사용합니다.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    os.environ["LOG_FILE"] = str(path)
+
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        if not isinstance(logger, logging.Logger):
+            continue
+        for handler in list(logger.handlers):
+            if not isinstance(handler, logging.FileHandler):
+                continue
+            if Path(handler.baseFilename) == path.resolve():
+                continue
+            new_handler = logging.FileHandler(path, mode="a", encoding="utf-8")
+            new_handler.setFormatter(handler.formatter)
+            new_handler.setLevel(handler.level)
+            for flt in handler.filters:
+                new_handler.addFilter(flt)
+            logger.removeHandler(handler)
+            handler.close()
+            logger.addHandler(new_handler)
+
+
 def get_logger(
     name: str,
     *,
@@ -0,0 +1,351 @@
+"""버전 관리되는 SQLite 스키마 마이그레이션.
+
+DB마다 ``schema_version`` 테이블에 적용된 마이그레이션 번호를 기록하고,
+아직 적용되지 않은 마이그레이션만 번호 순서대로 실행합니다.
+테이블 생성, 컬럼 추가, 인덱스 생성, 데이터 백필이 모두 여기에 모여 있으므로
+``get_connection(path, kind)``가 연결을 처음 열 때 이 러너를 한 번 실행하므로
+``init_db``/``init_hourly_db``/``init_prediction_db``와 조회 함수는 따로 호출하지 않습니다.
+
+DB 종류는 두 가지입니다.
+
+* ``sales``: 점포 DB (``hoban.db`` 등) - 판매, 시간대별 증분, 날씨, 달력
+* ``predictions``: ``category_predictions_<점포>.db`` - 예측 결과와 성능 기록
+
+모든 마이그레이션은 여러 번 실행해도 결과가 같도록(``IF NOT EXISTS``, 컬럼 존재 확인)
+작성합니다. 중간에 실패하더라도 다음 실행에서 안전하게 이어집니다.
+
+사용 예::
+
+    python -m utils.migrations                 # code_outputs/db 의 모든 DB를 병렬로 마이그레이션
+    python -m utils.migrations --workers 1 code_outputs/db/hoban.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from utils.calendar_util import CALENDAR_START_YEAR, CALENDAR_YEARS_AHEAD, init_calendar
+from utils.sales_schema import create_mid_daily_agg, ensure_sale_date, normalize_sales_schema
+from utils.sqlite_util import close_connections, get_connection
+
+log = logging.getLogger(__name__)
+
+DB_DIR = Path(__file__).resolve().parents[1] / "code_outputs" / "db"
+
+SALES = "sales"
+PREDICTIONS = "predictions"
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, ddl: str) -> None:
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+# --- 점포(sales) DB ---
+
+def _create_mid_sales(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS mid_sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        collected_at TEXT, mid_code TEXT, mid_name TEXT, product_code TEXT,
+        product_name TEXT, sales INTEGER, order_cnt INTEGER, purchase INTEGER,
+        disposal INTEGER, stock INTEGER, soldout INTEGER,
+        weekday INTEGER, month INTEGER, week_of_year INTEGER, is_holiday INTEGER,
+        temperature REAL, rainfall REAL,
+        sale_date TEXT GENERATED ALWAYS AS (SUBSTR(collected_at, 1, 10)) VIRTUAL,
+        UNIQUE(collected_at, product_code)
+    );
+    """)
+
+
+def _add_soldout(conn: sqlite3.Connection) -> None:
+    """(구 update_db_script.py) soldout 컬럼이 없는 오래된 DB에 컬럼을 추가합니다."""
+    _add_column(conn, "mid_sales", "soldout", "INTEGER DEFAULT 0")
+
+
+def _add_soldout_tracking(conn: sqlite3.Connection) -> None:
+    """(구 update_db_add_soldout_tracking.py) 품절 시작 시각과 지속 시간 컬럼."""
+    _add_column(conn, "mid_sales", "soldout_since", "TEXT")
+    _add_column(conn, "mid_sales", "soldout_duration_hours", "REAL DEFAULT 0")
+
+
+def _create_mid_date_index(conn: sqlite3.Connection) -> None:
+    """중분류별 학습 데이터·상품 추천 쿼리(mid_code = ? AND sale_date ...)용 인덱스."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mid_sales_mid_date ON mid_sales (mid_code, sale_date)")
+
+
+def _create_payload_fingerprints(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS payload_fingerprints (
+        store_code TEXT, sale_date TEXT, digest TEXT, updated_at TEXT,
+        PRIMARY KEY (store_code, sale_date)
+    )
+    """)
+
+
+def _create_weather_daily(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS weather_daily (
+        date TEXT PRIMARY KEY,
+        temperature REAL,
+        rainfall REAL,
+        source TEXT,
+        loaded_at TEXT
+    )
+    """)
+
+
+def _create_calendar_and_backfill_holidays(conn: sqlite3.Connection) -> None:
+    """calendar 테이블을 DB의 전체 기간에 맞춰 채우고 is_holiday를 0/1/2 규칙으로 다시 계산합니다."""
+    first, last = conn.execute("SELECT MIN(sale_date), MAX(sale_date) FROM mid_sales").fetchone()
+    start_year = min(int(first[:4]), CALENDAR_START_YEAR) if first else CALENDAR_START_YEAR
+    end_year = datetime.now().year + CALENDAR_YEARS_AHEAD
+    if last:
+        end_year = max(int(last[:4]), end_year)
+    init_calendar(conn, start_year=start_year, end_year=end_year)
+    if "is_holiday" not in _columns(conn, "mid_sales"):
+        return
+    conn.execute("""
+    UPDATE mid_sales SET is_holiday = (
+        SELECT c.is_holiday FROM calendar c WHERE c.date = mid_sales.sale_date
+    )
+    WHERE is_holiday IS NOT (
+        SELECT c.is_holiday FROM calendar c WHERE c.date = mid_sales.sale_date
+    )
+    """)
+
+
+def _create_hourly_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS hourly_sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT,
+        hour TEXT,
+        product_code TEXT,
+        mid_code TEXT,
+        sales_inc INTEGER,
+        order_cnt_inc INTEGER,
+        purchase_inc INTEGER,
+        disposal_inc INTEGER,
+        stock_inc INTEGER, -- 재고 증감분
+        stock INTEGER, -- 현재 재고 상태
+        UNIQUE(date, hour, product_code, mid_code)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS daily_snapshot (
+        date TEXT,
+        product_code TEXT,
+        mid_code TEXT,
+        sales INTEGER,
+        order_cnt INTEGER,
+        purchase INTEGER,
+        disposal INTEGER,
+        stock INTEGER,
+        PRIMARY KEY (date, product_code, mid_code)
+    )
+    """)
+
+
+SALES_MIGRATIONS: list[Migration] = [
+    Migration(1, "create mid_sales", _create_mid_sales),
+    Migration(2, "add mid_sales.soldout", _add_soldout),
+    Migration(3, "add soldout tracking columns", _add_soldout_tracking),
+    Migration(4, "add sale_date column and indexes", ensure_sale_date),
+    Migration(5, "index mid_sales (mid_code, sale_date)", _create_mid_date_index),
+    Migration(6, "create payload_fingerprints", _create_payload_fingerprints),
+    Migration(7, "create weather_daily", _create_weather_daily),
+    Migration(8, "create calendar and backfill is_holiday", _create_calendar_and_backfill_holidays),
+    Migration(9, "create hourly_sales and daily_snapshot", _create_hourly_tables),
+    Migration(10, "split mid_sales into dimension/fact tables behind a view", normalize_sales_schema),
+    Migration(11, "create mid_daily_agg with change tracking", create_mid_daily_agg),
+]
+
+
+# --- 예측(predictions) DB ---
+
+def _create_prediction_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS category_predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        prediction_date TEXT, target_date TEXT, mid_code TEXT,
+        mid_name TEXT, predicted_sales REAL,
+        UNIQUE(target_date, mid_code)
+    )""")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS category_prediction_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        prediction_id INTEGER, product_code TEXT, product_name TEXT,
+        recommended_quantity INTEGER,
+        FOREIGN KEY (prediction_id) REFERENCES category_predictions (id)
+    )""")
+
+
+def _create_performance_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS prediction_performance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        evaluation_date TEXT,   -- 성능 평가를 수행한 날짜 (오늘)
+        target_date TEXT,       -- 평가 대상 날짜 (어제)
+        mid_code TEXT,          -- 중분류 코드
+        predicted_sales REAL,   -- 어제 예측했던 판매량
+        actual_sales REAL,      -- 어제의 실제 판매량
+        error_rate_percent REAL,-- 오차율 (%)
+        UNIQUE(target_date, mid_code)
+    )
+    """)
+
+
+def _create_prediction_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_prediction_items_prediction_id ON category_prediction_items (prediction_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_prediction_performance_mid_date ON prediction_performance (mid_code, target_date)"
+    )
+
+
+def _purge_orphan_prediction_items(conn: sqlite3.Connection) -> None:
+    """``INSERT OR REPLACE``로 id가 바뀌면서 남은 추천 상품 행을 지웁니다.
+
+    지운 만큼의 빈 페이지는 ``python -m utils.migrations --vacuum``으로 반환합니다.
+    """
+    removed = conn.execute("""
+    DELETE FROM category_prediction_items
+    WHERE prediction_id IS NULL OR prediction_id NOT IN (SELECT id FROM category_predictions)
+    """).rowcount
+    if removed:
+        log.info(f"고아 추천 상품 {removed}행을 삭제했습니다.")
+
+
+PREDICTION_MIGRATIONS: list[Migration] = [
+    Migration(1, "create category_predictions and items", _create_prediction_tables),
+    Migration(2, "create prediction_performance", _create_performance_table),
+    Migration(3, "index prediction items and performance", _create_prediction_indexes),
+    Migration(4, "purge orphaned prediction items", _purge_orphan_prediction_items),
+]
+
+MIGRATIONS: dict[str, list[Migration]] = {
+    SALES: SALES_MIGRATIONS,
+    PREDICTIONS: PREDICTION_MIGRATIONS,
+}
+
+
+def db_kind(db_path: Path) -> str:
+    """파일명으로 DB 종류를 판별합니다."""
+    return PREDICTIONS if Path(db_path).name.startswith("category_predictions_") else SALES
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection, kind: str) -> list[int]:
+    """``kind`` DB에 아직 적용되지 않은 마이그레이션을 순서대로 실행하고, 적용한 번호 목록을 반환합니다.
+
+    마이그레이션마다 커밋하므로 다른 호출자의 트랜잭션이 열린 연결에서 부르면 안 됩니다.
+    보통은 ``get_connection(path, kind)``가 연결을 열 때 한 번 호출합니다.
+    """
+    migrations = MIGRATIONS[kind]
+    version = current_version(conn)
+    pending = [m for m in migrations if m.version > version]
+    applied = []
+    for migration in pending:
+        try:
+            migration.apply(conn)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+            (migration.version, migration.description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        conn.commit()
+        applied.append(migration.version)
+    if applied:
+        log.info(f"{kind} 스키마 마이그레이션 적용: {applied}")
+    return applied
+
+
+def migrate_db(db_path: Path, kind: str | None = None, vacuum: bool = False) -> list[int]:
+    """DB 파일 하나를 최신 스키마로 마이그레이션합니다.
+
+    ``vacuum``이면 마이그레이션 후 VACUUM으로 빈 페이지를 반환합니다. 파일 전체를 다시 쓰므로
+    실행 중 접근 경로가 아닌 CLI에서만 켭니다.
+    """
+    kind = kind or db_kind(db_path)
+    conn = get_connection(db_path)
+    try:
+        applied = apply_migrations(conn, kind)
+        if vacuum:
+            conn.execute("VACUUM")
+            log.info(f"{db_path.name} VACUUM 완료")
+        return applied
+    finally:
+        conn.close()
+
+
+def migrate_all(
+    db_paths: list[Path] | None = None, workers: int = 4, vacuum: bool = False
+) -> dict[str, list[int] | str]:
+    """여러 DB 파일(기본: ``code_outputs/db/*.db``)을 병렬로 마이그레이션합니다.
+
+    Returns:
+        ``{파일명: 적용한 버전 목록}``. 실패한 DB는 오류 메시지 문자열입니다.
+    """
+    if db_paths is None:
+        db_paths = sorted(DB_DIR.glob("*.db"))
+    results: dict[str, list[int] | str] = {}
+
+    def _run(path: Path):
+        try:
+            return path.name, migrate_db(path, vacuum=vacuum)
+        except Exception as e:  # 한 DB의 실패가 다른 DB 마이그레이션을 막지 않도록 합니다.
+            log.error(f"{path.name} 마이그레이션 실패: {e}", exc_info=True)
+            return path.name, f"error: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for name, result in executor.map(_run, db_paths):
+            results[name] = result
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite DB 스키마를 최신 버전으로 마이그레이션합니다.")
+    parser.add_argument("db_paths", nargs="*", help=f"대상 DB 경로 (기본: {DB_DIR}/*.db)")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 DB 수")
+    parser.add_argument("--vacuum", action="store_true", help="마이그레이션 후 VACUUM으로 파일 크기를 줄입니다")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    db_paths = [Path(p) for p in args.db_paths] or None
+    for name, result in migrate_all(db_paths, workers=args.workers, vacuum=args.vacuum).items():
+        print(f"[{'ERROR' if isinstance(result, str) else 'OK'}] {name}: {result}")
+    close_connections()
+
+
+if __name__ == "__main__":
+    main()
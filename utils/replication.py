@@ -0,0 +1,355 @@
+"""Incremental replication of SQLite files to object storage.
+
+Instead of uploading the whole DB file after every run, :func:`replicate`
+uploads only the rows that changed since the last replicated state:
+
+* ``<db>.replica`` is a local copy of the DB as of the last replication and
+  ``<db>.replica.json`` records its sequence number;
+* each run diffs the DB against that copy table by table (by primary key or
+  rowid, using ``EXCEPT``) and uploads the inserted/updated and deleted rows
+  as one gzip-compressed JSON changeset;
+* every ``snapshot_every`` changesets, after a schema change (e.g. a
+  migration) or when the local copy is out of step with the bucket, a full
+  gzip-compressed snapshot replaces the chain and the old objects are removed.
+
+Objects live under ``<prefix>/`` as ``manifest.json``,
+``snapshots/<seq>.db.gz`` and ``changesets/<seq>.json.gz``. The manifest is
+written last, so a crash mid-upload never leaves it pointing at missing
+objects. :func:`restore` rebuilds the DB from the snapshot plus the
+changesets listed in the manifest.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from utils.compression import compress_file, decompress_file
+from utils.sqlite_util import get_connection
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_SNAPSHOT_EVERY = 24
+MANIFEST_NAME = "manifest.json"
+SHADOW_SUFFIX = ".replica"
+STATE_SUFFIX = ".replica.json"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _shadow_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + SHADOW_SUFFIX)
+
+
+def _state_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + STATE_SUFFIX)
+
+
+def local_seq(db_path: Path) -> Optional[int]:
+    """Sequence number of the local replica copy, or None if there is none."""
+    if not _shadow_path(db_path).exists():
+        return None
+    try:
+        return json.loads(_state_path(db_path).read_text(encoding="utf-8"))["seq"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def _write_local_seq(db_path: Path, seq: int) -> None:
+    _state_path(db_path).write_text(json.dumps({"seq": seq}), encoding="utf-8")
+
+
+def read_manifest(storage, prefix: str) -> dict:
+    data = storage.get_bytes(f"{prefix}/{MANIFEST_NAME}")
+    if data is None:
+        return {"format": FORMAT_VERSION, "seq": 0, "snapshot": None, "changesets": []}
+    return json.loads(data.decode("utf-8"))
+
+
+def _write_manifest(storage, prefix: str, manifest: dict) -> None:
+    manifest["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    storage.put_bytes(f"{prefix}/{MANIFEST_NAME}", json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+# --- diff / apply ---
+
+def _schema(conn: sqlite3.Connection, schema: str) -> set[tuple[str, str, str]]:
+    return set(
+        conn.execute(
+            f"SELECT type, name, sql FROM {schema}.sqlite_master "
+            "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+    )
+
+
+def _tables(conn: sqlite3.Connection, schema: str = "main") -> list[tuple[str, str]]:
+    return conn.execute(
+        f"SELECT name, sql FROM {schema}.sqlite_master "
+        "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+
+
+def _table_layout(conn: sqlite3.Connection, table: str, sql: str) -> tuple[list[str], list[str]]:
+    """(key columns, value columns). Generated columns are left out."""
+    info = conn.execute(f"PRAGMA main.table_info({_quote(table)})").fetchall()
+    columns = [row[1] for row in info]
+    pks = [row for row in sorted(info, key=lambda r: r[5]) if row[5]]
+    if "WITHOUT ROWID" in sql.upper():
+        key = [row[1] for row in pks]
+    elif len(pks) == 1 and pks[0][2].upper() == "INTEGER":
+        key = [pks[0][1]]  # rowid alias
+    else:
+        key = ["rowid"]
+    return key, [c for c in columns if c not in key]
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return {"b64": base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        return base64.b64decode(value["b64"])
+    return value
+
+
+def diff_against_base(conn: sqlite3.Connection, base_schema: str = "base") -> dict[str, dict]:
+    """Row changes of every table in ``main`` relative to the attached ``base_schema``.
+
+    Both databases must have the same schema.
+    """
+    tables: dict[str, dict] = {}
+    for table, sql in _tables(conn):
+        key, values = _table_layout(conn, table, sql)
+        cols = ", ".join(_quote(c) for c in key + values)
+        keys = ", ".join(_quote(c) for c in key)
+        name = _quote(table)
+        upserts = conn.execute(
+            f"SELECT {cols} FROM main.{name} EXCEPT SELECT {cols} FROM {base_schema}.{name}"
+        ).fetchall()
+        deletes = conn.execute(
+            f"SELECT {keys} FROM {base_schema}.{name} EXCEPT SELECT {keys} FROM main.{name}"
+        ).fetchall()
+        if upserts or deletes:
+            tables[table] = {
+                "key": key,
+                "columns": values,
+                "upserts": [[_encode(v) for v in row] for row in upserts],
+                "deletes": [[_encode(v) for v in row] for row in deletes],
+            }
+    return tables
+
+
+def apply_changeset(conn: sqlite3.Connection, changeset: dict) -> int:
+    """Applies a changeset in one transaction; returns the number of rows touched.
+
+    Triggers on tables are dropped while the rows are written and recreated
+    afterwards: the changeset already carries the rows they wrote on the
+    source (e.g. ``mid_daily_agg_dirty``), and firing them again would leave
+    the target with rows the source does not have.
+    """
+    triggers = conn.execute(
+        "SELECT t.name, t.sql FROM sqlite_master t "
+        "JOIN sqlite_master o ON o.name = t.tbl_name AND o.type = 'table' "
+        "WHERE t.type = 'trigger'"
+    ).fetchall()
+    touched = 0
+    # Explicit BEGIN: the trigger DDL has to be part of the same transaction.
+    conn.execute("BEGIN")
+    try:
+        for name, _sql in triggers:
+            conn.execute(f"DROP TRIGGER {_quote(name)}")
+        for table, change in changeset["tables"].items():
+            name = _quote(table)
+            key = change["key"]
+            if change["deletes"]:
+                where = " AND ".join(f"{_quote(c)} = ?" for c in key)
+                conn.executemany(
+                    f"DELETE FROM {name} WHERE {where}",
+                    [[_decode(v) for v in row] for row in change["deletes"]],
+                )
+            if change["upserts"]:
+                cols = key + change["columns"]
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {name} ({', '.join(_quote(c) for c in cols)}) "
+                    f"VALUES ({', '.join('?' * len(cols))})",
+                    [[_decode(v) for v in row] for row in change["upserts"]],
+                )
+            touched += len(change["deletes"]) + len(change["upserts"])
+        for _name, sql in triggers:
+            conn.execute(sql)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return touched
+
+
+# --- replicate / restore ---
+
+def _backup(src: Path, dest: Path) -> None:
+    """Consistent copy of ``src`` to ``dest`` through the SQLite backup API."""
+    tmp = dest.with_name(dest.name + ".part")
+    target = sqlite3.connect(tmp)
+    try:
+        get_connection(src).backup(target)
+    finally:
+        target.close()
+    os.replace(tmp, dest)
+
+
+def _upload_snapshot(db_path: Path, storage, prefix: str, manifest: dict, reason: str) -> dict:
+    seq = manifest["seq"] + 1
+    shadow = _shadow_path(db_path)
+    _backup(db_path, shadow)
+    key = f"{prefix}/snapshots/{seq:08d}.db.gz"
+    with tempfile.TemporaryDirectory() as tmp:
+        packed = Path(tmp) / "snapshot.db.gz"
+        compress_file(shadow, packed, "gzip")
+        size = packed.stat().st_size
+        storage.put_file(key, packed)
+
+    stale = [manifest["snapshot"], *manifest["changesets"]] if manifest.get("snapshot") else []
+    _write_manifest(storage, prefix, {
+        "format": FORMAT_VERSION,
+        "seq": seq,
+        "snapshot": key,
+        "snapshot_seq": seq,
+        "changesets": [],
+    })
+    _write_local_seq(db_path, seq)
+    for old in stale:
+        storage.delete(old)
+    logger.info(f"Replicated {db_path.name} as snapshot {seq} ({size} bytes, {reason}).")
+    return {"mode": "snapshot", "seq": seq, "bytes": size, "reason": reason}
+
+
+def replicate(
+    db_path: Path,
+    storage,
+    prefix: str,
+    snapshot_every: int = DEFAULT_SNAPSHOT_EVERY,
+) -> dict:
+    """Uploads this run's changes to ``db_path`` as a changeset (or a snapshot).
+
+    Close or checkpoint writers first; the DB is read through its pooled connection.
+    Returns ``{"mode": "noop" | "changeset" | "snapshot", "seq", "bytes", ...}``.
+    """
+    manifest = read_manifest(storage, prefix)
+    shadow = _shadow_path(db_path)
+    if manifest.get("snapshot") is None:
+        return _upload_snapshot(db_path, storage, prefix, manifest, "no snapshot yet")
+    if local_seq(db_path) != manifest["seq"]:
+        return _upload_snapshot(db_path, storage, prefix, manifest, "local replica out of date")
+    if len(manifest["changesets"]) >= snapshot_every:
+        return _upload_snapshot(db_path, storage, prefix, manifest, "changeset chain full")
+
+    conn = get_connection(db_path)
+    conn.execute("ATTACH DATABASE ? AS base", (str(shadow),))
+    try:
+        if _schema(conn, "main") != _schema(conn, "base"):
+            changes = None
+        else:
+            changes = diff_against_base(conn)
+    finally:
+        conn.execute("DETACH DATABASE base")
+        conn.close()
+
+    if changes is None:
+        return _upload_snapshot(db_path, storage, prefix, manifest, "schema changed")
+    if not changes:
+        logger.info(f"No row changes in {db_path.name} since replica {manifest['seq']}. Nothing to upload.")
+        return {"mode": "noop", "seq": manifest["seq"], "bytes": 0}
+
+    seq = manifest["seq"] + 1
+    changeset = {
+        "format": FORMAT_VERSION,
+        "base_seq": manifest["seq"],
+        "seq": seq,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "tables": changes,
+    }
+    payload = gzip.compress(json.dumps(changeset, ensure_ascii=False).encode("utf-8"))
+    key = f"{prefix}/changesets/{seq:08d}.json.gz"
+    storage.put_bytes(key, payload)
+    manifest["changesets"].append(key)
+    manifest["seq"] = seq
+    _write_manifest(storage, prefix, manifest)
+    _backup(db_path, shadow)
+    _write_local_seq(db_path, seq)
+
+    rows = sum(len(c["upserts"]) + len(c["deletes"]) for c in changes.values())
+    logger.info(f"Replicated {db_path.name} changeset {seq}: {rows} rows in {len(changes)} tables, {len(payload)} bytes.")
+    return {"mode": "changeset", "seq": seq, "bytes": len(payload), "rows": rows}
+
+
+def restore(storage, prefix: str, dest: Path) -> Optional[int]:
+    """Rebuilds ``dest`` from the latest snapshot plus its changesets.
+
+    Returns the restored sequence number, or None if nothing is replicated yet.
+    The result also becomes the local replica copy for the next :func:`replicate`.
+    """
+    manifest = read_manifest(storage, prefix)
+    if manifest.get("snapshot") is None:
+        return None
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        packed = Path(tmp) / "snapshot.db.gz"
+        if not storage.get_file(manifest["snapshot"], packed):
+            raise FileNotFoundError(f"Snapshot {manifest['snapshot']} listed in the manifest is missing")
+        work = Path(tmp) / "restore.db"
+        decompress_file(packed, work, "gzip")
+
+        conn = sqlite3.connect(work)
+        try:
+            for key in manifest["changesets"]:
+                data = storage.get_bytes(key)
+                if data is None:
+                    raise FileNotFoundError(f"Changeset {key} listed in the manifest is missing")
+                apply_changeset(conn, json.loads(gzip.decompress(data).decode("utf-8")))
+        finally:
+            conn.close()
+
+        shutil.copyfile(work, _shadow_path(dest))
+        for suffix in ("-wal", "-shm"):
+            Path(f"{dest}{suffix}").unlink(missing_ok=True)
+        shutil.move(str(work), dest)
+    _write_local_seq(dest, manifest["seq"])
+    logger.info(
+        f"Restored {dest.name} to replica {manifest['seq']} "
+        f"(snapshot + {len(manifest['changesets'])} changesets)."
+    )
+    return manifest["seq"]
+
+
+def sync_local_copy(db_path: Path, storage, prefix: str) -> Optional[int]:
+    """Makes ``db_path`` equal to the replicated state before a run.
+
+    If the local replica copy is already at the manifest's sequence number it is
+    copied over ``db_path`` (dropping any unreplicated local writes) without
+    touching the bucket beyond the manifest; otherwise the DB is restored.
+    """
+    manifest = read_manifest(storage, prefix)
+    if manifest.get("snapshot") is None:
+        return None
+    if local_seq(db_path) == manifest["seq"]:
+        for suffix in ("-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+        shutil.copyfile(_shadow_path(db_path), db_path)
+        logger.info(f"{db_path.name} is at replica {manifest['seq']}. Skipping download.")
+        return manifest["seq"]
+    return restore(storage, prefix, db_path)
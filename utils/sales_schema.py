@@ -0,0 +1,329 @@
+"""판매 데이터 스키마 관리: 판매일(``sale_date``) 컬럼·인덱스와 정규화 테이블.
+
+``sale_date``는 ``SUBSTR(collected_at, 1, 10)``으로 정의된 VIRTUAL 생성 컬럼입니다.
+값은 인덱스에만 저장되므로 기존 DB에도 ``ALTER TABLE``만으로 추가되고,
+날짜 조건/그룹핑 쿼리는 전체 스캔 대신 인덱스를 사용합니다.
+
+:func:`normalize_sales_schema`는 ``mid_sales`` 테이블을 차원 테이블(``mid_categories``,
+``products``)과 팩트 테이블(``sales_fact``)로 나누고, 같은 이름의 호환 뷰를 남깁니다.
+중분류·일자별 합계는 ``mid_daily_agg``에 두고 변경된 날짜만 :func:`refresh_mid_daily_agg`로 갱신합니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+SALE_DATE_COLUMN_DDL = "sale_date TEXT GENERATED ALWAYS AS (SUBSTR(collected_at, 1, 10)) VIRTUAL"
+
+# (판매일, 상품코드) 유니크 인덱스: write_sales_data UPSERT의 충돌 대상
+DAY_PRODUCT_INDEX = "idx_mid_sales_day_product"
+# 날짜 범위 조회·중분류 집계용 인덱스
+SALE_DATE_INDEX = "idx_mid_sales_sale_date"
+
+
+def _dedupe_day_product(conn: sqlite3.Connection) -> int:
+    """같은 판매일·상품의 중복 행 중 가장 최근 수집분(collected_at, rowid 기준)만 남깁니다.
+
+    ``pandas.to_sql``로 만든 테이블처럼 ``id`` 컬럼이 없어도 되도록 rowid를 씁니다.
+    ``id INTEGER PRIMARY KEY`` 테이블에서는 rowid가 곧 ``id``입니다.
+    """
+    return conn.execute("""
+    DELETE FROM mid_sales WHERE rowid IN (
+        SELECT rid FROM (
+            SELECT rowid AS rid, ROW_NUMBER() OVER (
+                PARTITION BY sale_date, product_code
+                ORDER BY collected_at DESC, rowid DESC
+            ) AS rn
+            FROM mid_sales
+        ) WHERE rn > 1
+    )
+    """).rowcount
+
+
+def ensure_sale_date(conn: sqlite3.Connection) -> None:
+    """``sale_date`` 컬럼과 인덱스가 없으면 추가합니다. ``mid_sales``가 없으면 아무것도 하지 않습니다.
+
+    이미 적용된 DB에서는 스키마 조회만 하므로 연결할 때마다 호출해도 됩니다.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(mid_sales)")}
+    if not columns:
+        return
+    if "sale_date" not in columns:
+        conn.execute(f"ALTER TABLE mid_sales ADD COLUMN {SALE_DATE_COLUMN_DDL}")
+        log.info("mid_sales에 sale_date 생성 컬럼을 추가했습니다.")
+
+    indexes = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'mid_sales'")
+    }
+    if DAY_PRODUCT_INDEX not in indexes:
+        removed = _dedupe_day_product(conn)
+        if removed:
+            log.info(f"중복된 (판매일, 상품) 행 {removed}건을 정리했습니다.")
+        conn.execute(f"CREATE UNIQUE INDEX {DAY_PRODUCT_INDEX} ON mid_sales (sale_date, product_code)")
+    if SALE_DATE_INDEX not in indexes:
+        conn.execute(f"CREATE INDEX {SALE_DATE_INDEX} ON mid_sales (sale_date, mid_code, product_code)")
+    conn.commit()
+
+
+# --- 정규화 스키마: 차원 테이블 + 팩트 테이블 + 호환 뷰 ---
+#
+# 중분류명·상품명은 ``mid_categories``/``products``에 한 번만 저장하고,
+# ``sales_fact``에는 정수 키와 수치만 둡니다. 기존 조회 코드는 같은 컬럼 구성의
+# ``mid_sales`` 뷰를 그대로 읽고, 뷰에 대한 INSERT/UPDATE/DELETE는 INSTEAD OF
+# 트리거가 차원·팩트 테이블로 옮겨 줍니다.
+
+FACT_DAY_PRODUCT_INDEX = "idx_sales_fact_day_product"
+FACT_SALE_DATE_INDEX = "idx_sales_fact_sale_date"
+FACT_MID_DATE_INDEX = "idx_sales_fact_mid_date"
+
+# 팩트 테이블의 수치·특성 컬럼 (뷰 컬럼명과 같음)
+FACT_VALUE_COLUMNS = (
+    "sales", "order_cnt", "purchase", "disposal", "stock", "soldout",
+    "weekday", "month", "week_of_year", "is_holiday", "temperature", "rainfall",
+    "soldout_since", "soldout_duration_hours",
+)
+
+_CREATE_DIMENSIONS_SQL = """
+CREATE TABLE IF NOT EXISTS mid_categories (
+    id INTEGER PRIMARY KEY,
+    mid_code TEXT NOT NULL UNIQUE,
+    mid_name TEXT
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    product_code TEXT NOT NULL UNIQUE,
+    product_name TEXT
+);
+"""
+
+_CREATE_FACT_SQL = f"""
+CREATE TABLE IF NOT EXISTS sales_fact (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collected_at TEXT,
+    mid_id INTEGER REFERENCES mid_categories (id),
+    product_id INTEGER NOT NULL REFERENCES products (id),
+    sales INTEGER, order_cnt INTEGER, purchase INTEGER,
+    disposal INTEGER, stock INTEGER, soldout INTEGER,
+    weekday INTEGER, month INTEGER, week_of_year INTEGER, is_holiday INTEGER,
+    temperature REAL, rainfall REAL,
+    soldout_since TEXT, soldout_duration_hours REAL DEFAULT 0,
+    {SALE_DATE_COLUMN_DDL}
+);
+CREATE UNIQUE INDEX IF NOT EXISTS {FACT_DAY_PRODUCT_INDEX} ON sales_fact (sale_date, product_id);
+CREATE INDEX IF NOT EXISTS {FACT_SALE_DATE_INDEX} ON sales_fact (sale_date, mid_id, product_id);
+CREATE INDEX IF NOT EXISTS {FACT_MID_DATE_INDEX} ON sales_fact (mid_id, sale_date);
+"""
+
+_VIEW_VALUE_COLUMNS = ", ".join(f"f.{c}" for c in FACT_VALUE_COLUMNS)
+
+_CREATE_VIEW_SQL = f"""
+CREATE VIEW IF NOT EXISTS mid_sales AS
+SELECT
+    f.id AS id, f.collected_at AS collected_at,
+    m.mid_code AS mid_code, m.mid_name AS mid_name,
+    p.product_code AS product_code, p.product_name AS product_name,
+    {_VIEW_VALUE_COLUMNS},
+    f.sale_date AS sale_date
+FROM sales_fact f
+JOIN products p ON p.id = f.product_id
+LEFT JOIN mid_categories m ON m.id = f.mid_id;
+"""
+
+# 차원 행 upsert: 이름이 비어 있는 레코드가 기존 이름을 지우지 않도록 COALESCE 합니다.
+UPSERT_MID_CATEGORY_SQL = """
+INSERT INTO mid_categories (mid_code, mid_name) VALUES (?, ?)
+ON CONFLICT (mid_code) DO UPDATE SET mid_name = COALESCE(excluded.mid_name, mid_name)
+"""
+UPSERT_PRODUCT_SQL = """
+INSERT INTO products (product_code, product_name) VALUES (?, ?)
+ON CONFLICT (product_code) DO UPDATE SET product_name = COALESCE(excluded.product_name, product_name)
+"""
+
+_NEW_VALUES = ", ".join(f"NEW.{c}" for c in FACT_VALUE_COLUMNS)
+_SET_VALUES = ", ".join(f"{c} = NEW.{c}" for c in FACT_VALUE_COLUMNS)
+
+_TRIGGER_UPSERT_DIMENSIONS = """
+    INSERT INTO mid_categories (mid_code, mid_name)
+    SELECT NEW.mid_code, NEW.mid_name WHERE NEW.mid_code IS NOT NULL
+    ON CONFLICT (mid_code) DO UPDATE SET mid_name = COALESCE(excluded.mid_name, mid_name);
+    INSERT INTO products (product_code, product_name)
+    SELECT NEW.product_code, NEW.product_name WHERE NEW.product_code IS NOT NULL
+    ON CONFLICT (product_code) DO UPDATE SET product_name = COALESCE(excluded.product_name, product_name);
+"""
+
+_CREATE_VIEW_TRIGGERS_SQL = f"""
+CREATE TRIGGER IF NOT EXISTS mid_sales_insert INSTEAD OF INSERT ON mid_sales
+BEGIN
+    {_TRIGGER_UPSERT_DIMENSIONS}
+    INSERT INTO sales_fact (collected_at, mid_id, product_id, {", ".join(FACT_VALUE_COLUMNS)})
+    VALUES (
+        NEW.collected_at,
+        (SELECT id FROM mid_categories WHERE mid_code = NEW.mid_code),
+        (SELECT id FROM products WHERE product_code = NEW.product_code),
+        {_NEW_VALUES}
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS mid_sales_update INSTEAD OF UPDATE ON mid_sales
+BEGIN
+    {_TRIGGER_UPSERT_DIMENSIONS}
+    UPDATE sales_fact SET
+        collected_at = NEW.collected_at,
+        mid_id = (SELECT id FROM mid_categories WHERE mid_code = NEW.mid_code),
+        product_id = (SELECT id FROM products WHERE product_code = NEW.product_code),
+        {_SET_VALUES}
+    WHERE id = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS mid_sales_delete INSTEAD OF DELETE ON mid_sales
+BEGIN
+    DELETE FROM sales_fact WHERE id = OLD.id;
+END;
+"""
+
+
+def _object_type(conn: sqlite3.Connection, name: str) -> str | None:
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _copy_legacy_mid_sales(conn: sqlite3.Connection) -> int:
+    """기존 ``mid_sales`` 테이블 행을 차원·팩트 테이블로 옮기고 옮긴 행 수를 반환합니다.
+
+    이름은 코드별 가장 최근 수집분을 사용하고, 팩트 행은 기존 rowid(``id``)를 유지합니다.
+    오래된 DB에 없는 컬럼은 NULL로 채웁니다. ``product_code``가 없는 행은 팩트 테이블에
+    담을 수 없어 건너뛰고 건수를 경고로 남기며, 그 밖의 이유로 옮기지 못한 행이 있으면
+    기존 테이블을 지우기 전에 중단합니다.
+    """
+    legacy = {row[1] for row in conn.execute("PRAGMA table_xinfo(mid_sales)")}
+
+    def col(name: str) -> str:
+        return f"s.{name}" if name in legacy else "NULL"
+
+    for table, code, name in (("mid_categories", "mid_code", "mid_name"), ("products", "product_code", "product_name")):
+        conn.execute(f"""
+        INSERT OR IGNORE INTO {table} ({code}, {name})
+        SELECT {code}, {name} FROM (
+            SELECT s.{code} AS {code}, {col(name)} AS {name}, ROW_NUMBER() OVER (
+                PARTITION BY s.{code} ORDER BY s.collected_at DESC, s.rowid DESC
+            ) AS rn
+            FROM mid_sales s WHERE s.{code} IS NOT NULL
+        ) WHERE rn = 1 ORDER BY {code}
+        """)
+    total, without_product = conn.execute(
+        "SELECT COUNT(*), COUNT(*) - COUNT(product_code) FROM mid_sales"
+    ).fetchone()
+    values = ", ".join(col(c) for c in FACT_VALUE_COLUMNS)
+    moved = conn.execute(f"""
+    INSERT OR IGNORE INTO sales_fact (id, collected_at, mid_id, product_id, {", ".join(FACT_VALUE_COLUMNS)})
+    SELECT s.rowid, s.collected_at, m.id, p.id, {values}
+    FROM mid_sales s
+    JOIN products p ON p.product_code = s.product_code
+    LEFT JOIN mid_categories m ON m.mid_code = s.mid_code
+    ORDER BY s.rowid
+    """).rowcount
+    if without_product:
+        log.warning(f"product_code가 없는 mid_sales {without_product}행은 sales_fact로 옮기지 않았습니다.")
+    collided = total - without_product - moved
+    if collided:
+        raise RuntimeError(
+            f"mid_sales {collided}행이 기존 sales_fact 행과 겹쳐 옮겨지지 않았습니다. "
+            "mid_sales를 지우지 않고 변환을 중단합니다."
+        )
+    return moved
+
+
+def normalize_sales_schema(conn: sqlite3.Connection) -> None:
+    """``mid_sales`` 테이블을 차원/팩트 테이블과 같은 이름의 호환 뷰로 바꿉니다.
+
+    이미 뷰로 바뀐 DB에서는 누락된 객체만 만들므로 여러 번 실행해도 됩니다.
+    변환 후 남는 빈 페이지는 ``python -m utils.migrations --vacuum``으로 반환합니다.
+    """
+    conn.executescript(_CREATE_DIMENSIONS_SQL + _CREATE_FACT_SQL)
+    if _object_type(conn, "mid_sales") == "table":
+        moved = _copy_legacy_mid_sales(conn)
+        conn.execute("DROP TABLE mid_sales")
+        log.info(f"mid_sales {moved}행을 sales_fact/products/mid_categories로 옮겼습니다.")
+    conn.executescript(_CREATE_VIEW_SQL + _CREATE_VIEW_TRIGGERS_SQL)
+    conn.commit()
+
+
+# --- 중분류·일자별 집계 테이블 ---
+#
+# ``sales_fact``가 바뀌면 트리거가 해당 판매일을 ``mid_daily_agg_dirty``에 표시하고,
+# :func:`refresh_mid_daily_agg`가 표시된 날짜만 다시 집계합니다. 학습·모니터링은
+# 전체 이력을 GROUP BY 하는 대신 이 테이블을 읽습니다.
+
+_DAILY_AGG_TRIGGER_COLUMNS = "collected_at, mid_id, sales, purchase, disposal, soldout, stock"
+
+# 판매일 변경 표시. 바깥 문장(UPSERT 등)의 충돌 처리 방식이 트리거 안의 ``OR IGNORE``를
+# 덮어쓰므로, 이미 표시된 날짜는 NOT EXISTS로 건너뜁니다.
+_MARK_DIRTY = (
+    "INSERT INTO mid_daily_agg_dirty (sale_date) SELECT {day} "
+    "WHERE {day} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM mid_daily_agg_dirty WHERE sale_date = {day});"
+)
+
+_CREATE_DAILY_AGG_SQL = f"""
+CREATE TABLE IF NOT EXISTS mid_daily_agg (
+    sale_date TEXT NOT NULL,
+    mid_code TEXT NOT NULL,
+    collected_at TEXT,
+    total_sales INTEGER,
+    total_purchase INTEGER,
+    total_disposal INTEGER,
+    total_soldout INTEGER,
+    total_stock INTEGER,
+    PRIMARY KEY (sale_date, mid_code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_mid_daily_agg_mid_date ON mid_daily_agg (mid_code, sale_date);
+CREATE TABLE IF NOT EXISTS mid_daily_agg_dirty (sale_date TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS sales_fact_agg_insert AFTER INSERT ON sales_fact
+BEGIN
+    {_MARK_DIRTY.format(day="NEW.sale_date")}
+END;
+CREATE TRIGGER IF NOT EXISTS sales_fact_agg_update AFTER UPDATE OF {_DAILY_AGG_TRIGGER_COLUMNS} ON sales_fact
+BEGIN
+    {_MARK_DIRTY.format(day="OLD.sale_date")}
+    {_MARK_DIRTY.format(day="NEW.sale_date")}
+END;
+CREATE TRIGGER IF NOT EXISTS sales_fact_agg_delete AFTER DELETE ON sales_fact
+BEGIN
+    {_MARK_DIRTY.format(day="OLD.sale_date")}
+END;
+"""
+
+
+def refresh_mid_daily_agg(conn: sqlite3.Connection) -> int:
+    """변경 표시된 판매일의 ``mid_daily_agg`` 행만 다시 집계하고, 다시 집계한 날짜 수를 반환합니다.
+
+    커밋하지 않으므로 호출하는 쪽의 쓰기 트랜잭션 안에서 함께 반영됩니다.
+    """
+    dirty = conn.execute("SELECT COUNT(*) FROM mid_daily_agg_dirty").fetchone()[0]
+    if not dirty:
+        return 0
+    conn.execute("DELETE FROM mid_daily_agg WHERE sale_date IN (SELECT sale_date FROM mid_daily_agg_dirty)")
+    conn.execute("""
+    INSERT INTO mid_daily_agg (
+        sale_date, mid_code, collected_at,
+        total_sales, total_purchase, total_disposal, total_soldout, total_stock
+    )
+    SELECT f.sale_date, m.mid_code, MAX(f.collected_at),
+           SUM(f.sales), SUM(f.purchase), SUM(f.disposal), SUM(f.soldout), SUM(f.stock)
+    FROM sales_fact f
+    JOIN mid_categories m ON m.id = f.mid_id
+    WHERE f.sale_date IN (SELECT sale_date FROM mid_daily_agg_dirty)
+    GROUP BY f.sale_date, f.mid_id
+    """)
+    conn.execute("DELETE FROM mid_daily_agg_dirty")
+    return dirty
+
+
+def create_mid_daily_agg(conn: sqlite3.Connection) -> None:
+    """집계 테이블과 변경 표시 트리거를 만들고 전체 기간을 한 번 백필합니다."""
+    conn.executescript(_CREATE_DAILY_AGG_SQL)
+    conn.execute(
+        "INSERT OR IGNORE INTO mid_daily_agg_dirty (sale_date) "
+        "SELECT DISTINCT sale_date FROM sales_fact WHERE sale_date IS NOT NULL"
+    )
+    refresh_mid_daily_agg(conn)
@@ -0,0 +1,148 @@
+"""Per-store cache of BGF login cookies.
+
+Cookies are kept encrypted (Fernet, key from ``SESSION_CACHE_KEY``) in the
+store's own SQLite DB so they travel with the DB between runs. When no key
+is configured the cache is disabled and every run logs in as before.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from utils.api_collector import get_session, new_session, validate_session
+from utils.sqlite_util import get_connection
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_KEY_ENV = "SESSION_CACHE_KEY"
+DEFAULT_MAX_AGE_HOURS = 12
+
+
+def _get_cipher():
+    key = os.environ.get(SESSION_CACHE_KEY_ENV)
+    if not key:
+        return None
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:  # pragma: no cover - optional dependency
+        logger.warning("cryptography is not installed; session cache disabled.")
+        return None
+    try:
+        return Fernet(key.encode())
+    except ValueError:
+        logger.error(f"{SESSION_CACHE_KEY_ENV} is not a valid Fernet key; session cache disabled.")
+        return None
+
+
+def _init_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+    CREATE TABLE IF NOT EXISTS session_cookies (
+        store_id TEXT PRIMARY KEY,
+        cookies BLOB,
+        saved_at TEXT
+    )"""
+    )
+
+
+def _dump_cookies(session: requests.Session) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": c.name,
+            "value": c.value,
+            "domain": c.domain,
+            "path": c.path,
+            "expires": c.expires,
+            "secure": c.secure,
+        }
+        for c in session.cookies
+    ]
+
+
+def save_session_cookies(db_path: Path, store_id: str, session: requests.Session) -> bool:
+    """Encrypts the session cookies and stores them for ``store_id``."""
+    cipher = _get_cipher()
+    if cipher is None:
+        return False
+    token = cipher.encrypt(json.dumps(_dump_cookies(session)).encode("utf-8"))
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with get_connection(db_path) as conn:
+        _init_table(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO session_cookies (store_id, cookies, saved_at) VALUES (?, ?, ?)",
+            (store_id, token, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+    logger.debug(f"Cached {len(session.cookies)} cookies for {store_id}.")
+    return True
+
+
+def load_session_cookies(
+    db_path: Path, store_id: str, max_age_hours: float = DEFAULT_MAX_AGE_HOURS
+) -> Optional[List[Dict[str, Any]]]:
+    """Returns cached cookies for ``store_id`` or ``None`` if absent, stale or unreadable."""
+    cipher = _get_cipher()
+    if cipher is None or not db_path.exists():
+        return None
+    try:
+        with get_connection(db_path) as conn:
+            _init_table(conn)
+            row = conn.execute(
+                "SELECT cookies, saved_at FROM session_cookies WHERE store_id = ?", (store_id,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to read session cache for {store_id}: {e}")
+        return None
+    if row is None:
+        return None
+
+    token, saved_at = row
+    if datetime.now() - datetime.strptime(saved_at, "%Y-%m-%d %H:%M:%S") > timedelta(hours=max_age_hours):
+        logger.debug(f"Cached session for {store_id} is older than {max_age_hours}h.")
+        return None
+    try:
+        return json.loads(cipher.decrypt(token))
+    except Exception as e:
+        logger.warning(f"Cached session for {store_id} could not be decrypted: {e}")
+        return None
+
+
+def clear_session_cookies(db_path: Path, store_id: str) -> None:
+    if not db_path.exists():
+        return
+    with get_connection(db_path) as conn:
+        _init_table(conn)
+        conn.execute("DELETE FROM session_cookies WHERE store_id = ?", (store_id,))
+
+
+def get_cached_session(
+    credentials: Dict[str, str],
+    db_path: Path,
+    store_id: str,
+    store_code: str,
+    max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+) -> Optional[requests.Session]:
+    """Reuses cached cookies when they still work, otherwise logs in and caches the new session."""
+    cookies = load_session_cookies(db_path, store_id, max_age_hours)
+    if cookies:
+        session = new_session()
+        for c in cookies:
+            session.cookies.set(
+                c["name"], c["value"], domain=c["domain"], path=c["path"],
+                expires=c["expires"], secure=c["secure"],
+            )
+        if validate_session(session, store_code):
+            logger.info(f"Reusing cached session for {store_id}.")
+            return session
+        logger.info(f"Cached session for {store_id} expired. Logging in again.")
+        clear_session_cookies(db_path, store_id)
+
+    session = get_session(credentials)
+    if session is not None:
+        save_session_cookies(db_path, store_id, session)
+    return session
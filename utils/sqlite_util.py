@@ -0,0 +1,206 @@
+"""Shared SQLite connection factory.
+
+Every module opens its databases through :func:`get_connection`, which
+
+* applies the performance PRAGMAs once per connection (WAL journaling,
+  ``synchronous=NORMAL``, memory-mapped I/O, a larger page cache and
+  in-memory temp storage), and
+* reuses one connection per database file per thread for the whole run.
+
+Callers keep their usual ``with conn:`` / ``conn.close()`` code: closing a
+pooled connection only rolls back an unfinished transaction, exactly as a
+real close would, and leaves the connection cached for the next caller.
+Because callees share the caller's connection, a transaction belongs to
+whoever opened it: a ``with conn:`` block entered while a transaction is
+already open neither commits nor rolls back on exit, and ``close()`` leaves
+a transaction alone that was open when the connection was handed out or
+that an enclosing ``with`` block owns.
+
+``get_connection(path, kind)`` brings the file up to date with the
+:mod:`utils.migrations` schema of ``kind`` once, when the connection opens,
+so read and write helpers never run migrations on a borrowed connection.
+
+Before a DB file is replaced (GCS download) or shipped (GCS upload), call
+:func:`close_connections` / :func:`checkpoint_and_close` so that no cached
+connection points at stale pages and the WAL is folded into the main file.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -64 * 1024),  # KiB -> 64 MiB
+    ("temp_store", "MEMORY"),
+)
+BUSY_TIMEOUT_SECONDS = 30
+
+PathLike = Union[str, Path]
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connection whose ``close()`` keeps it open for reuse within the run."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # One entry per active ``with`` block: was a transaction already open on entry?
+        self._scopes: list[bool] = []
+        self._tx_at_handout = False
+        self._migrated: set[str] = set()
+
+    def __enter__(self):
+        self._scopes.append(self.in_transaction)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        nested = self._scopes.pop() if self._scopes else False
+        if nested:
+            # The enclosing owner commits or rolls back.
+            return False
+        return super().__exit__(exc_type, exc_value, traceback)
+
+    def close(self) -> None:  # noqa: D401 - keeps sqlite3 semantics for callers
+        if self.in_transaction and not self._scopes and not self._tx_at_handout:
+            self.rollback()
+
+    def _close(self) -> None:
+        super().close()
+
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+# Every live pooled connection, across threads: (resolved path, connection).
+_registry: set[tuple[str, PooledConnection]] = set()
+
+
+def _file_identity(path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _open(path: str) -> PooledConnection:
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        factory=PooledConnection,
+        check_same_thread=False,
+    )
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def _cache() -> dict:
+    cache = getattr(_local, "connections", None)
+    if cache is None:
+        cache = _local.connections = {}
+    return cache
+
+
+def get_connection(db_path: PathLike, kind: Optional[str] = None) -> sqlite3.Connection:
+    """Returns this thread's connection to ``db_path``, opening it on first use.
+
+    A cached connection is dropped when the file was deleted or replaced
+    (different inode) or when it was closed through :func:`close_connections`.
+    With ``kind`` (``utils.migrations.SALES``/``PREDICTIONS``) pending schema
+    migrations are applied the first time the connection is handed out for it.
+    """
+    conn = _get_cached(db_path)
+    if kind is not None and kind not in conn._migrated and not conn.in_transaction:
+        # Imported here: utils.migrations itself opens files through this module.
+        from utils.migrations import apply_migrations
+
+        apply_migrations(conn, kind)
+        conn._migrated.add(kind)
+    conn._tx_at_handout = conn.in_transaction
+    return conn
+
+
+def _get_cached(db_path: PathLike) -> PooledConnection:
+    path = str(Path(db_path).resolve())
+    cache = _cache()
+    entry = cache.get(path)
+    if entry is not None:
+        conn, identity = entry
+        if (path, conn) in _registry and identity == _file_identity(path):
+            return conn
+        cache.pop(path, None)
+        _discard(path, conn)
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = _open(path)
+    cache[path] = (conn, _file_identity(path))
+    with _registry_lock:
+        _registry.add((path, conn))
+    return conn
+
+
+def _discard(path: str, conn: PooledConnection) -> None:
+    with _registry_lock:
+        _registry.discard((path, conn))
+    try:
+        conn._close()
+    except sqlite3.Error:
+        pass
+
+
+def close_connections(db_path: Optional[PathLike] = None) -> int:
+    """Closes pooled connections to ``db_path`` (or all of them) in every thread.
+
+    Returns the number of connections closed.
+    """
+    target = str(Path(db_path).resolve()) if db_path is not None else None
+    with _registry_lock:
+        victims = [(p, c) for p, c in _registry if target is None or p == target]
+        for item in victims:
+            _registry.discard(item)
+    for _path, conn in victims:
+        try:
+            conn._close()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to close SQLite connection to {_path}: {e}")
+    return len(victims)
+
+
+def checkpoint_and_close(db_path: PathLike) -> None:
+    """Folds the WAL into ``db_path`` and closes its pooled connections.
+
+    The main file is then self-contained and can be copied or uploaded.
+    """
+    if not Path(db_path).exists():
+        return
+    conn = get_connection(db_path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.Error as e:
+        logger.warning(f"WAL checkpoint failed for {db_path}: {e}")
+    finally:
+        close_connections(db_path)
+
+
+def prepare_for_replace(db_path: PathLike) -> None:
+    """Closes pooled connections and removes ``-wal``/``-shm`` files of ``db_path``.
+
+    Call before the file is overwritten by a download: a leftover WAL from an
+    earlier run would otherwise be replayed on top of the new file.
+    """
+    close_connections(db_path)
+    for suffix in ("-wal", "-shm"):
+        sidecar = Path(f"{db_path}{suffix}")
+        try:
+            sidecar.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,365 @@
+"""Object storage backends for the store DBs.
+
+Every backend exposes the same interface over ``/``-separated keys:
+
+* whole-file sync: :meth:`Storage.download`, :meth:`Storage.upload`,
+  :meth:`Storage.stat`, :meth:`Storage.list`;
+* small objects for replication: ``exists``, ``get_bytes``, ``put_bytes``,
+  ``get_file``, ``put_file``, ``delete``.
+
+:class:`GcsStorage` talks to a bucket (through :mod:`utils.gcs_util` for
+whole-file sync, so compression and skip checks apply); :class:`LocalStorage`
+keeps objects in a directory so runs can be tested and benchmarked offline.
+Each transfer is timed and :meth:`Storage.stats` reports count, bytes,
+latency and throughput per operation.
+
+The backend is chosen by the ``storage`` section of ``config.json``. The GCS
+backend compresses objects with gzip unless ``codec`` says otherwise; only
+choose ``zstd`` when every reader has the ``zstandard`` package::
+
+    "storage": {"backend": "gcs", "bucket": "my-bucket"}
+    "storage": {"backend": "gcs", "bucket": "my-bucket", "codec": "zstd"}
+    "storage": {"backend": "local", "root": "code_outputs/bucket"}
+"""
+
+from __future__ import annotations
+
+import filecmp
+import logging
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from utils.compression import check_codec
+
+logger = logging.getLogger(__name__)
+
+
+class TransferError(RuntimeError):
+    """Raised when an existing object could not be transferred."""
+
+
+class ObjectInfo(NamedTuple):
+    key: str
+    size: int
+    updated: Optional[datetime]
+
+
+class Storage(ABC):
+    """Transfer bookkeeping shared by the backends; subclasses implement ``_``-methods."""
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    # --- instrumentation ---
+
+    @contextmanager
+    def _measure(self, op: str, key: str) -> Iterator[dict]:
+        """Times one transfer; the body sets ``bytes`` and ``skipped`` on the yielded dict."""
+        transfer = {"bytes": 0, "skipped": False}
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield transfer
+            ok = True
+        finally:
+            seconds = time.perf_counter() - start
+            self._record(op, transfer["bytes"], seconds, transfer["skipped"], ok)
+            logger.debug(
+                f"{type(self).__name__} {op} {key}: {transfer['bytes']} bytes in {seconds:.3f}s"
+                + (" (skipped)" if transfer["skipped"] else "")
+                + ("" if ok else " (failed)")
+            )
+
+    def _record(self, op: str, nbytes: int, seconds: float, skipped: bool, ok: bool) -> None:
+        with self._stats_lock:
+            entry = self._stats.setdefault(
+                op, {"count": 0, "skipped": 0, "failed": 0, "bytes": 0, "seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["count"] += 1
+            entry["skipped"] += int(skipped)
+            entry["failed"] += int(not ok)
+            entry["bytes"] += nbytes
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def stats(self) -> dict[str, dict]:
+        """Per-operation totals plus mean latency and throughput (MB/s) of transfers so far."""
+        with self._stats_lock:
+            snapshot = {op: dict(entry) for op, entry in self._stats.items()}
+        for entry in snapshot.values():
+            entry["mean_seconds"] = round(entry["seconds"] / entry["count"], 4) if entry["count"] else 0.0
+            entry["mb_per_s"] = (
+                round(entry["bytes"] / entry["seconds"] / 1_000_000, 3) if entry["seconds"] > 0 else 0.0
+            )
+            entry["seconds"] = round(entry["seconds"], 4)
+            entry["max_seconds"] = round(entry["max_seconds"], 4)
+        return snapshot
+
+    # --- whole-file sync ---
+
+    def download(self, key: str, dest: Path) -> bool:
+        """Makes ``dest`` a copy of ``key``; True when it is current afterwards.
+
+        False means ``key`` does not exist (e.g. the store's first run). A transfer
+        that fails raises, typically :class:`TransferError`, so callers never
+        mistake a failed download for a missing object.
+        """
+        with self._measure("download", key) as transfer:
+            ok = self._download(key, dest, transfer)
+            if not ok:
+                transfer["bytes"] = 0
+            return ok
+
+    def upload(self, src: Path, key: str) -> bool:
+        """Stores ``src`` as ``key``; True when the object matches ``src`` afterwards."""
+        with self._measure("upload", key) as transfer:
+            ok = self._upload(src, key, transfer)
+            if not ok:
+                transfer["bytes"] = 0
+            return ok
+
+    # --- small objects ---
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        with self._measure("get", key) as transfer:
+            data = self._get_bytes(key)
+            transfer["bytes"] = len(data) if data is not None else 0
+            return data
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        with self._measure("put", key) as transfer:
+            self._put_bytes(key, data)
+            transfer["bytes"] = len(data)
+
+    def get_file(self, key: str, dest: Path) -> bool:
+        with self._measure("get", key) as transfer:
+            found = self._get_file(key, dest)
+            transfer["bytes"] = dest.stat().st_size if found else 0
+            return found
+
+    def put_file(self, key: str, src: Path) -> None:
+        with self._measure("put", key) as transfer:
+            self._put_file(key, src)
+            transfer["bytes"] = src.stat().st_size
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> list[str]:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def _download(self, key: str, dest: Path, transfer: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def _upload(self, src: Path, key: str, transfer: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def _get_bytes(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def _put_bytes(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def _get_file(self, key: str, dest: Path) -> bool:
+        ...
+
+    @abstractmethod
+    def _put_file(self, key: str, src: Path) -> None:
+        ...
+
+
+class LocalStorage(Storage):
+    """Stores objects as files under ``root`` (stand-in for a bucket)."""
+
+    def __init__(self, root: Path):
+        super().__init__()
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root.joinpath(*key.split("/"))
+
+    def _copy(self, src: Path, dest: Path) -> None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".part")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            st = self._path(key).stat()
+        except FileNotFoundError:
+            return None
+        return ObjectInfo(key, st.st_size, datetime.fromtimestamp(st.st_mtime))
+
+    def list(self, prefix: str = "") -> list[str]:
+        if not self.root.exists():
+            return []
+        keys = (p.relative_to(self.root).as_posix() for p in self.root.rglob("*") if p.is_file())
+        return sorted(k for k in keys if k.startswith(prefix) and not k.endswith(".part"))
+
+    def delete(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _download(self, key: str, dest: Path, transfer: dict) -> bool:
+        src = self._path(key)
+        if not src.is_file():
+            logger.warning(f"Object {key} not found in {self.root}. Skipping download.")
+            return False
+        if dest.exists() and filecmp.cmp(src, dest, shallow=False):
+            transfer["skipped"] = True
+            return True
+        self._copy(src, dest)
+        transfer["bytes"] = dest.stat().st_size
+        return True
+
+    def _upload(self, src: Path, key: str, transfer: dict) -> bool:
+        if not src.exists():
+            logger.warning(f"Source file {src} not found. Skipping upload.")
+            return False
+        dest = self._path(key)
+        if dest.exists() and filecmp.cmp(src, dest, shallow=False):
+            transfer["skipped"] = True
+            return True
+        self._copy(src, dest)
+        transfer["bytes"] = dest.stat().st_size
+        return True
+
+    def _get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _put_bytes(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _get_file(self, key: str, dest: Path) -> bool:
+        src = self._path(key)
+        if not src.is_file():
+            return False
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dest)
+        return True
+
+    def _put_file(self, key: str, src: Path) -> None:
+        self._copy(src, self._path(key))
+
+
+class GcsStorage(Storage):
+    """Stores objects in a Google Cloud Storage bucket."""
+
+    def __init__(self, bucket_name: str, codec: Optional[str] = None):
+        super().__init__()
+        self.bucket_name = bucket_name
+        self.codec = codec
+
+    def _client(self):
+        # Imported lazily so LocalStorage works without the google-cloud packages.
+        from utils.gcs_util import get_client
+
+        return get_client()
+
+    def _bucket(self):
+        return self._client().bucket(self.bucket_name)
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        blob = self._bucket().get_blob(key)
+        return None if blob is None else ObjectInfo(key, blob.size, blob.updated)
+
+    def list(self, prefix: str = "") -> list[str]:
+        return sorted(blob.name for blob in self._client().list_blobs(self.bucket_name, prefix=prefix))
+
+    def delete(self, key: str) -> None:
+        from google.api_core import exceptions as gcs_exceptions
+
+        try:
+            self._bucket().blob(key).delete()
+        except gcs_exceptions.NotFound:
+            pass
+
+    def _download(self, key: str, dest: Path, transfer: dict) -> bool:
+        from utils.gcs_util import download_from_gcs
+
+        if download_from_gcs(self.bucket_name, key, dest, transfer=transfer):
+            return True
+        if transfer.get("missing"):
+            return False
+        raise TransferError(f"Failed to download {key} from {self.bucket_name}")
+
+    def _upload(self, src: Path, key: str, transfer: dict) -> bool:
+        from utils.gcs_util import upload_to_gcs
+
+        return upload_to_gcs(self.bucket_name, src, key, codec=self.codec, transfer=transfer)
+
+    def _get_bytes(self, key: str) -> Optional[bytes]:
+        blob = self._bucket().get_blob(key)
+        return None if blob is None else blob.download_as_bytes()
+
+    def _put_bytes(self, key: str, data: bytes) -> None:
+        self._bucket().blob(key).upload_from_string(data, checksum="crc32c")
+
+    def _get_file(self, key: str, dest: Path) -> bool:
+        blob = self._bucket().get_blob(key)
+        if blob is None:
+            return False
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        blob.download_to_filename(str(dest))
+        return True
+
+    def _put_file(self, key: str, src: Path) -> None:
+        self._bucket().blob(key).upload_from_filename(str(src), checksum="crc32c")
+
+
+BACKENDS = ("gcs", "local")
+
+
+def open_storage(config: Optional[dict], base_dir: Optional[Path] = None) -> Storage:
+    """Builds the backend described by a ``storage`` config section.
+
+    A relative ``root`` of the local backend is resolved against ``base_dir``.
+    """
+    if not config:
+        raise ValueError("No storage configured; add a 'storage' section to config.json")
+    backend = config.get("backend", "gcs")
+    if backend == "gcs":
+        if not config.get("bucket"):
+            raise ValueError("The gcs storage backend needs a 'bucket'")
+        codec = config.get("codec")
+        if codec is not None:
+            check_codec(codec)
+        return GcsStorage(config["bucket"], codec=codec)
+    if backend == "local":
+        root = Path(config.get("root", "code_outputs/bucket"))
+        if not root.is_absolute() and base_dir is not None:
+            root = base_dir / root
+        return LocalStorage(root)
+    raise ValueError(f"Unknown storage backend {backend!r}; expected one of {', '.join(BACKENDS)}")